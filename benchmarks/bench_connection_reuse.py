@@ -0,0 +1,61 @@
+"""
+Benchmark de latencia con conexión nueva frente a conexión keep-alive reutilizada
+Compara requests.get (una conexión por llamada) con el pool de WeatherService
+contra el stub local de wttr.in
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from weather_service import WeatherService  # noqa: E402
+from wttr_stub import WttrStub  # noqa: E402
+
+
+def _summary(label: str, samples: List[float]):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(
+        f"{label:<28} mediana {statistics.median(samples) * 1000:7.3f} ms   "
+        f"p95 {p95 * 1000:7.3f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=300, help="Consultas por escenario")
+    args = parser.parse_args()
+
+    with WttrStub() as stub:
+        url = f"{stub.url}/Madrid?format=j1"
+
+        cold = []
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            requests.get(url, timeout=10)
+            cold.append(time.perf_counter() - started)
+
+        service = WeatherService(cache_ttl=0)
+        service.base_url = stub.url
+        service.warm_up()
+
+        warm = []
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            service.get_weather("Madrid")
+            warm.append(time.perf_counter() - started)
+        service.close()
+
+    _summary("Conexión nueva por llamada", cold)
+    _summary("Pool keep-alive (+parseo)", warm)
+
+
+if __name__ == "__main__":
+    main()
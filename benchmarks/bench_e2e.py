@@ -0,0 +1,243 @@
+"""
+Benchmark de extremo a extremo: MCPClient -> MCPServer -> WeatherService -> stub
+Lanza el servidor MCP real contra el stub local de wttr.in (con latencia y
+errores inyectables), lo carga con la concurrencia y el sesgo de ciudades
+(Zipf) indicados e informa de solicitudes/s y latencias p50/p95/p99.
+Con --json guarda el resultado y con --compare lo contrasta con otra ejecución
+para detectar regresiones
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import json_codec  # noqa: E402
+from mcp_client import MCPClient, MCPWorkerPool  # noqa: E402
+from wttr_stub import WttrStub  # noqa: E402
+
+SERVER_SCRIPT = str(Path(__file__).resolve().parent.parent / "src" / "mcp_server.py")
+
+# Métricas comparadas con --compare: nombre -> True si mayor es mejor
+COMPARED_METRICS = {"rps": True, "p50_ms": False, "p95_ms": False, "p99_ms": False}
+
+
+def zipf_cities(count: int, cities: int, skew: float, seed: int) -> List[str]:
+    """
+    Genera la secuencia de ciudades consultadas
+
+    Args:
+        count (int): Número de consultas
+        cities (int): Número de ciudades distintas
+        skew (float): Exponente de Zipf (0 = reparto uniforme)
+        seed (int): Semilla del generador
+
+    Returns:
+        List[str]: Nombres de ciudad en orden de consulta
+    """
+    names = [f"City{rank:05d}" for rank in range(1, cities + 1)]
+    weights = [1 / rank ** skew for rank in range(1, cities + 1)]
+    return random.Random(seed).choices(names, weights=weights, k=count)
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Percentil por rango más cercano de una lista ordenada"""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, int(round(fraction * len(samples))) - 1))
+    return samples[index]
+
+
+def run_load(client, sequence: List[str], concurrency: int) -> Dict[str, Any]:
+    """
+    Ejecuta las consultas con `concurrency` hilos y mide cada una
+
+    Returns:
+        Dict[str, Any]: Latencias ordenadas (s), errores y tiempo total
+    """
+    latencies: List[float] = []
+    errors = 0
+    position = 0
+    lock = threading.Lock()
+
+    def worker():
+        nonlocal position, errors
+        local_latencies = []
+        local_errors = 0
+        while True:
+            with lock:
+                if position >= len(sequence):
+                    break
+                city = sequence[position]
+                position += 1
+            started = time.perf_counter()
+            result = client.get_weather(city)
+            local_latencies.append(time.perf_counter() - started)
+            if "error" in result:
+                local_errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors += local_errors
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {"latencies": latencies, "errors": errors, "elapsed": elapsed}
+
+
+def summarize(load: Dict[str, Any], stub: WttrStub, upstream_before: int,
+              upstream_errors_before: int) -> Dict[str, Any]:
+    latencies = load["latencies"]
+    count = len(latencies)
+    upstream = stub.requests - upstream_before
+    return {
+        "requests": count,
+        "errors": load["errors"],
+        "elapsed_s": round(load["elapsed"], 4),
+        "rps": round(count / load["elapsed"], 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        "upstream_requests": upstream,
+        "upstream_per_request": round(upstream / count, 4) if count else 0.0,
+        "upstream_errors": stub.errors - upstream_errors_before
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Compara dos resultados y devuelve las regresiones que superan la tolerancia
+
+    Args:
+        current (Dict[str, Any]): Resultado de esta ejecución
+        baseline (Dict[str, Any]): Resultado de referencia (salida de --json)
+        tolerance (float): Empeoramiento relativo admitido (0.1 = 10 %)
+
+    Returns:
+        List[str]: Descripción de cada regresión
+    """
+    regressions = []
+    print(f"\n{'métrica':<10} {'referencia':>12} {'actual':>12} {'cambio':>9}")
+    for metric, higher_is_better in COMPARED_METRICS.items():
+        before = baseline["results"].get(metric)
+        after = current["results"].get(metric)
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        worse = -change if higher_is_better else change
+        flag = "  REGRESIÓN" if worse > tolerance else ""
+        print(f"{metric:<10} {before:>12.3f} {after:>12.3f} {change:>+8.1%}{flag}")
+        if flag:
+            regressions.append(f"{metric}: {before} -> {after} ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000, help="Consultas medidas")
+    parser.add_argument("--warmup", type=int, default=200, help="Consultas previas no medidas")
+    parser.add_argument("--concurrency", type=int, default=16, help="Hilos cliente simultáneos")
+    parser.add_argument("--cities", type=int, default=500, help="Ciudades distintas")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Sesgo de Zipf (0 = uniforme)")
+    parser.add_argument("--latency", type=float, default=0.02, help="Latencia del stub en segundos")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Latencia extra media del stub")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracción de 503 del stub")
+    parser.add_argument("--payloads", help="Directorio con payloads j1 grabados (<ciudad>.json)")
+    parser.add_argument("--workers", type=int, default=1, help="Procesos del servidor MCP")
+    parser.add_argument("--sync", action="store_true", help="Servidor en modo síncrono (sin --async)")
+    parser.add_argument("--fetch-mode", default="j1", choices=("j1", "lean"), help="Modo de consulta")
+    parser.add_argument("--seed", type=int, default=1, help="Semilla de ciudades, latencia y errores")
+    parser.add_argument("--json", dest="json_path", help="Guardar el resultado en este fichero")
+    parser.add_argument("--compare", help="Resultado de referencia (JSON) con el que comparar")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Empeoramiento relativo admitido en --compare (por defecto 0.10)")
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.INFO)
+
+    config = {key: value for key, value in vars(args).items()
+              if key not in ("json_path", "compare", "tolerance")}
+    sequence = zipf_cities(args.warmup + args.requests, args.cities, args.zipf, args.seed)
+    server_args = [] if args.sync else ["--async"]
+
+    with WttrStub(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                  payload_dir=args.payloads, seed=args.seed) as stub:
+        # El servidor hereda el entorno: apuntarlo al stub
+        os.environ["WEATHER_BASE_URL"] = stub.url
+        os.environ["WEATHER_FETCH_MODE"] = args.fetch_mode
+        os.environ.pop("WEATHER_CACHE_DB", None)
+
+        if args.workers > 1:
+            client = MCPWorkerPool(SERVER_SCRIPT, workers=args.workers, server_args=server_args)
+        else:
+            client = MCPClient(SERVER_SCRIPT, server_args=server_args)
+        if not (client.connect() and client.initialize()):
+            sys.exit("No se pudo iniciar el servidor MCP")
+
+        try:
+            run_load(client, sequence[:args.warmup], args.concurrency)
+            upstream_before, upstream_errors_before = stub.requests, stub.errors
+            load = run_load(client, sequence[args.warmup:], args.concurrency)
+            results = summarize(load, stub, upstream_before, upstream_errors_before)
+        finally:
+            client.disconnect()
+
+    current = {
+        "benchmark": "e2e",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "json_codec": json_codec.CODEC_NAME
+        },
+        "config": config,
+        "results": results
+    }
+
+    print(
+        f"{results['requests']} consultas, concurrencia {args.concurrency}, "
+        f"{args.cities} ciudades (zipf {args.zipf}), {args.workers} proceso(s)"
+    )
+    print(
+        f"{results['rps']:.1f} req/s  p50 {results['p50_ms']:.2f} ms  "
+        f"p95 {results['p95_ms']:.2f} ms  p99 {results['p99_ms']:.2f} ms  "
+        f"max {results['max_ms']:.2f} ms"
+    )
+    print(
+        f"errores {results['errors']}  consultas al upstream {results['upstream_requests']} "
+        f"({results['upstream_per_request']:.3f} por consulta, "
+        f"{results['upstream_errors']} errores inyectados)"
+    )
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2, ensure_ascii=False)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("config") != config:
+            print("Aviso: la configuración difiere de la de referencia")
+        regressions = compare(current, baseline, args.tolerance)
+        if regressions:
+            sys.exit("Regresiones detectadas: " + "; ".join(regressions))
+
+
+if __name__ == "__main__":
+    main()
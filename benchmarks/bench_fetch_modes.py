@@ -0,0 +1,52 @@
+"""
+Benchmark de bytes y tiempo por consulta en los modos de consulta j1 y lean
+Ejecuta WeatherService sin caché contra el stub local, que sirve ambos formatos,
+y comprueba que los dos modos producen el mismo conjunto de campos
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from weather_service import WeatherService, FETCH_MODE_J1, FETCH_MODE_LEAN  # noqa: E402
+from wttr_stub import WttrStub  # noqa: E402
+
+CITIES = ["Madrid", "London", "Paris", "Berlin", "Tokyo", "Lima", "Montevideo", "Oslo"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=400, help="Consultas por modo")
+    args = parser.parse_args()
+
+    results = {}
+    with WttrStub() as stub:
+        for mode in (FETCH_MODE_J1, FETCH_MODE_LEAN):
+            service = WeatherService(cache_ttl=0, fetch_mode=mode)
+            service.base_url = stub.url
+            service.warm_up()
+
+            bytes_before = stub.bytes_sent
+            started = time.perf_counter()
+            for i in range(args.requests):
+                results[mode] = service.get_weather(CITIES[i % len(CITIES)])
+            elapsed = time.perf_counter() - started
+            service.close()
+
+            per_call = (stub.bytes_sent - bytes_before) / args.requests
+            print(
+                f"{mode:<5} {per_call:9.0f} B/consulta  "
+                f"{elapsed / args.requests * 1000:7.3f} ms/consulta"
+            )
+
+    for mode, result in results.items():
+        print(f"{mode:<5} {result}")
+    if set(results[FETCH_MODE_J1]) != set(results[FETCH_MODE_LEAN]):
+        sys.exit("Los modos j1 y lean no producen los mismos campos")
+
+
+if __name__ == "__main__":
+    main()
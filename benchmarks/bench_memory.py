@@ -0,0 +1,113 @@
+"""
+Benchmark de memoria por ciudad cacheada
+Mide con tracemalloc cuánto ocupa la condición actual de N ciudades en la
+representación anterior (diccionario de 11 cadenas) y como WeatherReading,
+además de una entrada de caché completa en modo lean (Observation + entrada
+LRU) con cada representación
+"""
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import json_codec  # noqa: E402
+from weather_cache import WeatherCache  # noqa: E402
+from weather_service import Observation, WeatherService  # noqa: E402
+from wttr_stub import make_j1_payload  # noqa: E402
+
+
+def legacy_parse(data: Dict[str, Any], city: str) -> Dict[str, Any]:
+    """Parser anterior a WeatherReading: diccionario de cadenas con "N/A" (referencia)"""
+    current = data.get("current_condition", [{}])[0]
+    nearest_area = data.get("nearest_area", [{}])[0]
+    return {
+        "city": nearest_area.get("areaName", [{}])[0].get("value", city),
+        "temperature": current.get("temp_C", "N/A"),
+        "condition": current.get("weatherDesc", [{}])[0].get("value", "N/A"),
+        "humidity": current.get("humidity", "N/A"),
+        "wind_speed": current.get("windspeedKmph", "N/A"),
+        "wind_direction": current.get("winddir16Point", "N/A"),
+        "pressure": current.get("pressure", "N/A"),
+        "feels_like": current.get("FeelsLikeC", "N/A"),
+        "visibility": current.get("visibility", "N/A"),
+        "uv_index": current.get("uvIndex", "N/A"),
+        "timestamp": current.get("localObsDateTime", "N/A")
+    }
+
+
+def measure(build: Callable[[], Any]) -> int:
+    """Bytes que siguen reservados tras construir la estructura (tracemalloc)"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        structure = build()
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del structure
+    return after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cities", type=int, default=10000, help="Ciudades distintas")
+    parser.add_argument("--json", help="Guardar el resultado en este fichero JSON")
+    args = parser.parse_args()
+
+    service = WeatherService(cache_ttl=0)
+    names = [f"City {i}" for i in range(args.cities)]
+    # Cuerpos j1 como los recibe el servicio: cada ciudad se decodifica dentro
+    # de la medición, igual que al llegar del upstream
+    bodies = [json.dumps(make_j1_payload(name)).encode("utf-8") for name in names]
+
+    def legacy_dicts() -> List[Dict[str, Any]]:
+        return [legacy_parse(json_codec.loads(body), name) for body, name in zip(bodies, names)]
+
+    def readings() -> List[Any]:
+        return [service._parse_weather_data(json_codec.loads(body), name) for body, name in zip(bodies, names)]
+
+    def cache_with(parse: Callable[[Dict[str, Any], str], Any]) -> Callable[[], WeatherCache]:
+        def build() -> WeatherCache:
+            cache = WeatherCache(max_entries=args.cities, max_bytes=1 << 40)
+            for body, name in zip(bodies, names):
+                observation = Observation(parse(json_codec.loads(body), name))
+                cache.put(name.casefold(), observation, size=observation.size())
+            return cache
+        return build
+
+    # Comprobar que la conversión es sin pérdida antes de medir
+    sample = service._parse_weather_data(json_codec.loads(bodies[0]), names[0])
+    assert sample.to_dict() == legacy_parse(json_codec.loads(bodies[0]), names[0])
+    assert [reading.to_dict() for reading in readings()] == legacy_dicts()
+
+    results = {}
+    scenarios = (
+        ("dict (antes)", legacy_dicts),
+        ("WeatherReading", readings),
+        ("caché lean, dict", cache_with(legacy_parse)),
+        ("caché lean, WeatherReading", cache_with(service._parse_weather_data)),
+    )
+    print(f"Ciudades: {args.cities}  (Python {sys.version.split()[0]})")
+    for label, build in scenarios:
+        started = time.perf_counter()
+        total = measure(build)
+        elapsed = time.perf_counter() - started
+        results[label] = round(total / args.cities, 1)
+        print(f"{label:<28} {total / args.cities:8.1f} B/ciudad  {total / 1e6:8.2f} MB  ({elapsed:.2f} s)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"cities": args.cities, "bytes_per_city": results}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Micro-benchmark de serialización en el camino crítico del servidor MCP
+Mide bytes/s de respuestas producidas por handle_request (+ codificación) y por
+el bucle stdio completo de run(), con la caché precargada para aislar el
+coste de parseo y serialización del acceso al upstream
+"""
+
+import argparse
+import io
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import json_codec  # noqa: E402
+from mcp_server import MCPServer  # noqa: E402
+from weather_service import Observation, WeatherReading  # noqa: E402
+
+CITIES = ["Madrid", "London", "Paris", "Berlin", "Tokyo", "Lima", "Montevideo", "Oslo"]
+
+
+def _make_server(protocol_version: str) -> MCPServer:
+    """Crea un servidor inicializado con la caché precargada"""
+    server = MCPServer()
+    for city in CITIES:
+        server.weather_service.cache.put(city.casefold(), Observation(WeatherReading.from_dict({
+            "city": city, "temperature": "21", "condition": "Partly cloudy",
+            "humidity": "60", "wind_speed": "11", "wind_direction": "NNE",
+            "pressure": "1016", "feels_like": "20", "visibility": "10",
+            "uv_index": "5", "timestamp": "2024-01-15 01:45 PM"
+        })))
+    server.handle_request({
+        "jsonrpc": "2.0", "id": 0, "method": "initialize",
+        "params": {"protocolVersion": protocol_version}
+    })
+    return server
+
+
+def _requests(count: int):
+    """Mezcla de solicitudes: mayoría de tools/call y algún tools/list"""
+    for i in range(count):
+        if i % 10 == 0:
+            yield {"jsonrpc": "2.0", "id": i, "method": "tools/list"}
+        else:
+            yield {
+                "jsonrpc": "2.0", "id": i, "method": "tools/call",
+                "params": {"name": "get_weather", "arguments": {"city": CITIES[i % len(CITIES)]}}
+            }
+
+
+def bench_handle_request(protocol_version: str, count: int):
+    server = _make_server(protocol_version)
+    requests = list(_requests(count))
+
+    started = time.perf_counter()
+    total = 0
+    for request in requests:
+        total += len(server.encode_response(server.handle_request(request)))
+    elapsed = time.perf_counter() - started
+    return total, elapsed
+
+
+def bench_run(protocol_version: str, count: int):
+    server = _make_server(protocol_version)
+    payload = b"".join(json.dumps(request).encode("utf-8") + b"\n" for request in _requests(count))
+
+    stdin, stdout = sys.stdin, sys.stdout
+    sys.stdin = io.TextIOWrapper(io.BytesIO(payload), encoding="utf-8")
+    sys.stdout = io.TextIOWrapper(io.BytesIO(), encoding="utf-8")
+    server.weather_service.warm_up = lambda: None
+    try:
+        started = time.perf_counter()
+        server.run()
+        elapsed = time.perf_counter() - started
+        total = len(sys.stdout.buffer.getvalue())
+    finally:
+        sys.stdin, sys.stdout = stdin, stdout
+    return total, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20000, help="Solicitudes por escenario")
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.INFO)
+
+    print(f"Códec JSON: {json_codec.CODEC_NAME}")
+    for version in ("2024-11-05", "2025-06-18"):
+        for label, bench in (("handle_request", bench_handle_request), ("run", bench_run)):
+            total, elapsed = bench(version, args.requests)
+            print(
+                f"{label:<15} protocolo {version}: {args.requests / elapsed:9.0f} req/s  "
+                f"{total / elapsed / 1e6:7.2f} MB/s  ({total / args.requests:.0f} B/resp)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+Servidor HTTP local que imita a wttr.in para benchmarks
+Sirve payloads j1 (grabados o sintéticos) y formatos personalizados
+(?format=%t...) con keep-alive (HTTP/1.1) en un puerto local, con latencia y
+errores inyectables
+"""
+
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Any, Optional
+from urllib.parse import urlsplit, unquote, parse_qs
+
+
+WIND_POINTS = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE",
+               "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"]
+CONDITIONS = ["Sunny", "Partly cloudy", "Overcast", "Light rain", "Mist", "Clear"]
+WIND_ARROWS = ["↓", "↙", "←", "↖", "↑", "↗", "→", "↘"]
+
+
+def make_j1_payload(city: str) -> Dict[str, Any]:
+    """
+    Genera un documento j1 sintético y determinista para una ciudad
+
+    Args:
+        city (str): Nombre de la ciudad
+
+    Returns:
+        Dict[str, Any]: Documento con la misma estructura que wttr.in ?format=j1
+    """
+    seed = zlib.crc32(city.lower().encode("utf-8"))
+    temp = seed % 35 - 5
+    condition = CONDITIONS[seed % len(CONDITIONS)]
+
+    def hourly(day: int, hour: int) -> Dict[str, Any]:
+        return {
+            "time": str(hour),
+            "tempC": str(temp + (hour // 300) - 2 + day),
+            "FeelsLikeC": str(temp + (hour // 300) - 3 + day),
+            "humidity": str(40 + (seed + hour) % 50),
+            "windspeedKmph": str((seed + hour) % 30),
+            "winddir16Point": WIND_POINTS[(seed + hour) % 16],
+            "chanceofrain": str((seed + hour + day) % 100),
+            "pressure": str(1000 + seed % 30),
+            "visibility": "10",
+            "uvIndex": str(hour // 300),
+            "weatherDesc": [{"value": condition}],
+            "lang_es": [{"value": condition}]
+        }
+
+    return {
+        "current_condition": [{
+            "temp_C": str(temp),
+            "FeelsLikeC": str(temp - 1),
+            "humidity": str(40 + seed % 50),
+            "windspeedKmph": str(seed % 30),
+            "winddir16Point": WIND_POINTS[seed % 16],
+            "winddirDegree": str((seed % 16) * 22),
+            "pressure": str(1000 + seed % 30),
+            "visibility": "10",
+            "uvIndex": str(seed % 11),
+            "localObsDateTime": "2024-01-15 01:45 PM",
+            "observation_time": "12:45 PM",
+            "weatherDesc": [{"value": condition}],
+            "lang_es": [{"value": condition}]
+        }],
+        "nearest_area": [{
+            "areaName": [{"value": city.strip().title()}],
+            "country": [{"value": "Stubland"}],
+            "region": [{"value": "Stub Region"}],
+            "latitude": "40.000",
+            "longitude": "-3.000",
+            "population": "0"
+        }],
+        "request": [{"query": city, "type": "City"}],
+        "weather": [
+            {
+                "date": f"2024-01-{15 + day}",
+                "maxtempC": str(temp + 4 + day),
+                "mintempC": str(temp - 4 + day),
+                "avgtempC": str(temp + day),
+                "sunHour": "8.5",
+                "uvIndex": str(seed % 11),
+                "totalSnow_cm": "0.0",
+                "astronomy": [{
+                    "sunrise": "08:30 AM", "sunset": "06:05 PM",
+                    "moonrise": "10:12 AM", "moonset": "11:40 PM",
+                    "moon_phase": "Waxing Crescent", "moon_illumination": "20"
+                }],
+                "hourly": [hourly(day, hour) for hour in range(0, 2400, 300)]
+            }
+            for day in range(3)
+        ]
+    }
+
+
+def render_format(payload: Dict[str, Any], fmt: str) -> str:
+    """
+    Renderiza un formato personalizado de wttr.in (?format=%t|%C...) a partir de un j1
+
+    Args:
+        payload (Dict[str, Any]): Documento j1
+        fmt (str): Formato con los códigos %l %t %f %C %h %w %P %u %T
+
+    Returns:
+        str: Línea de texto como la que devuelve wttr.in
+    """
+    current = payload["current_condition"][0]
+    area = payload["nearest_area"][0]
+    arrow = WIND_ARROWS[int(((int(current["winddirDegree"]) + 22.5) % 360) / 45)]
+    values = {
+        "%l": f"{area['areaName'][0]['value']}, {area['country'][0]['value']}",
+        "%t": f"{int(current['temp_C']):+d}°C",
+        "%f": f"{int(current['FeelsLikeC']):+d}°C",
+        "%C": current["weatherDesc"][0]["value"],
+        "%h": f"{current['humidity']}%",
+        "%w": f"{arrow}{current['windspeedKmph']}km/h",
+        "%P": f"{current['pressure']}hPa",
+        "%u": current["uvIndex"],
+        "%T": "13:45:00+0000"
+    }
+    for code, value in values.items():
+        fmt = fmt.replace(code, value)
+    return fmt + "\n"
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Manejador HTTP del stub (HTTP/1.1 para mantener conexiones abiertas)"""
+
+    protocol_version = "HTTP/1.1"
+    # Cabeceras y cuerpo en un solo segmento: evita la espera de Nagle/ACK retardado
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        stub: "WttrStub" = self.server.stub
+        parts = urlsplit(self.path)
+        city = unquote(parts.path.lstrip("/"))
+        fmt = parse_qs(parts.query).get("format", [""])[0]
+
+        delay = stub.next_latency()
+        if delay > 0:
+            time.sleep(delay)
+
+        if stub.should_fail():
+            stub.count(0, error=True)
+            body = b"Service Unavailable"
+            self.send_response(503)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        if fmt == "j1":
+            body = stub.j1_body(city)
+            content_type = "application/json"
+        else:
+            body = render_format(stub.payload(city), fmt).encode("utf-8")
+            content_type = "text/plain; charset=utf-8"
+
+        stub.count(len(body))
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class WttrStub:
+    """Stub de wttr.in ejecutándose en un hilo en segundo plano"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0,
+                 payload_dir: Optional[str] = None, seed: Optional[int] = None):
+        """
+        Inicializa el stub
+
+        Args:
+            host (str): Dirección de escucha
+            port (int): Puerto (0 elige uno libre)
+            latency (float): Latencia base en segundos añadida a cada GET
+            jitter (float): Latencia extra aleatoria (exponencial de media jitter)
+            error_rate (float): Fracción de GET que responden 503
+            payload_dir (Optional[str]): Directorio con payloads j1 grabados
+                (<ciudad>.json); las ciudades sin fichero usan el payload sintético
+            seed (Optional[int]): Semilla de la latencia y los errores inyectados
+        """
+        self.server = ThreadingHTTPServer((host, port), _StubHandler)
+        self.server.daemon_threads = True
+        self.server.stub = self
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recorded: Dict[str, Dict[str, Any]] = {}
+        self._bodies: Dict[str, bytes] = {}
+        self._thread: Optional[threading.Thread] = None
+
+        if payload_dir:
+            for path in Path(payload_dir).glob("*.json"):
+                with open(path, encoding="utf-8") as f:
+                    self._recorded[path.stem.casefold()] = json.load(f)
+
+    def payload(self, city: str) -> Dict[str, Any]:
+        """Payload j1 de una ciudad: el grabado si existe, si no el sintético"""
+        return self._recorded.get(city.casefold()) or make_j1_payload(city)
+
+    def j1_body(self, city: str) -> bytes:
+        """Cuerpo j1 codificado (se memoriza para que el stub no sea el cuello de botella)"""
+        body = self._bodies.get(city)
+        if body is None:
+            body = json.dumps(self.payload(city)).encode("utf-8")
+            self._bodies[city] = body
+        return body
+
+    def next_latency(self) -> float:
+        """Latencia a inyectar en la siguiente respuesta"""
+        if self.jitter <= 0:
+            return self.latency
+        with self._lock:
+            return self.latency + self._random.expovariate(1 / self.jitter)
+
+    def should_fail(self) -> bool:
+        """Decide si la siguiente respuesta es un error inyectado"""
+        if self.error_rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def count(self, size: int, error: bool = False):
+        """Contabiliza una respuesta servida"""
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += size
+            if error:
+                self.errors += 1
+
+    @property
+    def url(self) -> str:
+        """URL base para asignar a WeatherService.base_url"""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "WttrStub":
+        """Arranca el stub en segundo plano"""
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Detiene el stub"""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "WttrStub":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8765, help="Puerto de escucha")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latencia base en segundos")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Latencia extra media en segundos")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracción de respuestas 503")
+    parser.add_argument("--payloads", help="Directorio con payloads j1 grabados (<ciudad>.json)")
+    args = parser.parse_args()
+
+    with WttrStub(port=args.port, latency=args.latency, jitter=args.jitter,
+                  error_rate=args.error_rate, payload_dir=args.payloads) as stub:
+        print(f"Stub de wttr.in escuchando en {stub.url} (Ctrl+C para salir)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
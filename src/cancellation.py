@@ -0,0 +1,146 @@
+"""
+Cancelación y plazos de las solicitudes en curso
+El cliente adjunta a cada solicitud su plazo (_meta.timeoutMs) y envía
+notifications/cancelled cuando deja de esperarla; el servidor guarda un token
+por solicitud en un ContextVar para que el servicio meteorológico descarte el
+trabajo en cola y acote las consultas al upstream al tiempo que queda
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional
+
+# Errores locales: la solicitud ya no interesa a nadie (nunca se cachean)
+CANCELLED_ERROR = "Cancelled"
+DEADLINE_ERROR = "Deadline Exceeded"
+
+_current_token: "contextvars.ContextVar[Optional[CancelToken]]" = contextvars.ContextVar(
+    "weather_cancel_token", default=None
+)
+
+
+class RequestCancelled(Exception):
+    """La solicitud se canceló antes de recibir su respuesta"""
+
+
+class CancelToken:
+    """
+    Señal de cancelación con plazo opcional, compartida entre hilos
+
+    Se cancela explícitamente con cancel() o implícitamente al vencer el
+    plazo; los callbacks registrados se ejecutan una sola vez, al cancelar.
+    """
+
+    def __init__(self, deadline: Optional[float] = None):
+        """
+        Inicializa un token sin cancelar
+
+        Args:
+            deadline (Optional[float]): Instante límite (time.monotonic()); None sin plazo
+        """
+        self.deadline = deadline
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def with_timeout(cls, timeout: Optional[float]) -> "CancelToken":
+        """Token cuyo plazo vence dentro de timeout segundos (None sin plazo)"""
+        return cls(None if timeout is None else time.monotonic() + timeout)
+
+    @property
+    def cancelled(self) -> bool:
+        """True si se llamó a cancel()"""
+        return self._event.is_set()
+
+    def expired(self) -> bool:
+        """True si el plazo ya venció"""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def done(self) -> bool:
+        """True si la solicitud ya no interesa (cancelada o fuera de plazo)"""
+        return self._event.is_set() or self.expired()
+
+    def remaining(self) -> Optional[float]:
+        """Segundos hasta el plazo (nunca negativos), o None si no hay plazo"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def error(self) -> Optional[str]:
+        """CANCELLED_ERROR, DEADLINE_ERROR o None si la solicitud sigue viva"""
+        if self._event.is_set():
+            return CANCELLED_ERROR
+        if self.expired():
+            return DEADLINE_ERROR
+        return None
+
+    def cancel(self, reason: str = "cancelled"):
+        """
+        Cancela el token y ejecuta los callbacks registrados
+
+        Args:
+            reason (str): Motivo (se envía en notifications/cancelled)
+        """
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Registra una función que se ejecuta al cancelar (de inmediato si ya lo está)
+
+        Args:
+            callback (Callable[[], None]): Función sin argumentos
+
+        Returns:
+            Callable[[], None]: Función que elimina el registro
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                registered = True
+            else:
+                registered = False
+        if not registered:
+            callback()
+
+        def remove():
+            with self._lock:
+                if callback in self._callbacks:
+                    self._callbacks.remove(callback)
+        return remove
+
+
+def current_token() -> Optional[CancelToken]:
+    """Token de la solicitud que se está atendiendo en el contexto actual"""
+    return _current_token.get()
+
+
+@contextmanager
+def activate(token: Optional[CancelToken]) -> Iterator[Optional[CancelToken]]:
+    """
+    Hace de token el token activo durante el bloque
+
+    Los hilos lanzados con una copia del contexto (contextvars.copy_context)
+    lo heredan, igual que el span activo.
+
+    Args:
+        token (Optional[CancelToken]): Token de la solicitud
+
+    Yields:
+        Optional[CancelToken]: El mismo token
+    """
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
@@ -0,0 +1,271 @@
+"""
+Normalización de nombres de ciudad
+Forma canónica compartida por el servicio (claves de caché) y el cliente
+(enrutado de ciudades entre procesos del servidor), e índice de alias que
+aprende a qué área resuelve wttr.in cada consulta para que las variantes de
+una misma ciudad compartan entrada de caché y consulta al upstream
+"""
+
+import bisect
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Separadores alrededor de comas ("Madrid ,Spain" -> "Madrid, Spain")
+_COMMA_PATTERN = re.compile(r"\s*,\s*")
+
+# Puntuación sobrante al principio o al final de la consulta
+_TRIM_CHARACTERS = " \t\n\r.,;:!?\"'"
+
+# Versión del formato del fichero de alias (la 1 no incluía la región en la
+# clave canónica y mezclaba ciudades homónimas de un mismo país)
+INDEX_FORMAT_VERSION = 2
+
+
+def clean_city(city: str) -> str:
+    """
+    Limpia la consulta tal como se enviará al upstream (sin cambiar mayúsculas)
+
+    Args:
+        city (str): Nombre de la ciudad tal como lo escribió el usuario
+
+    Returns:
+        str: Espacios colapsados, comas normalizadas y sin puntuación en los extremos
+    """
+    return _COMMA_PATTERN.sub(", ", " ".join(city.split())).strip(_TRIM_CHARACTERS)
+
+
+def normalize_city(city: str) -> str:
+    """
+    Normaliza el nombre de una ciudad: limpia la consulta, quita tildes y aplica casefold
+
+    Args:
+        city (str): Nombre de la ciudad tal como lo escribió el usuario
+
+    Returns:
+        str: Nombre normalizado ("  New   York " -> "new york", "Málaga ,España" -> "malaga, espana")
+    """
+    text = clean_city(city)
+    if not text.isascii():
+        text = "".join(
+            char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char)
+        )
+    return text.casefold()
+
+
+class CityIndex:
+    """
+    Índice de alias: consulta normalizada -> área canónica devuelta por wttr.in
+
+    El área canónica es "areaName, region, country" normalizado (la región
+    distingue ciudades homónimas de un mismo país). Las consultas que ya
+    se resolvieron una vez (y la propia forma canónica) se traducen a esa
+    clave antes de cualquier consulta de red. Se guarda en memoria y,
+    opcionalmente, en un fichero JSON que se reescribe como mucho cada
+    save_interval segundos (fusionando lo que hayan escrito otros procesos).
+    """
+
+    def __init__(self, path: Optional[str] = None, max_aliases: int = 50000,
+                 save_interval: float = 5.0):
+        """
+        Inicializa el índice y carga el fichero si existe
+
+        Args:
+            path (Optional[str]): Fichero JSON de persistencia (None solo en memoria)
+            max_aliases (int): Alias máximos (los nuevos se ignoran al llegar al límite)
+            save_interval (float): Segundos mínimos entre escrituras del fichero
+        """
+        self.path = path
+        self.max_aliases = max_aliases
+        self.save_interval = save_interval
+        self._aliases: Dict[str, str] = {}
+        self._names: Dict[str, str] = {}  # clave canónica -> nombre para mostrar
+        self._sorted: List[str] = []  # claves canónicas ordenadas (búsqueda por prefijo)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = 0.0
+        self.resolved = 0
+        self.learned = 0
+
+        if path:
+            self.load()
+
+    def resolve(self, city: str) -> str:
+        """
+        Clave de caché de una consulta: la canónica si se conoce, si no la normalizada
+
+        Args:
+            city (str): Consulta del usuario
+
+        Returns:
+            str: Clave normalizada ("madrid" -> "madrid, madrid, spain" tras aprenderlo)
+        """
+        key = normalize_city(city)
+        canonical = self._aliases.get(key)
+        if canonical is None:
+            return key
+        self.resolved += 1
+        return canonical
+
+    def learn(self, query: str, area_name: Optional[str], country: Optional[str],
+              region: Optional[str] = None) -> Optional[str]:
+        """
+        Anota el área a la que resolvió una consulta
+
+        Args:
+            query (str): Consulta enviada al upstream
+            area_name (Optional[str]): areaName de la respuesta
+            country (Optional[str]): country de la respuesta
+            region (Optional[str]): region de la respuesta
+
+        Returns:
+            Optional[str]: Clave canónica, o None si la respuesta no la identifica
+        """
+        area = clean_city(area_name or "")
+        if not area:
+            return None
+        parts = [area] + [part for part in (clean_city(region or ""), clean_city(country or "")) if part]
+        display = ", ".join(parts)
+        canonical = normalize_city(display)
+        key = normalize_city(query)
+
+        with self._lock:
+            changed = False
+            if canonical not in self._names:
+                self._names[canonical] = display
+                bisect.insort(self._sorted, canonical)
+                changed = True
+            for alias in (key, canonical):
+                if self._aliases.get(alias) != canonical and (
+                        alias in self._aliases or len(self._aliases) < self.max_aliases):
+                    self._aliases[alias] = canonical
+                    changed = True
+            if changed:
+                self.learned += 1
+                self._dirty = True
+
+        if changed:
+            self._maybe_save()
+        return canonical
+
+    def restore(self, query: str, canonical: str):
+        """
+        Recupera un alias sin consultar el upstream (p. ej. desde el almacén persistente)
+
+        No reemplaza un alias ya conocido ni marca el índice para guardarse: el
+        alias se reconstruye de nuevo en cada arranque a partir de su origen.
+
+        Args:
+            query (str): Consulta con la que se obtuvo la observación
+            canonical (str): Clave canónica bajo la que se guardó
+        """
+        key = normalize_city(query)
+        if key == canonical:
+            return
+        with self._lock:
+            if key not in self._aliases and len(self._aliases) < self.max_aliases:
+                self._aliases[key] = canonical
+
+    def prefix(self, text: str, limit: int = 10) -> List[str]:
+        """
+        Ciudades conocidas cuyo nombre empieza por text (búsqueda binaria)
+
+        Args:
+            text (str): Prefijo escrito por el usuario
+            limit (int): Máximo de resultados
+
+        Returns:
+            List[str]: Nombres para mostrar ("Madrid, Madrid, Spain"), en orden alfabético
+        """
+        prefix = normalize_city(text)
+        with self._lock:
+            start = bisect.bisect_left(self._sorted, prefix)
+            matches = []
+            for canonical in self._sorted[start:]:
+                if not canonical.startswith(prefix) or len(matches) >= limit:
+                    break
+                matches.append(self._names[canonical])
+        return matches
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Obtiene el estado del índice
+
+        Returns:
+            Dict[str, int]: Ciudades canónicas, alias y contadores de uso
+        """
+        with self._lock:
+            return {
+                "cities": len(self._names),
+                "aliases": len(self._aliases),
+                "resolved": self.resolved,
+                "learned": self.learned
+            }
+
+    def load(self):
+        """Carga (y fusiona) los alias del fichero; un fichero inválido se ignora"""
+        data = self._read_file()
+        with self._lock:
+            self._merge(data)
+
+    def _read_file(self) -> Dict[str, Dict[str, str]]:
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != INDEX_FORMAT_VERSION:
+                return {}
+            return data
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"No se pudo leer el índice de ciudades {self.path}: {e}")
+            return {}
+
+    def _merge(self, data: Dict[str, Dict[str, str]]):
+        """Añade los alias y nombres de data sin reemplazar los propios (con el lock tomado)"""
+        names = data.get("names") or {}
+        for canonical, display in names.items():
+            if canonical not in self._names:
+                self._names[canonical] = display
+                bisect.insort(self._sorted, canonical)
+        for alias, canonical in (data.get("aliases") or {}).items():
+            if canonical in self._names and alias not in self._aliases and len(self._aliases) < self.max_aliases:
+                self._aliases[alias] = canonical
+
+    def _maybe_save(self):
+        if self.path and time.monotonic() - self._saved_at >= self.save_interval:
+            self.save()
+
+    def save(self):
+        """Escribe el índice si hay cambios (de forma atómica, fusionando el fichero actual)"""
+        if not self.path or not self._dirty:
+            return
+        existing = self._read_file()
+        with self._lock:
+            self._merge(existing)
+            payload = {
+                "version": INDEX_FORMAT_VERSION,
+                "names": dict(self._names),
+                "aliases": dict(self._aliases)
+            }
+            self._dirty = False
+            self._saved_at = time.monotonic()
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self._dirty = True
+            logger.error(f"Error guardando el índice de ciudades en {self.path}: {e}")
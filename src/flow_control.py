@@ -0,0 +1,482 @@
+"""
+Control de flujo de las consultas al upstream
+Limitador de tasa de tipo token bucket, límite de concurrencia adaptativo
+(AIMD) con una cola de espera acotada que rechaza pronto las consultas que no
+podrían terminar antes de su plazo, consultas de cobertura (hedging) tras un
+percentil de latencia aprendido y circuit breaker
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Estados del circuit breaker
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+class TokenBucket:
+    """Limitador de tasa: rate consultas por segundo con ráfagas de hasta burst"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """
+        Inicializa el bucket lleno
+
+        Args:
+            rate (float): Tokens repuestos por segundo
+            burst (Optional[float]): Capacidad del bucket (por defecto rate)
+        """
+        if rate <= 0:
+            raise ValueError("La tasa del token bucket debe ser positiva")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.delayed = 0
+        self.rejected = 0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        """
+        Obtiene un token, esperando si hace falta
+
+        El token se reserva antes de esperar, así que las consultas concurrentes
+        se reparten los huecos futuros en orden de llegada.
+
+        Args:
+            deadline (Optional[float]): Instante límite (time.monotonic()); si el
+                token no estaría disponible antes, se rechaza sin esperar
+
+        Returns:
+            bool: True si se obtuvo el token
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = (1 - self._tokens) / self.rate if self._tokens < 1 else 0.0
+            if deadline is not None and now + wait > deadline:
+                self.rejected += 1
+                return False
+            self._tokens -= 1
+            self.acquired += 1
+            if wait > 0:
+                self.delayed += 1
+
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    def try_acquire(self) -> bool:
+        """
+        Obtiene un token solo si hay uno disponible ahora, sin esperar
+
+        Returns:
+            bool: True si se obtuvo el token
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens < 1:
+                self.rejected += 1
+                return False
+            self._tokens -= 1
+            self.acquired += 1
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Obtiene el estado del limitador
+
+        Returns:
+            Dict[str, Any]: Tasa, capacidad, tokens disponibles y contadores
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "tokens": round(self._tokens, 3),
+                "acquired": self.acquired,
+                "delayed": self.delayed,
+                "rejected": self.rejected
+            }
+
+
+class AIMDLimiter:
+    """
+    Límite de concurrencia adaptativo (aumento aditivo, reducción multiplicativa)
+
+    Cada consulta correcta con el límite en uso lo sube en 1/limit (≈ +1 por
+    ronda); una señal de sobrecarga (429/503, timeout o latencia por encima
+    del objetivo) lo multiplica por backoff_ratio, como mucho una vez por
+    latencia media para no reaccionar varias veces a la misma ráfaga. Las
+    consultas que superan el límite esperan en una cola acotada.
+    """
+
+    def __init__(self, initial_limit: int = 8, min_limit: int = 1, max_limit: int = 64,
+                 backoff_ratio: float = 0.5, latency_target: Optional[float] = None,
+                 max_queue: int = 256):
+        """
+        Inicializa el limitador
+
+        Args:
+            initial_limit (int): Consultas simultáneas permitidas al empezar
+            min_limit (int): Límite mínimo
+            max_limit (int): Límite máximo
+            backoff_ratio (float): Factor aplicado al límite ante sobrecarga (0-1)
+            latency_target (Optional[float]): Latencia en segundos a partir de la cual
+                una consulta cuenta como señal de sobrecarga (None la ignora)
+            max_queue (int): Consultas que pueden esperar a la vez
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_target = latency_target
+        self.max_queue = max_queue
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+
+        self._in_flight = 0
+        self._waiting = 0
+        self._latency = 0.0  # media móvil exponencial en segundos
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        self.increases = 0
+        self.decreases = 0
+        self.rejected = 0
+        self.expired = 0
+
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        """
+        Obtiene un hueco de concurrencia, esperando en cola si hace falta
+
+        Se rechaza sin esperar si la cola está llena o si el plazo restante es
+        menor que la latencia media (la consulta no llegaría a tiempo).
+
+        Args:
+            deadline (Optional[float]): Instante límite (time.monotonic())
+
+        Returns:
+            bool: True si se obtuvo el hueco (hay que llamar a release)
+        """
+        with self._cond:
+            if self._in_flight < int(self.limit) and not self._waiting:
+                self._in_flight += 1
+                return True
+
+            if self._waiting >= self.max_queue:
+                self.rejected += 1
+                return False
+
+            self._waiting += 1
+            try:
+                while self._in_flight >= int(self.limit):
+                    if deadline is None:
+                        self._cond.wait()
+                        continue
+                    # Esperar solo mientras aún quede tiempo para completar la consulta
+                    budget = deadline - time.monotonic() - self._latency
+                    if budget <= 0:
+                        self.expired += 1
+                        return False
+                    self._cond.wait(budget)
+                self._in_flight += 1
+                return True
+            finally:
+                self._waiting -= 1
+
+    def release(self, latency: float, overloaded: bool = False):
+        """
+        Libera un hueco y ajusta el límite según el resultado de la consulta
+
+        Args:
+            latency (float): Duración de la consulta en segundos
+            overloaded (bool): True si el upstream indicó sobrecarga (429/503, timeout)
+        """
+        with self._cond:
+            in_use = self._in_flight >= int(self.limit)
+            self._in_flight -= 1
+            self._latency = latency if self._latency == 0 else 0.8 * self._latency + 0.2 * latency
+
+            if self.latency_target is not None and latency > self.latency_target:
+                overloaded = True
+
+            now = time.monotonic()
+            if overloaded:
+                if now - self._last_decrease >= self._latency:
+                    self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+                    self._last_decrease = now
+                    self.decreases += 1
+            elif in_use and self.limit < self.max_limit:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                self.increases += 1
+
+            free = int(self.limit) - self._in_flight
+            if free > 0:
+                self._cond.notify(free)
+
+    def cancel(self):
+        """Libera un hueco sin ajustar el límite (la consulta no llegó a enviarse)"""
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Obtiene el estado del limitador
+
+        Returns:
+            Dict[str, Any]: Límite actual, consultas en curso y en cola, latencia
+                media y contadores de ajustes y rechazos
+        """
+        with self._cond:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self._in_flight,
+                "queued": self._waiting,
+                "latency_ms": round(self._latency * 1000, 3),
+                "increases": self.increases,
+                "decreases": self.decreases,
+                "rejected": self.rejected,
+                "expired": self.expired
+            }
+
+
+class HedgePolicy:
+    """
+    Decide cuándo lanzar una segunda consulta (hedge) al upstream
+
+    El retraso es el percentil hedge_percentile de las últimas window
+    latencias correctas, con un mínimo de min_delay; hasta reunir
+    min_samples no se cubre ninguna consulta. Las coberturas se limitan a
+    max_ratio de las consultas para no duplicar la carga cuando el upstream
+    entero se vuelve lento.
+    """
+
+    def __init__(self, percentile: float = 0.95, min_delay: float = 0.05,
+                 max_ratio: float = 0.1, window: int = 256, min_samples: int = 20):
+        """
+        Inicializa la política
+
+        Args:
+            percentile (float): Percentil de latencia tras el que se cubre (0-1)
+            min_delay (float): Retraso mínimo en segundos antes de cubrir
+            max_ratio (float): Fracción máxima de consultas cubiertas
+            window (int): Latencias recientes usadas para estimar el percentil
+            min_samples (int): Latencias necesarias antes de empezar a cubrir
+        """
+        if not 0 < percentile < 1:
+            raise ValueError("El percentil de cobertura debe estar entre 0 y 1")
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._delay: Optional[float] = None
+        self._pending_samples = 0
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedged = 0
+        self.wins = 0
+        self.skipped = 0
+
+    def observe(self, latency: float):
+        """Registra la latencia de una consulta correcta"""
+        with self._lock:
+            self._samples.append(latency)
+            self._pending_samples += 1
+            # Reordenar la ventana cada 16 muestras basta para seguir al percentil
+            if self._pending_samples >= 16 or self._delay is None:
+                self._pending_samples = 0
+                self._delay = self._estimate()
+
+    def _estimate(self) -> Optional[float]:
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered: List[float] = sorted(self._samples)
+        value = ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+        return max(self.min_delay, value)
+
+    def delay(self) -> Optional[float]:
+        """
+        Retraso tras el que cubrir la consulta que empieza
+
+        Returns:
+            Optional[float]: Segundos, o None si aún no hay muestras suficientes
+        """
+        with self._lock:
+            self.requests += 1
+            return self._delay
+
+    def try_hedge(self) -> bool:
+        """
+        Reserva una cobertura si no se ha agotado el presupuesto
+
+        Returns:
+            bool: True si se puede lanzar la segunda consulta
+        """
+        with self._lock:
+            if self.hedged + 1 > self.max_ratio * self.requests:
+                self.skipped += 1
+                return False
+            self.hedged += 1
+            return True
+
+    def record_win(self):
+        """Anota que la cobertura respondió antes que la consulta original"""
+        with self._lock:
+            self.wins += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Obtiene el estado de la política
+
+        Returns:
+            Dict[str, Any]: Retraso actual, consultas, coberturas lanzadas y ganadas
+        """
+        with self._lock:
+            return {
+                "enabled": True,
+                "percentile": self.percentile,
+                "delay_ms": round(self._delay * 1000, 3) if self._delay is not None else None,
+                "samples": len(self._samples),
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "wins": self.wins,
+                "skipped": self.skipped
+            }
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker del upstream (cerrado, abierto, semiabierto)
+
+    Tras failure_threshold fallos consecutivos se abre y rechaza las
+    consultas sin esperar durante reset_timeout segundos; después pasa a
+    semiabierto y deja pasar hasta half_open_max consultas de prueba. Una
+    prueba correcta lo cierra y una fallida lo vuelve a abrir.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 half_open_max: int = 1):
+        """
+        Inicializa el breaker cerrado
+
+        Args:
+            failure_threshold (int): Fallos consecutivos que lo abren
+            reset_timeout (float): Segundos abierto antes de probar de nuevo
+            half_open_max (int): Consultas de prueba simultáneas en semiabierto
+        """
+        if failure_threshold < 1:
+            raise ValueError("El umbral de fallos debe ser al menos 1")
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max = half_open_max
+        self._state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+
+    def _refresh_state(self, now: float):
+        if self._state == CIRCUIT_OPEN and now - self._opened_at >= self.reset_timeout:
+            self._state = CIRCUIT_HALF_OPEN
+            self._probes = 0
+
+    def _open(self, now: float):
+        self._state = CIRCUIT_OPEN
+        self._opened_at = now
+        self.opened += 1
+        logger.warning(
+            f"Circuit breaker abierto tras {self._failures} fallos consecutivos del upstream; "
+            f"se reintentará en {self.reset_timeout:g} s"
+        )
+
+    @property
+    def state(self) -> str:
+        """Estado actual (closed, open o half_open)"""
+        with self._lock:
+            self._refresh_state(time.monotonic())
+            return self._state
+
+    def allow(self) -> bool:
+        """
+        Decide si una consulta puede ir al upstream
+
+        En semiabierto cada consulta admitida es una prueba: hay que anotar su
+        resultado con record() o liberarla con cancel().
+
+        Returns:
+            bool: True si la consulta puede enviarse
+        """
+        with self._lock:
+            self._refresh_state(time.monotonic())
+            if self._state == CIRCUIT_CLOSED:
+                return True
+            if self._state == CIRCUIT_HALF_OPEN and self._probes < self.half_open_max:
+                self._probes += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, failure: bool):
+        """
+        Anota el resultado de una consulta admitida
+
+        Args:
+            failure (bool): True si el upstream falló (conexión, timeout, 5xx, 429)
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._state == CIRCUIT_HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                if failure:
+                    self._open(now)
+                else:
+                    self._state = CIRCUIT_CLOSED
+                    self._failures = 0
+                    logger.info("Circuit breaker cerrado: el upstream vuelve a responder")
+                return
+
+            if not failure:
+                self._failures = 0
+                return
+            self._failures += 1
+            if self._state == CIRCUIT_CLOSED and self._failures >= self.failure_threshold:
+                self._open(now)
+
+    def cancel(self):
+        """Libera una consulta admitida que no llegó a enviarse"""
+        with self._lock:
+            if self._state == CIRCUIT_HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Obtiene el estado del breaker
+
+        Returns:
+            Dict[str, Any]: Estado, fallos consecutivos, segundos hasta la
+                siguiente prueba y contadores de aperturas y rechazos
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refresh_state(now)
+            remaining = self.reset_timeout - (now - self._opened_at) if self._state == CIRCUIT_OPEN else 0.0
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "retry_in_s": round(max(0.0, remaining), 3),
+                "opened": self.opened,
+                "rejected": self.rejected
+            }
@@ -0,0 +1,70 @@
+"""
+Anillo de hashing consistente
+Asigna claves (nombres de ciudad normalizados) a nodos de forma estable: al
+quitar o añadir un nodo solo se reasignan las claves de ese nodo
+"""
+
+import bisect
+import hashlib
+from typing import Dict, Hashable, List, Optional
+
+
+def _hash(value: str) -> int:
+    """Hash estable entre procesos (a diferencia de hash() con PYTHONHASHSEED)"""
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """Anillo de hashing consistente con nodos virtuales"""
+
+    def __init__(self, replicas: int = 64):
+        """
+        Inicializa un anillo vacío
+
+        Args:
+            replicas (int): Nodos virtuales por nodo (más réplicas, reparto más uniforme)
+        """
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._owners: Dict[int, Hashable] = {}
+
+    def add(self, node: Hashable):
+        """Añade un nodo con sus réplicas virtuales"""
+        for replica in range(self.replicas):
+            point = _hash(f"{node}#{replica}")
+            if point not in self._owners:
+                bisect.insort(self._points, point)
+            self._owners[point] = node
+
+    def remove(self, node: Hashable):
+        """Quita un nodo; sus claves pasan al siguiente nodo del anillo"""
+        for replica in range(self.replicas):
+            point = _hash(f"{node}#{replica}")
+            if self._owners.get(point) == node:
+                del self._owners[point]
+                self._points.pop(bisect.bisect_left(self._points, point))
+
+    def get(self, key: str) -> Optional[Hashable]:
+        """
+        Obtiene el nodo propietario de una clave
+
+        Args:
+            key (str): Clave a enrutar
+
+        Returns:
+            Optional[Hashable]: Nodo propietario o None si el anillo está vacío
+        """
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+    def nodes(self) -> List[Hashable]:
+        """Nodos presentes en el anillo"""
+        return sorted(set(self._owners.values()), key=str)
+
+    def __contains__(self, node: Hashable) -> bool:
+        return node in self._owners.values()
+
+    def __len__(self) -> int:
+        return len(set(self._owners.values()))
@@ -0,0 +1,42 @@
+"""
+Codificación JSON para el camino crítico del servidor MCP
+Usa orjson si está instalado y, si no, la biblioteca estándar json; en ambos
+casos produce JSON compacto en UTF-8 como bytes
+"""
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+
+if orjson is not None:
+    CODEC_NAME = "orjson"
+
+    def dumps(obj: Any) -> bytes:
+        """Serializa obj a JSON compacto (bytes UTF-8)"""
+        return orjson.dumps(obj)
+
+    def loads(data: Union[bytes, str]) -> Any:
+        """Parsea un documento JSON desde bytes o str"""
+        return orjson.loads(data)
+
+else:
+    CODEC_NAME = "json"
+
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+    def dumps(obj: Any) -> bytes:
+        """Serializa obj a JSON compacto (bytes UTF-8)"""
+        return _encoder.encode(obj).encode("utf-8")
+
+    def loads(data: Union[bytes, str]) -> Any:
+        """Parsea un documento JSON desde bytes o str"""
+        return json.loads(data)
+
+
+# Error lanzado por loads ante JSON o UTF-8 inválidos (ambos códecs derivan de ValueError)
+DecodeError = ValueError
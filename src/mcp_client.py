@@ -3,81 +3,406 @@ Cliente MCP (Model Context Protocol) para comunicación con el servidor
 Implementa el protocolo MCP oficial con transporte stdio/JSON-RPC
 """
 
+import asyncio
 import json
 import subprocess
 import sys
 import os
 import logging
-from typing import Dict, Any, Optional, List
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, Optional, List, Tuple, Callable, Iterator
 from pathlib import Path
+from cancellation import CancelToken, RequestCancelled, CANCELLED_ERROR
+from city_names import normalize_city
+from hash_ring import HashRing
+from tracing import Tracer, tracer_from_env
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Versión del protocolo MCP solicitada al servidor (con structuredContent)
+PROTOCOL_VERSION = "2025-06-18"
+
 
 class MCPClient:
-    """Cliente MCP que se comunica con el servidor via subprocess stdio"""
+    """
+    Cliente MCP que se comunica con el servidor via subprocess stdio
+    
+    Admite varias solicitudes en vuelo a la vez: las escrituras se serializan
+    con un lock y un hilo lector dedicado entrega cada respuesta al futuro de
+    su llamador según el id JSON-RPC.
+    """
     
-    def __init__(self, server_script_path: str):
+    def __init__(self, server_script_path: str, server_args: Optional[List[str]] = None,
+                 request_timeout: Optional[float] = 30, tracer: Optional[Tracer] = None):
         """
         Inicializa el cliente MCP
         
         Args:
             server_script_path (str): Ruta al script del servidor MCP
+            server_args (Optional[List[str]]): Argumentos adicionales para el servidor
+            request_timeout (Optional[float]): Timeout por defecto de cada solicitud en segundos
+            tracer (Optional[Tracer]): Tracer que propaga el traceparent en _meta
+                (por defecto configurado con WEATHER_TRACE_FILE / WEATHER_TRACE_SAMPLE)
         """
         self.server_script_path = server_script_path
+        self.server_args = list(server_args or [])
+        self.request_timeout = request_timeout
         self.process = None
         self.initialized = False
+        self.protocol_version = None
         self.request_id = 0
+        
+        self._id_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._pending: Dict[int, Future] = {}
+        self._progress_handlers: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+        self._pending_lock = threading.Lock()
+        self._reader_thread: Optional[threading.Thread] = None
+        # Instante (tiempo de pared) en que se lanzó el proceso e informe de arranque
+        self._spawned_at: Optional[float] = None
+        self.startup_report: Optional[Dict[str, float]] = None
+        self.tracer = tracer if tracer is not None else tracer_from_env("weather-mcp-client")
     
     def _get_next_request_id(self) -> int:
         """Obtiene el siguiente ID de solicitud"""
-        self.request_id += 1
-        return self.request_id
+        with self._id_lock:
+            self.request_id += 1
+            return self.request_id
+    
+    def _build_request(self, method: str, params: Dict[str, Any] = None,
+                       timeout: Optional[float] = None) -> Tuple[Dict[str, Any], Future]:
+        """Crea una solicitud JSON-RPC con id nuevo y registra su futuro pendiente"""
+        request_id = self._get_next_request_id()
+        # Contexto de traza W3C en _meta: el span activo (o una raíz nueva) es el padre
+        params = dict(params or {})
+        meta = dict(params.get("_meta") or {})
+        meta.setdefault("traceparent", self.tracer.traceparent())
+        # Plazo de la solicitud: el servidor descarta el trabajo que no llegaría a tiempo
+        if timeout is not None:
+            meta["timeoutMs"] = max(1, int(timeout * 1000))
+        params["_meta"] = meta
+        
+        request = {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "method": method,
+            "params": params
+        }
+        
+        future = Future()
+        with self._pending_lock:
+            self._pending[request_id] = future
+        
+        return request, future
+    
+    def _write_line(self, payload: Any, request_ids: List[int]):
+        """Escribe un mensaje en stdin del servidor; si falla olvida sus solicitudes"""
+        line = json.dumps(payload) + "\n"
+        try:
+            with self._write_lock:
+                self.process.stdin.write(line)
+                self.process.stdin.flush()
+        except Exception:
+            for request_id in request_ids:
+                self._discard_pending(request_id)
+            raise
     
-    def _send_request(self, method: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
+    def _submit(self, method: str, params: Dict[str, Any] = None,
+                timeout: Optional[float] = None) -> Tuple[int, Future]:
         """
-        Envía una solicitud JSON-RPC al servidor
+        Envía una solicitud JSON-RPC sin esperar la respuesta
         
         Args:
             method (str): Método JSON-RPC
             params (Dict[str, Any]): Parámetros de la solicitud
+            timeout (Optional[float]): Plazo que se comunica al servidor en _meta.timeoutMs
             
         Returns:
-            Dict[str, Any]: Respuesta del servidor
+            Tuple[int, Future]: Id de la solicitud y futuro que recibirá la respuesta
         """
         if not self.process:
             raise RuntimeError("Cliente no conectado al servidor")
         
-        request = {
-            "jsonrpc": "2.0",
-            "id": self._get_next_request_id(),
-            "method": method
-        }
-        
-        if params:
-            request["params"] = params
+        request, future = self._build_request(method, params, timeout)
         
         # Enviar solicitud
-        request_json = json.dumps(request) + "\n"
-        self.process.stdin.write(request_json)
-        self.process.stdin.flush()
+        self._write_line(request, [request["id"]])
+        return request["id"], future
+    
+    def _discard_pending(self, request_id: int):
+        """Olvida una solicitud pendiente; su respuesta tardía se descartará"""
+        with self._pending_lock:
+            self._pending.pop(request_id, None)
+    
+    def _cancel_request(self, request_id: int, reason: str):
+        """
+        Deja de esperar una solicitud y pide al servidor que la abandone
         
-        # Leer respuesta
-        response_line = self.process.stdout.readline()
-        if not response_line:
-            raise RuntimeError("No se recibió respuesta del servidor")
+        Si la respuesta ya llegó no se hace nada. El futuro pendiente falla con
+        RequestCancelled y la respuesta tardía, si llega, se descarta.
         
-        response = json.loads(response_line)
+        Args:
+            request_id (int): Id de la solicitud
+            reason (str): Motivo enviado en notifications/cancelled
+        """
+        with self._pending_lock:
+            future = self._pending.pop(request_id, None)
+        if future is None:
+            return
+        if not future.done():
+            future.set_exception(RequestCancelled(f"Solicitud {request_id} cancelada: {reason}"))
         
-        # Verificar si hay error en la respuesta
+        try:
+            self._write_line({
+                "jsonrpc": "2.0",
+                "method": "notifications/cancelled",
+                "params": {"requestId": request_id, "reason": reason}
+            }, [])
+        except Exception as e:
+            # Sin servidor no hay nada que cancelar
+            logger.debug(f"No se pudo enviar la cancelación de {request_id}: {e}")
+    
+    def _effective_timeout(self, timeout: Optional[float],
+                           cancel_token: Optional[CancelToken] = None) -> Optional[float]:
+        """Timeout de la solicitud: el indicado (o request_timeout) acotado por el plazo del token"""
+        wait_timeout = timeout if timeout is not None else self.request_timeout
+        remaining = cancel_token.remaining() if cancel_token is not None else None
+        if remaining is not None and (wait_timeout is None or remaining < wait_timeout):
+            return remaining
+        return wait_timeout
+    
+    def _bind_cancel(self, request_id: int,
+                     cancel_token: Optional[CancelToken]) -> Optional[Callable[[], None]]:
+        """Cancela la solicitud cuando se cancele el token; devuelve la función que lo desvincula"""
+        if cancel_token is None:
+            return None
+        return cancel_token.add_callback(
+            lambda: self._cancel_request(request_id, cancel_token.reason or "cancelled")
+        )
+    
+    @staticmethod
+    def _check_response(response: Dict[str, Any]) -> Dict[str, Any]:
+        """Lanza RuntimeError si la respuesta JSON-RPC contiene un error"""
         if "error" in response:
             error = response["error"]
             raise RuntimeError(f"Error del servidor: {error.get('message', 'Error desconocido')}")
-        
         return response
     
+    def _send_request(self, method: str, params: Dict[str, Any] = None,
+                      timeout: Optional[float] = None,
+                      cancel_token: Optional[CancelToken] = None) -> Dict[str, Any]:
+        """
+        Envía una solicitud JSON-RPC al servidor y espera su respuesta
+        
+        Si vence el timeout o se cancela el token, el servidor recibe
+        notifications/cancelled y la respuesta tardía se descarta.
+        
+        Args:
+            method (str): Método JSON-RPC
+            params (Dict[str, Any]): Parámetros de la solicitud
+            timeout (Optional[float]): Timeout en segundos (por defecto request_timeout)
+            cancel_token (Optional[CancelToken]): Token para cancelar la solicitud
+                desde otro hilo (su plazo, si tiene, acota el timeout)
+            
+        Returns:
+            Dict[str, Any]: Respuesta del servidor
+            
+        Raises:
+            TimeoutError: Si no hay respuesta antes del timeout
+            RequestCancelled: Si se canceló el token
+        """
+        with self.tracer.span(f"mcp.client {method}", kind="CLIENT", tags=self._span_tags(method, params)):
+            wait_timeout = self._effective_timeout(timeout, cancel_token)
+            request_id, future = self._submit(method, params, wait_timeout)
+            unbind = self._bind_cancel(request_id, cancel_token)
+            
+            try:
+                response = future.result(wait_timeout)
+            except FutureTimeoutError:
+                self._cancel_request(request_id, "timeout")
+                raise TimeoutError(f"Timeout esperando respuesta a {method} (id {request_id})")
+            finally:
+                if unbind is not None:
+                    unbind()
+            
+            return self._check_response(response)
+    
+    @staticmethod
+    def _span_tags(method: str, params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Etiquetas del span de cliente: método y, en tools/call, la herramienta"""
+        tags = {"rpc.method": method}
+        if method == "tools/call" and params:
+            tags["mcp.tool"] = params.get("name")
+        return tags
+    
+    def send_batch(self, calls: List[Tuple[str, Optional[Dict[str, Any]]]],
+                   timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Envía varias solicitudes en un único lote JSON-RPC 2.0
+        
+        Amortiza el framing, el flush y las llamadas al sistema de todas las
+        solicitudes en una sola escritura. A diferencia de _send_request no
+        lanza excepción por respuestas con error: cada una se devuelve tal cual.
+        
+        Args:
+            calls (List[Tuple[str, Optional[Dict[str, Any]]]]): Pares (método, parámetros)
+            timeout (Optional[float]): Timeout en segundos para el lote completo
+            
+        Returns:
+            List[Dict[str, Any]]: Respuestas en el mismo orden que las solicitudes
+        """
+        if not self.process:
+            raise RuntimeError("Cliente no conectado al servidor")
+        if not calls:
+            return []
+        
+        wait_timeout = timeout if timeout is not None else self.request_timeout
+        requests = []
+        futures = []
+        for method, params in calls:
+            request, future = self._build_request(method, params, wait_timeout)
+            requests.append(request)
+            futures.append(future)
+        
+        request_ids = [request["id"] for request in requests]
+        self._write_line(requests, request_ids)
+        
+        deadline = None if wait_timeout is None else time.monotonic() + wait_timeout
+        responses = []
+        try:
+            for future in futures:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                responses.append(future.result(remaining))
+        except FutureTimeoutError:
+            for request_id in request_ids:
+                self._cancel_request(request_id, "timeout")
+            raise TimeoutError(f"Timeout esperando respuesta a un lote de {len(calls)} solicitudes")
+        
+        return responses
+    
+    async def send_request_async(self, method: str, params: Dict[str, Any] = None,
+                                 timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Versión asyncio de _send_request
+        
+        Args:
+            method (str): Método JSON-RPC
+            params (Dict[str, Any]): Parámetros de la solicitud
+            timeout (Optional[float]): Timeout en segundos (por defecto request_timeout)
+            
+        Returns:
+            Dict[str, Any]: Respuesta del servidor
+        """
+        with self.tracer.span(f"mcp.client {method}", kind="CLIENT", tags=self._span_tags(method, params)):
+            wait_timeout = timeout if timeout is not None else self.request_timeout
+            request_id, future = self._submit(method, params, wait_timeout)
+            
+            try:
+                response = await asyncio.wait_for(asyncio.wrap_future(future), wait_timeout)
+            except asyncio.TimeoutError:
+                self._cancel_request(request_id, "timeout")
+                raise TimeoutError(f"Timeout esperando respuesta a {method} (id {request_id})")
+            except asyncio.CancelledError:
+                # La tarea que esperaba se canceló: el servidor puede abandonar el trabajo
+                self._cancel_request(request_id, "cancelled")
+                raise
+            
+            return self._check_response(response)
+    
+    def _read_responses(self, stdout):
+        """Hilo lector: entrega cada respuesta al futuro pendiente con su id"""
+        try:
+            for line in iter(stdout.readline, ""):
+                line = line.strip()
+                if not line:
+                    continue
+                
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.error(f"Respuesta inválida del servidor: {e}")
+                    continue
+                
+                # Un lote JSON-RPC llega como un array de respuestas
+                for item in (message if isinstance(message, list) else [message]):
+                    if isinstance(item, dict):
+                        self._dispatch_message(item)
+        except (ValueError, OSError):
+            # stdout cerrado durante la desconexión
+            pass
+        finally:
+            self._fail_pending(RuntimeError("No se recibió respuesta del servidor"))
+    
+    def _dispatch_message(self, message: Dict[str, Any]):
+        """Resuelve el futuro asociado al id del mensaje recibido"""
+        if "id" not in message and "method" in message:
+            self._dispatch_notification(message)
+            return
+        
+        with self._pending_lock:
+            future = self._pending.pop(message.get("id"), None)
+        
+        if future is None:
+            logger.debug(f"Respuesta sin solicitud pendiente descartada: id {message.get('id')}")
+        elif not future.done():
+            future.set_result(message)
+    
+    def _dispatch_notification(self, message: Dict[str, Any]):
+        """Entrega una notificación de progreso al manejador registrado para su token"""
+        if message.get("method") != "notifications/progress":
+            logger.debug(f"Notificación ignorada: {message.get('method')}")
+            return
+        
+        params = message.get("params") or {}
+        with self._pending_lock:
+            handler = self._progress_handlers.get(params.get("progressToken"))
+        
+        if handler is not None:
+            try:
+                handler(params)
+            except Exception as e:
+                logger.error(f"Error en manejador de progreso: {e}")
+    
+    def _register_progress(self, handler: Callable[[Dict[str, Any]], None]) -> str:
+        """Registra un manejador de progreso y devuelve su progressToken"""
+        token = f"progress-{self._get_next_request_id()}"
+        with self._pending_lock:
+            self._progress_handlers[token] = handler
+        return token
+    
+    def _unregister_progress(self, token: str):
+        """Elimina el manejador de progreso de un token"""
+        with self._pending_lock:
+            self._progress_handlers.pop(token, None)
+    
+    def _fail_pending(self, error: Exception):
+        """Falla todas las solicitudes pendientes (p. ej. si el servidor terminó)"""
+        with self._pending_lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        
+        for future in pending:
+            if not future.done():
+                future.set_exception(error)
+    
+    @staticmethod
+    def _drain_stderr(stderr):
+        """Consume el stderr del servidor para que su log no llene la tubería"""
+        try:
+            for line in iter(stderr.readline, ""):
+                logger.debug(f"[servidor] {line.rstrip()}")
+        except (ValueError, OSError):
+            pass
+    
+    def is_alive(self) -> bool:
+        """Indica si el proceso del servidor sigue en ejecución"""
+        return self.process is not None and self.process.poll() is None
+    
     def connect(self) -> bool:
         """
         Conecta al servidor MCP
@@ -91,14 +416,25 @@ class MCPClient:
                 raise FileNotFoundError(f"Script del servidor no encontrado: {self.server_script_path}")
             
             # Iniciar proceso del servidor
+            self._spawned_at = time.time()
+            self.startup_report = {}
             self.process = subprocess.Popen(
-                [sys.executable, self.server_script_path],
+                [sys.executable, self.server_script_path] + self.server_args,
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 text=True,
                 bufsize=0
             )
+            self.startup_report["spawn_ms"] = self._elapsed_ms(time.time())
+            
+            self._reader_thread = threading.Thread(
+                target=self._read_responses, args=(self.process.stdout,), daemon=True
+            )
+            self._reader_thread.start()
+            threading.Thread(
+                target=self._drain_stderr, args=(self.process.stderr,), daemon=True
+            ).start()
             
             logger.info("Proceso del servidor MCP iniciado")
             return True
@@ -116,7 +452,7 @@ class MCPClient:
         """
         try:
             response = self._send_request("initialize", {
-                "protocolVersion": "2024-11-05",
+                "protocolVersion": PROTOCOL_VERSION,
                 "capabilities": {},
                 "clientInfo": {
                     "name": "weather-mcp-client",
@@ -125,6 +461,8 @@ class MCPClient:
             })
             
             if "result" in response:
+                self.protocol_version = response["result"].get("protocolVersion")
+                self._record_startup(response["result"])
                 self.initialized = True
                 logger.info("Cliente MCP inicializado correctamente")
                 return True
@@ -136,6 +474,34 @@ class MCPClient:
             logger.error(f"Error inicializando cliente: {e}")
             return False
     
+    def _elapsed_ms(self, timestamp: float) -> float:
+        """Milisegundos transcurridos desde el lanzamiento del proceso hasta timestamp"""
+        return round((timestamp - self._spawned_at) * 1000, 3)
+    
+    def _record_startup(self, result: Dict[str, Any]):
+        """
+        Completa el informe de arranque con la respuesta al primer initialize
+        
+        Todas las fases se expresan en milisegundos acumulados desde el
+        lanzamiento del proceso: spawn (retorno de Popen), interpreter (arranque
+        del intérprete del servidor), imports, construct (MCPServer creado),
+        loop_ready (bucle de lectura listo), initialize (respuesta generada) y
+        total (respuesta recibida por el cliente).
+        """
+        if self._spawned_at is None or self.startup_report is None or "total_ms" in self.startup_report:
+            return
+        
+        received_at = time.time()
+        server = (result.get("_meta") or {}).get("startup") or {}
+        if "started_at" in server:
+            interpreter_ms = self._elapsed_ms(server["started_at"])
+            self.startup_report["interpreter_ms"] = interpreter_ms
+            for phase in ("imports_ms", "construct_ms", "loop_ready_ms", "initialize_ms"):
+                if phase in server:
+                    self.startup_report[phase] = round(interpreter_ms + server[phase], 3)
+        self.startup_report["total_ms"] = self._elapsed_ms(received_at)
+        logger.info(f"Servidor MCP listo en {self.startup_report['total_ms']:.1f} ms")
+    
     def get_available_tools(self) -> List[Dict[str, Any]]:
         """
         Obtiene la lista de herramientas disponibles del servidor
@@ -154,13 +520,34 @@ class MCPClient:
             logger.error(f"Error obteniendo herramientas: {e}")
             return []
     
-    def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    def get_metrics(self, output_format: str = "json") -> Dict[str, Any]:
+        """
+        Obtiene las métricas del servidor (método metrics/get)
+        
+        Args:
+            output_format (str): "json" (instantánea estructurada) o "prometheus"
+                ({"text": ...} en formato de texto de Prometheus)
+            
+        Returns:
+            Dict[str, Any]: Histogramas, contadores y gauges del servidor
+        """
+        if not self.initialized:
+            raise RuntimeError("Cliente no inicializado")
+        
+        response = self._send_request("metrics/get", {"format": output_format})
+        return response.get("result", {})
+    
+    def call_tool(self, tool_name: str, arguments: Dict[str, Any],
+                  timeout: Optional[float] = None,
+                  cancel_token: Optional[CancelToken] = None) -> Dict[str, Any]:
         """
         Llama a una herramienta específica del servidor
         
         Args:
             tool_name (str): Nombre de la herramienta
             arguments (Dict[str, Any]): Argumentos para la herramienta
+            timeout (Optional[float]): Timeout en segundos (por defecto request_timeout)
+            cancel_token (Optional[CancelToken]): Token para cancelar la llamada
             
         Returns:
             Dict[str, Any]: Resultado de la herramienta
@@ -172,7 +559,37 @@ class MCPClient:
             response = self._send_request("tools/call", {
                 "name": tool_name,
                 "arguments": arguments
-            })
+            }, timeout=timeout, cancel_token=cancel_token)
+            
+            return response.get("result", {})
+            
+        except RequestCancelled:
+            raise
+        except Exception as e:
+            logger.error(f"Error llamando herramienta {tool_name}: {e}")
+            raise
+    
+    async def call_tool_async(self, tool_name: str, arguments: Dict[str, Any],
+                              timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Versión asyncio de call_tool
+        
+        Args:
+            tool_name (str): Nombre de la herramienta
+            arguments (Dict[str, Any]): Argumentos para la herramienta
+            timeout (Optional[float]): Timeout en segundos (por defecto request_timeout)
+            
+        Returns:
+            Dict[str, Any]: Resultado de la herramienta
+        """
+        if not self.initialized:
+            raise RuntimeError("Cliente no inicializado")
+        
+        try:
+            response = await self.send_request_async("tools/call", {
+                "name": tool_name,
+                "arguments": arguments
+            }, timeout=timeout)
             
             return response.get("result", {})
             
@@ -180,26 +597,262 @@ class MCPClient:
             logger.error(f"Error llamando herramienta {tool_name}: {e}")
             raise
     
-    def get_weather(self, city: str) -> Dict[str, Any]:
+    @staticmethod
+    def _parse_weather_result(result: Dict[str, Any]) -> Dict[str, Any]:
+        """Extrae los datos meteorológicos del resultado de get_weather"""
+        # Con structuredContent los datos ya vienen parseados
+        if "structuredContent" in result:
+            return result["structuredContent"]
+        
+        # Protocolo clásico: parsear el contenido de texto JSON
+        content = result.get("content", [])
+        if content and content[0].get("type") == "text":
+            return json.loads(content[0]["text"])
+        return {"error": "No se recibieron datos meteorológicos válidos"}
+    
+    @staticmethod
+    def _weather_arguments(arguments: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+        """Añade la proyección de campos opcional a los argumentos de la herramienta"""
+        if fields:
+            arguments["fields"] = list(fields)
+        return arguments
+    
+    def get_weather(self, city: str, timeout: Optional[float] = None,
+                    fields: Optional[List[str]] = None,
+                    cancel_token: Optional[CancelToken] = None) -> Dict[str, Any]:
         """
         Obtiene información meteorológica para una ciudad
         
         Args:
             city (str): Nombre de la ciudad
+            timeout (Optional[float]): Timeout en segundos (por defecto request_timeout)
+            fields (Optional[List[str]]): Campos a devolver (por defecto todos)
+            cancel_token (Optional[CancelToken]): Token para cancelar la consulta
+                (p. ej. cuando el usuario pide otra ciudad)
             
         Returns:
             Dict[str, Any]: Información meteorológica
         """
         try:
-            result = self.call_tool("get_weather", {"city": city})
+            result = self.call_tool(
+                "get_weather", self._weather_arguments({"city": city}, fields),
+                timeout=timeout, cancel_token=cancel_token
+            )
+            return self._parse_weather_result(result)
+        
+        except RequestCancelled:
+            return {"error": CANCELLED_ERROR, "message": "Consulta cancelada"}
+        except Exception as e:
+            logger.error(f"Error obteniendo clima para {city}: {e}")
+            return {"error": f"Error obteniendo clima: {str(e)}"}
+    
+    def get_weather_many(self, cities: List[str], timeout: Optional[float] = None,
+                         fields: Optional[List[str]] = None,
+                         on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                         cancel_token: Optional[CancelToken] = None
+                         ) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtiene información meteorológica para varias ciudades en una sola llamada
+        
+        Args:
+            cities (List[str]): Nombres de las ciudades
+            timeout (Optional[float]): Timeout en segundos (por defecto request_timeout)
+            fields (Optional[List[str]]): Campos a devolver (por defecto todos)
+            on_result (Optional[Callable[[str, Dict[str, Any]], None]]): Se invoca
+                en el hilo del llamador con (ciudad, datos) en cuanto cada ciudad está lista
+            cancel_token (Optional[CancelToken]): Token para cancelar la llamada
             
-            # Parsear el contenido de texto JSON
-            content = result.get("content", [])
-            if content and content[0].get("type") == "text":
-                weather_data = json.loads(content[0]["text"])
-                return weather_data
-            else:
-                return {"error": "No se recibieron datos meteorológicos válidos"}
+        Returns:
+            Dict[str, Dict[str, Any]]: Información meteorológica o error por ciudad
+        """
+        if on_result is not None:
+            weather_by_city = {}
+            for city, weather_data in self.iter_weather_many(cities, timeout=timeout, fields=fields,
+                                                             cancel_token=cancel_token):
+                on_result(city, weather_data)
+                weather_by_city[city] = weather_data
+            return weather_by_city
+        
+        try:
+            result = self.call_tool(
+                "get_weather_many", self._weather_arguments({"cities": list(cities)}, fields),
+                timeout=timeout, cancel_token=cancel_token
+            )
+            return self._parse_weather_batch(result, cities)
+        
+        except RequestCancelled:
+            error = {"error": CANCELLED_ERROR, "message": "Consulta cancelada"}
+            return {city: error for city in cities}
+        except Exception as e:
+            logger.error(f"Error obteniendo clima para {len(cities)} ciudades: {e}")
+            error = {"error": f"Error obteniendo clima: {str(e)}"}
+            return {city: error for city in cities}
+    
+    def iter_weather_many(self, cities: List[str], timeout: Optional[float] = None,
+                          fields: Optional[List[str]] = None,
+                          cancel_token: Optional[CancelToken] = None
+                          ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Obtiene información meteorológica para varias ciudades entregando cada
+        resultado en cuanto el servidor lo notifica (notifications/progress)
+        
+        El tiempo hasta el primer resultado no depende de la ciudad más lenta.
+        Si el servidor no envía progreso, los resultados se entregan al final.
+        Si el consumidor abandona la iteración, vence el timeout o se cancela
+        el token, el servidor deja de consultar las ciudades pendientes.
+        
+        Args:
+            cities (List[str]): Nombres de las ciudades
+            timeout (Optional[float]): Timeout en segundos para la llamada completa
+            fields (Optional[List[str]]): Campos a devolver (por defecto todos)
+            cancel_token (Optional[CancelToken]): Token para cancelar la llamada
+            
+        Yields:
+            Tuple[str, Dict[str, Any]]: Ciudad e información meteorológica o error
+            
+        Raises:
+            TimeoutError: Si la llamada no termina antes del timeout
+            RequestCancelled: Si se canceló el token
+        """
+        if not self.initialized:
+            raise RuntimeError("Cliente no inicializado")
+        
+        wait_timeout = self._effective_timeout(timeout, cancel_token)
+        events = queue.Queue()
+        token = self._register_progress(lambda params: events.put(("progress", params)))
+        request_id, future = self._submit("tools/call", {
+            "name": "get_weather_many",
+            "arguments": self._weather_arguments({"cities": list(cities)}, fields),
+            "_meta": {"progressToken": token}
+        }, wait_timeout)
+        future.add_done_callback(lambda done: events.put(("done", done)))
+        unbind = self._bind_cancel(request_id, cancel_token)
+        
+        deadline = None if wait_timeout is None else time.monotonic() + wait_timeout
+        delivered = set()
+        try:
+            while True:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    kind, item = events.get(timeout=remaining)
+                except queue.Empty:
+                    raise TimeoutError(f"Timeout esperando get_weather_many (id {request_id})")
+                
+                if kind == "progress":
+                    partial = item.get("partialResult") or {}
+                    city = partial.get("query")
+                    if city is not None and city not in delivered:
+                        delivered.add(city)
+                        yield city, partial.get("data", {})
+                    continue
+                
+                if isinstance(item.exception(), RequestCancelled):
+                    raise item.exception()
+                
+                # Respuesta final: entregar las ciudades que no llegaron como progreso
+                try:
+                    response = self._check_response(item.result())
+                    weather_by_city = self._parse_weather_batch(response.get("result", {}), cities)
+                except Exception as e:
+                    logger.error(f"Error obteniendo clima para {len(cities)} ciudades: {e}")
+                    error = {"error": f"Error obteniendo clima: {str(e)}"}
+                    weather_by_city = {city: error for city in cities}
+                
+                for city, weather_data in weather_by_city.items():
+                    if city not in delivered:
+                        delivered.add(city)
+                        yield city, weather_data
+                return
+        finally:
+            if unbind is not None:
+                unbind()
+            self._unregister_progress(token)
+            # Sin efecto si la respuesta ya llegó; si no, el servidor abandona la llamada
+            reason = "timeout" if deadline is not None and time.monotonic() >= deadline else "cancelled"
+            self._cancel_request(request_id, reason)
+    
+    def _parse_weather_batch(self, result: Dict[str, Any], cities: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Convierte el resultado de get_weather_many en un diccionario ciudad -> datos o error"""
+        batch = self._parse_weather_result(result)
+        if "error" in batch and "results" not in batch:
+            return {city: batch for city in cities}
+        
+        weather_by_city = dict(batch.get("results", {}))
+        weather_by_city.update(batch.get("errors", {}))
+        return weather_by_city
+    
+    def get_forecast(self, city: str, date: Optional[str] = None, days: Optional[int] = None,
+                     timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Obtiene el pronóstico diario para una ciudad
+        
+        Args:
+            city (str): Nombre de la ciudad
+            date (Optional[str]): Fecha concreta (AAAA-MM-DD); por defecto todas
+            days (Optional[int]): Número máximo de días a devolver
+            timeout (Optional[float]): Timeout en segundos (por defecto request_timeout)
+            
+        Returns:
+            Dict[str, Any]: Ciudad y lista de días pronosticados, o error
+        """
+        arguments = {"city": city}
+        if date is not None:
+            arguments["date"] = date
+        if days is not None:
+            arguments["days"] = days
+        
+        try:
+            result = self.call_tool("get_forecast", arguments, timeout=timeout)
+            return self._parse_weather_result(result)
+        except Exception as e:
+            logger.error(f"Error obteniendo pronóstico para {city}: {e}")
+            return {"error": f"Error obteniendo pronóstico: {str(e)}"}
+    
+    def get_hourly(self, city: str, date: Optional[str] = None, start_hour: Optional[int] = None,
+                   end_hour: Optional[int] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Obtiene el pronóstico por horas para una ciudad
+        
+        Args:
+            city (str): Nombre de la ciudad
+            date (Optional[str]): Fecha concreta (AAAA-MM-DD); por defecto todas
+            start_hour (Optional[int]): Primera hora incluida (0-23)
+            end_hour (Optional[int]): Última hora incluida (0-23)
+            timeout (Optional[float]): Timeout en segundos (por defecto request_timeout)
+            
+        Returns:
+            Dict[str, Any]: Ciudad y lista de horas pronosticadas, o error
+        """
+        arguments = {"city": city}
+        for name, value in (("date", date), ("start_hour", start_hour), ("end_hour", end_hour)):
+            if value is not None:
+                arguments[name] = value
+        
+        try:
+            result = self.call_tool("get_hourly", arguments, timeout=timeout)
+            return self._parse_weather_result(result)
+        except Exception as e:
+            logger.error(f"Error obteniendo pronóstico horario para {city}: {e}")
+            return {"error": f"Error obteniendo pronóstico: {str(e)}"}
+    
+    async def get_weather_async(self, city: str, timeout: Optional[float] = None,
+                                fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Versión asyncio de get_weather
+        
+        Args:
+            city (str): Nombre de la ciudad
+            timeout (Optional[float]): Timeout en segundos (por defecto request_timeout)
+            fields (Optional[List[str]]): Campos a devolver (por defecto todos)
+            
+        Returns:
+            Dict[str, Any]: Información meteorológica
+        """
+        try:
+            result = await self.call_tool_async(
+                "get_weather", self._weather_arguments({"city": city}, fields), timeout=timeout
+            )
+            return self._parse_weather_result(result)
                 
         except Exception as e:
             logger.error(f"Error obteniendo clima para {city}: {e}")
@@ -209,63 +862,672 @@ class MCPClient:
         """Desconecta del servidor MCP"""
         if self.process:
             try:
+                # Cerrar stdin para que el servidor termine limpiamente
                 self.process.stdin.close()
+                try:
+                    self.process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    self.process.terminate()
+                    self.process.wait(timeout=5)
+                if self._reader_thread is not None:
+                    self._reader_thread.join(timeout=1)
                 self.process.stdout.close()
                 self.process.stderr.close()
-                self.process.terminate()
-                self.process.wait(timeout=5)
                 logger.info("Desconectado del servidor MCP")
             except Exception as e:
                 logger.error(f"Error desconectando: {e}")
             finally:
+                self._fail_pending(RuntimeError("Cliente desconectado del servidor"))
+                self.tracer.flush()
                 self.process = None
+                self._reader_thread = None
                 self.initialized = False
 
 
+class MCPWorkerPool:
+    """
+    Pool de procesos mcp_server.py con afinidad de ciudad
+    
+    Cada ciudad se enruta por hashing consistente de su nombre normalizado,
+    de modo que la caché de cada proceso se mantiene caliente para su parte
+    de las ciudades. Si el propietario está sobrecargado la solicitud va al
+    proceso menos cargado, y si un proceso muere sus ciudades pasan al
+    siguiente del anillo mientras se reinicia en segundo plano.
+    
+    Expone la misma interfaz que MCPClient usada por WeatherMCPClient.
+    """
+    
+    def __init__(self, server_script_path: str, workers: int = 4,
+                 server_args: Optional[List[str]] = None,
+                 request_timeout: Optional[float] = 30, max_inflight: int = 16,
+                 restart: bool = True):
+        """
+        Inicializa el pool (los procesos no se arrancan hasta connect)
+        
+        Args:
+            server_script_path (str): Ruta al script del servidor MCP
+            workers (int): Número de procesos del servidor
+            server_args (Optional[List[str]]): Argumentos adicionales para cada servidor
+            request_timeout (Optional[float]): Timeout por defecto de cada solicitud en segundos
+            max_inflight (int): Solicitudes en vuelo a partir de las que un proceso
+                se considera sobrecargado
+            restart (bool): Reiniciar en segundo plano los procesos que mueran
+        """
+        if workers < 1:
+            raise ValueError("El pool necesita al menos un proceso")
+        
+        self.server_script_path = server_script_path
+        self.server_args = list(server_args or [])
+        self.request_timeout = request_timeout
+        self.max_inflight = max_inflight
+        self.restart = restart
+        self.initialized = False
+        
+        self._workers = [self._new_worker() for _ in range(workers)]
+        self._inflight = [0] * workers
+        self._ring = HashRing()
+        self._lock = threading.Lock()
+        self._restarting = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._routed = 0
+        self._spilled = 0
+        self._rerouted = 0
+        self._restarts = 0
+    
+    def _new_worker(self) -> MCPClient:
+        return MCPClient(self.server_script_path, server_args=self.server_args,
+                         request_timeout=self.request_timeout)
+    
+    @property
+    def protocol_version(self) -> Optional[str]:
+        """Versión de protocolo negociada por el primer proceso disponible"""
+        for index in self._alive():
+            return self._workers[index].protocol_version
+        return None
+    
+    def connect(self) -> bool:
+        """
+        Arranca todos los procesos del servidor
+        
+        Returns:
+            bool: True si arrancó al menos un proceso
+        """
+        return sum(worker.connect() for worker in self._workers) > 0
+    
+    def initialize(self) -> bool:
+        """
+        Inicializa los procesos arrancados y los añade al anillo
+        
+        Returns:
+            bool: True si se inicializó al menos un proceso
+        """
+        with self._lock:
+            for index, worker in enumerate(self._workers):
+                if worker.process and worker.initialize():
+                    self._ring.add(index)
+            self.initialized = len(self._ring) > 0
+        
+        if self.initialized:
+            logger.info(f"Pool MCP inicializado: {len(self._ring)}/{len(self._workers)} procesos")
+        return self.initialized
+    
+    def _alive(self) -> List[int]:
+        return self._ring.nodes()
+    
+    def _acquire(self, key: str) -> int:
+        """Elige el proceso para una clave y cuenta la solicitud en vuelo"""
+        with self._lock:
+            index = self._ring.get(key)
+            if index is None:
+                raise RuntimeError("No hay procesos del servidor disponibles")
+            
+            self._routed += 1
+            if self._inflight[index] >= self.max_inflight:
+                # Propietario sobrecargado: desviar al proceso menos cargado
+                least = min(self._ring.nodes(), key=lambda node: self._inflight[node])
+                if self._inflight[least] < self._inflight[index]:
+                    self._spilled += 1
+                    index = least
+            
+            self._inflight[index] += 1
+            return index
+    
+    def _release(self, index: int):
+        with self._lock:
+            self._inflight[index] -= 1
+    
+    def _call(self, key: str, fn: Callable[[MCPClient], Any]) -> Any:
+        """
+        Ejecuta fn sobre el proceso que corresponde a la clave
+        
+        Si el proceso ha muerto se retira del anillo y la llamada se repite
+        sobre el nuevo propietario.
+        """
+        for _ in range(len(self._workers)):
+            index = self._acquire(key)
+            worker = self._workers[index]
+            try:
+                result = fn(worker)
+            finally:
+                self._release(index)
+            
+            if worker.is_alive():
+                return result
+            
+            self._worker_died(index, worker)
+            with self._lock:
+                self._rerouted += 1
+        
+        raise RuntimeError("No hay procesos del servidor disponibles")
+    
+    def _worker_died(self, index: int, worker: MCPClient):
+        """Retira un proceso muerto del anillo y programa su reinicio"""
+        with self._lock:
+            if self._workers[index] is not worker or index not in self._ring:
+                return
+            self._ring.remove(index)
+            start_restart = self.restart and index not in self._restarting
+            if start_restart:
+                self._restarting.add(index)
+        
+        logger.warning(f"Proceso {index} del servidor MCP terminado; sus ciudades se reasignan")
+        worker.disconnect()
+        if start_restart:
+            threading.Thread(target=self._restart_worker, args=(index,), daemon=True).start()
+    
+    def _restart_worker(self, index: int):
+        """Arranca un proceso nuevo en la posición de uno muerto y lo devuelve al anillo"""
+        worker = self._new_worker()
+        try:
+            if worker.connect() and worker.initialize():
+                with self._lock:
+                    self._workers[index] = worker
+                    self._ring.add(index)
+                    self._restarts += 1
+                logger.info(f"Proceso {index} del servidor MCP reiniciado")
+            else:
+                worker.disconnect()
+                logger.error(f"No se pudo reiniciar el proceso {index} del servidor MCP")
+        finally:
+            with self._lock:
+                self._restarting.discard(index)
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Executor para repartir las consultas de varias ciudades entre procesos"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=len(self._workers), thread_name_prefix="mcp-pool"
+                )
+            return self._executor
+    
+    def _shards(self, cities: List[str]) -> List[List[str]]:
+        """Agrupa las ciudades por proceso propietario"""
+        shards: Dict[Any, List[str]] = {}
+        with self._lock:
+            for city in cities:
+                shards.setdefault(self._ring.get(normalize_city(city)), []).append(city)
+        return list(shards.values())
+    
+    def get_available_tools(self) -> List[Dict[str, Any]]:
+        """
+        Obtiene la lista de herramientas disponibles del servidor
+        
+        Returns:
+            List[Dict[str, Any]]: Lista de herramientas disponibles
+        """
+        return self._call("", lambda worker: worker.get_available_tools())
+    
+    def get_weather(self, city: str, timeout: Optional[float] = None,
+                    fields: Optional[List[str]] = None,
+                    cancel_token: Optional[CancelToken] = None) -> Dict[str, Any]:
+        """
+        Obtiene información meteorológica para una ciudad desde su proceso propietario
+        
+        Args:
+            city (str): Nombre de la ciudad
+            timeout (Optional[float]): Timeout en segundos (por defecto request_timeout)
+            fields (Optional[List[str]]): Campos a devolver (por defecto todos)
+            cancel_token (Optional[CancelToken]): Token para cancelar la consulta
+            
+        Returns:
+            Dict[str, Any]: Información meteorológica
+        """
+        try:
+            return self._call(
+                normalize_city(city),
+                lambda worker: worker.get_weather(city, timeout=timeout, fields=fields,
+                                                  cancel_token=cancel_token)
+            )
+        except RuntimeError as e:
+            return {"error": f"Error obteniendo clima: {str(e)}"}
+    
+    def get_weather_many(self, cities: List[str], timeout: Optional[float] = None,
+                         fields: Optional[List[str]] = None,
+                         on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                         cancel_token: Optional[CancelToken] = None
+                         ) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtiene información meteorológica para varias ciudades repartidas por proceso
+        
+        Args:
+            cities (List[str]): Nombres de las ciudades
+            timeout (Optional[float]): Timeout en segundos (por defecto request_timeout)
+            fields (Optional[List[str]]): Campos a devolver (por defecto todos)
+            on_result (Optional[Callable[[str, Dict[str, Any]], None]]): Se invoca
+                en el hilo del llamador con (ciudad, datos) en cuanto cada ciudad está lista
+            cancel_token (Optional[CancelToken]): Token para cancelar la llamada
+            
+        Returns:
+            Dict[str, Dict[str, Any]]: Información meteorológica o error por ciudad
+        """
+        weather_by_city = {}
+        for city, weather_data in self.iter_weather_many(cities, timeout=timeout, fields=fields,
+                                                         cancel_token=cancel_token):
+            if on_result is not None:
+                on_result(city, weather_data)
+            weather_by_city[city] = weather_data
+        return weather_by_city
+    
+    def iter_weather_many(self, cities: List[str], timeout: Optional[float] = None,
+                          fields: Optional[List[str]] = None,
+                          cancel_token: Optional[CancelToken] = None
+                          ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Obtiene información meteorológica para varias ciudades a medida que está lista
+        
+        Cada proceso recibe una sola llamada get_weather_many con sus ciudades.
+        
+        Args:
+            cities (List[str]): Nombres de las ciudades
+            timeout (Optional[float]): Timeout en segundos para cada proceso
+            fields (Optional[List[str]]): Campos a devolver (por defecto todos)
+            cancel_token (Optional[CancelToken]): Token para cancelar las llamadas
+            
+        Yields:
+            Tuple[str, Dict[str, Any]]: Ciudad e información meteorológica o error
+        """
+        events = queue.Queue()
+        
+        def partial(city: str, weather_data: Dict[str, Any]):
+            # Los errores esperan al resultado final por si el proceso muere y se reintenta
+            if "error" not in weather_data:
+                events.put((city, weather_data))
+        
+        def run_shard(shard: List[str]) -> Dict[str, Dict[str, Any]]:
+            try:
+                return self._call(normalize_city(shard[0]), lambda worker: worker.get_weather_many(
+                    shard, timeout=timeout, fields=fields, on_result=partial, cancel_token=cancel_token
+                ))
+            except RequestCancelled:
+                error = {"error": CANCELLED_ERROR, "message": "Consulta cancelada"}
+                return {city: error for city in shard}
+            except Exception as e:
+                # Cualquier fallo del proceso se entrega como error de sus ciudades
+                error = {"error": f"Error obteniendo clima: {str(e)}"}
+                return {city: error for city in shard}
+        
+        unique = list(dict.fromkeys(cities))
+        shards = self._shards(unique)
+        executor = self._get_executor()
+        for shard in shards:
+            executor.submit(lambda shard=shard: events.put((None, run_shard(shard))))
+        
+        # Cota de la espera total: cada proceso puede agotar su timeout y
+        # reintentarse sobre los demás (ver _call)
+        call_timeout = timeout if timeout is not None else self.request_timeout
+        deadline = None
+        if call_timeout is not None:
+            deadline = time.monotonic() + call_timeout * max(1, len(self._workers))
+        
+        delivered = set()
+        remaining = len(shards)
+        while remaining:
+            wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                city, item = events.get(timeout=wait)
+            except queue.Empty:
+                error = {"error": "Error obteniendo clima: timeout esperando a los procesos del servidor"}
+                for city in unique:
+                    if city not in delivered:
+                        yield city, error
+                return
+            if city is not None:
+                if city not in delivered:
+                    delivered.add(city)
+                    yield city, item
+                continue
+            
+            remaining -= 1
+            for city, weather_data in item.items():
+                if city not in delivered:
+                    delivered.add(city)
+                    yield city, weather_data
+    
+    def get_forecast(self, city: str, date: Optional[str] = None, days: Optional[int] = None,
+                     timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Obtiene el pronóstico diario para una ciudad desde su proceso propietario
+        
+        Args:
+            city (str): Nombre de la ciudad
+            date (Optional[str]): Fecha concreta (AAAA-MM-DD); por defecto todas
+            days (Optional[int]): Número máximo de días a devolver
+            timeout (Optional[float]): Timeout en segundos (por defecto request_timeout)
+            
+        Returns:
+            Dict[str, Any]: Ciudad y lista de días pronosticados, o error
+        """
+        try:
+            return self._call(
+                normalize_city(city),
+                lambda worker: worker.get_forecast(city, date=date, days=days, timeout=timeout)
+            )
+        except RuntimeError as e:
+            return {"error": f"Error obteniendo pronóstico: {str(e)}"}
+    
+    def get_hourly(self, city: str, date: Optional[str] = None, start_hour: Optional[int] = None,
+                   end_hour: Optional[int] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Obtiene el pronóstico por horas para una ciudad desde su proceso propietario
+        
+        Args:
+            city (str): Nombre de la ciudad
+            date (Optional[str]): Fecha concreta (AAAA-MM-DD); por defecto todas
+            start_hour (Optional[int]): Primera hora incluida (0-23)
+            end_hour (Optional[int]): Última hora incluida (0-23)
+            timeout (Optional[float]): Timeout en segundos (por defecto request_timeout)
+            
+        Returns:
+            Dict[str, Any]: Ciudad y lista de horas pronosticadas, o error
+        """
+        try:
+            return self._call(
+                normalize_city(city),
+                lambda worker: worker.get_hourly(city, date=date, start_hour=start_hour,
+                                                 end_hour=end_hour, timeout=timeout)
+            )
+        except RuntimeError as e:
+            return {"error": f"Error obteniendo pronóstico: {str(e)}"}
+    
+    async def get_weather_async(self, city: str, timeout: Optional[float] = None,
+                                fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Versión asyncio de get_weather
+        
+        Args:
+            city (str): Nombre de la ciudad
+            timeout (Optional[float]): Timeout en segundos (por defecto request_timeout)
+            fields (Optional[List[str]]): Campos a devolver (por defecto todos)
+            
+        Returns:
+            Dict[str, Any]: Información meteorológica
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(), lambda: self.get_weather(city, timeout=timeout, fields=fields)
+        )
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Obtiene estadísticas de enrutado del pool
+        
+        Returns:
+            Dict[str, Any]: Procesos vivos, solicitudes en vuelo y contadores de enrutado
+        """
+        with self._lock:
+            return {
+                "workers": len(self._workers),
+                "alive": len(self._ring),
+                "inflight": list(self._inflight),
+                "routed": self._routed,
+                "spilled": self._spilled,
+                "rerouted": self._rerouted,
+                "restarts": self._restarts
+            }
+    
+    def disconnect(self):
+        """Detiene todos los procesos del servidor"""
+        with self._lock:
+            for index in self._ring.nodes():
+                self._ring.remove(index)
+            executor, self._executor = self._executor, None
+            self.restart = False
+        
+        if executor is not None:
+            executor.shutdown(wait=False)
+        for worker in self._workers:
+            worker.disconnect()
+        self.initialized = False
+
+
 class WeatherMCPClient:
     """Cliente de conveniencia para consultas meteorológicas"""
     
-    def __init__(self):
+    def __init__(self, workers: Optional[int] = None, standby: bool = False):
+        """
+        Inicializa el cliente
+        
+        Args:
+            workers (Optional[int]): Procesos del servidor; con más de uno se usa un
+                MCPWorkerPool con afinidad de ciudad (por defecto WEATHER_MCP_WORKERS o 1)
+            standby (bool): Mantener un servidor de reserva ya inicializado para que
+                las reconexiones sean inmediatas (solo con un proceso)
+        """
+        if workers is None:
+            workers = int(os.environ.get("WEATHER_MCP_WORKERS", "1"))
+        
         # Obtener la ruta del script del servidor
         current_dir = Path(__file__).parent
-        server_script = current_dir / "mcp_server.py"
-        self.client = MCPClient(str(server_script))
+        self._server_script = str(current_dir / "mcp_server.py")
+        # Servidor en modo asíncrono para aprovechar las solicitudes en vuelo
+        if workers > 1:
+            self.client = MCPWorkerPool(self._server_script, workers=workers, server_args=["--async"])
+        else:
+            self.client = self._new_client()
         self.connected = False
+        self._connect_lock = threading.Lock()
+        
+        # Servidor de reserva: se prepara en segundo plano tras cada conexión
+        self.standby = standby and workers <= 1
+        self._spare: Optional[MCPClient] = None
+        self._spare_lock = threading.Lock()
+        self._closed = False
+        self._from_standby = False
+        self._connect_ms: Optional[float] = None
+    
+    def _new_client(self) -> MCPClient:
+        return MCPClient(self._server_script, server_args=["--async"])
     
     def connect(self) -> bool:
         """
         Conecta al servidor meteorológico
         
+        Si hay un servidor de reserva listo se usa directamente, sin esperar al
+        arranque de un proceso nuevo.
+        
         Returns:
             bool: True si la conexión fue exitosa
         """
-        if self.client.connect() and self.client.initialize():
-            self.connected = True
-            logger.info("Conectado al servidor meteorológico MCP")
-            return True
-        return False
+        started = time.perf_counter()
+        with self._spare_lock:
+            spare, self._spare = self._spare, None
+        
+        if spare is not None and spare.is_alive():
+            self.client = spare
+            self._from_standby = True
+        elif self.client.connect() and self.client.initialize():
+            self._from_standby = False
+        else:
+            return False
+        
+        self.connected = True
+        self._connect_ms = round((time.perf_counter() - started) * 1000, 3)
+        logger.info(
+            f"Conectado al servidor meteorológico MCP en {self._connect_ms:.1f} ms"
+            + (" (servidor de reserva)" if self._from_standby else "")
+        )
+        if self.standby:
+            self._prepare_standby()
+        return True
+    
+    def _prepare_standby(self):
+        """Arranca e inicializa en segundo plano el siguiente servidor de reserva"""
+        def prepare():
+            spare = self._new_client()
+            if not (spare.connect() and spare.initialize()):
+                spare.disconnect()
+                return
+            with self._spare_lock:
+                keep = not self._closed and self._spare is None
+                if keep:
+                    self._spare = spare
+            if not keep:
+                spare.disconnect()
+        
+        threading.Thread(target=prepare, daemon=True).start()
+    
+    def startup_report(self) -> Dict[str, Any]:
+        """
+        Informe de dónde se fue el tiempo de la última conexión
+        
+        Returns:
+            Dict[str, Any]: Fases de arranque del proceso en milisegundos desde su
+                lanzamiento (ver MCPClient._record_startup), connect_ms (lo que esperó
+                connect) y standby (True si se usó un servidor de reserva)
+        """
+        report = dict(getattr(self.client, "startup_report", None) or {})
+        report["connect_ms"] = self._connect_ms
+        report["standby"] = self._from_standby
+        return report
     
-    def get_weather(self, city: str) -> Dict[str, Any]:
+    def get_weather(self, city: str, cancel_token: Optional[CancelToken] = None) -> Dict[str, Any]:
         """
         Obtiene información meteorológica para una ciudad
         
         Args:
             city (str): Nombre de la ciudad
+            cancel_token (Optional[CancelToken]): Token para cancelar la consulta
+                (el servidor deja de trabajar en ella)
             
         Returns:
             Dict[str, Any]: Información meteorológica
         """
-        if not self.connected:
-            if not self.connect():
-                return {"error": "No se pudo conectar al servidor"}
+        if not self._ensure_connected():
+            return {"error": "No se pudo conectar al servidor"}
+        
+        return self.client.get_weather(city, cancel_token=cancel_token)
+    
+    def get_weather_many(self, cities: List[str],
+                         cancel_token: Optional[CancelToken] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtiene información meteorológica para varias ciudades en una sola llamada
+        
+        Args:
+            cities (List[str]): Nombres de las ciudades
+            cancel_token (Optional[CancelToken]): Token para cancelar la llamada
+            
+        Returns:
+            Dict[str, Dict[str, Any]]: Información meteorológica o error por ciudad
+        """
+        if not self._ensure_connected():
+            return {city: {"error": "No se pudo conectar al servidor"} for city in cities}
+        
+        return self.client.get_weather_many(cities, cancel_token=cancel_token)
+    
+    def iter_weather_many(self, cities: List[str],
+                          cancel_token: Optional[CancelToken] = None
+                          ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Obtiene información meteorológica para varias ciudades a medida que está lista
         
-        return self.client.get_weather(city)
+        Args:
+            cities (List[str]): Nombres de las ciudades
+            cancel_token (Optional[CancelToken]): Token para cancelar la llamada
+            
+        Yields:
+            Tuple[str, Dict[str, Any]]: Ciudad e información meteorológica o error
+        """
+        if not self._ensure_connected():
+            for city in cities:
+                yield city, {"error": "No se pudo conectar al servidor"}
+            return
+        
+        yield from self.client.iter_weather_many(cities, cancel_token=cancel_token)
+    
+    def get_forecast(self, city: str, date: Optional[str] = None,
+                     days: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Obtiene el pronóstico diario para una ciudad
+        
+        Args:
+            city (str): Nombre de la ciudad
+            date (Optional[str]): Fecha concreta (AAAA-MM-DD); por defecto todas
+            days (Optional[int]): Número máximo de días a devolver
+            
+        Returns:
+            Dict[str, Any]: Ciudad y lista de días pronosticados, o error
+        """
+        if not self._ensure_connected():
+            return {"error": "No se pudo conectar al servidor"}
+        
+        return self.client.get_forecast(city, date=date, days=days)
+    
+    def get_hourly(self, city: str, date: Optional[str] = None, start_hour: Optional[int] = None,
+                   end_hour: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Obtiene el pronóstico por horas para una ciudad
+        
+        Args:
+            city (str): Nombre de la ciudad
+            date (Optional[str]): Fecha concreta (AAAA-MM-DD); por defecto todas
+            start_hour (Optional[int]): Primera hora incluida (0-23)
+            end_hour (Optional[int]): Última hora incluida (0-23)
+            
+        Returns:
+            Dict[str, Any]: Ciudad y lista de horas pronosticadas, o error
+        """
+        if not self._ensure_connected():
+            return {"error": "No se pudo conectar al servidor"}
+        
+        return self.client.get_hourly(city, date=date, start_hour=start_hour, end_hour=end_hour)
+    
+    async def get_weather_async(self, city: str) -> Dict[str, Any]:
+        """
+        Versión asyncio de get_weather
+        
+        Args:
+            city (str): Nombre de la ciudad
+            
+        Returns:
+            Dict[str, Any]: Información meteorológica
+        """
+        if not self._ensure_connected():
+            return {"error": "No se pudo conectar al servidor"}
+        
+        return await self.client.get_weather_async(city)
+    
+    def _ensure_connected(self) -> bool:
+        """Conecta bajo demanda una sola vez aunque varios hilos consulten a la vez"""
+        if self.connected:
+            return True
+        with self._connect_lock:
+            return self.connected or self.connect()
     
     def disconnect(self):
-        """Desconecta del servidor"""
+        """Desconecta del servidor (el servidor de reserva, si existe, sigue listo)"""
         if self.connected:
             self.client.disconnect()
             self.connected = False
+    
+    def close(self):
+        """Desconecta del servidor y detiene el servidor de reserva"""
+        self.disconnect()
+        with self._spare_lock:
+            self._closed = True
+            spare, self._spare = self._spare, None
+        if spare is not None:
+            spare.disconnect()
 
 
 # Función de conveniencia para uso directo
@@ -293,6 +1555,10 @@ if __name__ == "__main__":
     client = WeatherMCPClient()
     if client.connect():
         print(" Conectado al servidor MCP")
+        report = client.startup_report()
+        phases = ", ".join(f"{phase[:-3]} {value:.1f} ms" for phase, value in report.items()
+                           if phase.endswith("_ms") and value is not None)
+        print(f" Arranque: {phases}")
         
         # Probar herramientas disponibles
         tools = client.client.get_available_tools()
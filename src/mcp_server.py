@@ -3,11 +3,29 @@ Servidor MCP (Model Context Protocol) para información meteorológica
 Implementa el protocolo MCP oficial con transporte stdio/JSON-RPC
 """
 
+import time
+
+# Instante de arranque del intérprete del servidor (antes de las importaciones),
+# en tiempo de pared para que el cliente pueda compararlo con su propio reloj
+PROCESS_STARTED_AT = time.time()
+
+import argparse
 import json
+import os
+import re
 import sys
 import logging
-from typing import Dict, Any, List, Optional
-from weather_service import WeatherService
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Union, Callable
+import json_codec
+from cancellation import CancelToken, activate, current_token
+from metrics import MetricsRegistry
+from prefetch import PopularityTracker, PrefetchScheduler
+from tracing import Tracer, SpanContext, tracer_from_env
+from weather_service import WeatherService, WEATHER_FIELDS, FETCH_MODE_J1
+
+IMPORTS_DONE_AT = time.time()
 
 # Configurar logging a stderr para no interferir con stdio
 logging.basicConfig(
@@ -17,19 +35,237 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Máximo de ciudades aceptadas en una llamada a get_weather_many
+MAX_BATCH_CITIES = 500
+
+# Hilos que ejecutan en paralelo las llamadas tools/call de un lote JSON-RPC
+BATCH_WORKERS = 8
+
+# Métodos y herramientas con etiqueta propia en las métricas (el resto cuenta como "other")
+METRIC_METHODS = ("initialize", "tools/list", "tools/call", "metrics/get",
+                  "notifications/initialized", "notifications/cancelled")
+METRIC_TOOLS = ("get_weather", "get_weather_many", "get_forecast", "get_hourly")
+
+# Código JSON-RPC de las solicitudes cuyo plazo (_meta.timeoutMs) venció
+REQUEST_TIMEOUT_CODE = -32001
+
+# Segundos entre escrituras del fichero de Prometheus (WEATHER_METRICS_FILE)
+METRICS_FILE_INTERVAL = 15
+
+# Versiones del protocolo soportadas (la primera es la más reciente). Desde
+# 2025-06-18 los resultados se envían como structuredContent (con un resumen en content)
+PROTOCOL_VERSIONS = ("2025-06-18", "2024-11-05")
+STRUCTURED_CONTENT_VERSION = "2025-06-18"
+DEFAULT_PROTOCOL_VERSION = "2024-11-05"
+
+# Esquema de salida de get_weather (los errores comparten el mismo objeto)
+WEATHER_OUTPUT_SCHEMA = {
+    "type": "object",
+    "properties": dict(
+        {field: {"type": "string"} for field in WEATHER_FIELDS},
+        error={"type": "string"},
+        message={"type": "string"}
+    )
+}
+
+# Filtro opcional de fecha de las herramientas de pronóstico
+DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+DATE_INPUT_SCHEMA = {
+    "type": "string",
+    "pattern": "^\\d{4}-\\d{2}-\\d{2}$",
+    "description": "Fecha del pronóstico (AAAA-MM-DD); por defecto todas"
+}
+
+# Argumento opcional para proyectar solo algunos campos del resultado
+FIELDS_INPUT_SCHEMA = {
+    "type": "array",
+    "items": {"type": "string", "enum": list(WEATHER_FIELDS)},
+    "description": "Campos a devolver (por defecto todos), p. ej. [\"temperature\", \"condition\"]"
+}
+
 
 class MCPServer:
     """Servidor MCP que implementa el protocolo oficial"""
     
     def __init__(self):
-        self.weather_service = WeatherService()
+        # WEATHER_CACHE_DB activa la caché persistente entre reinicios del servidor
+        # WEATHER_FETCH_MODE=lean pide a wttr.in solo los campos de la condición actual
+        # WEATHER_TRACE_FILE / WEATHER_TRACE_SAMPLE: spans Zipkin v2 en fichero
+        # WEATHER_RATE_LIMIT: consultas por segundo permitidas al upstream
+        # WEATHER_HEDGE_PERCENTILE / WEATHER_BREAKER_THRESHOLD: hedging y circuit
+        # breaker del upstream (0 los desactiva)
+        # WEATHER_CITY_INDEX: fichero JSON con los alias de ciudad aprendidos
+        # WEATHER_PREFETCH_TOP_K / WEATHER_PREFETCH_RATE: ciudades populares que se
+        # revalidan antes de caducar y consultas/s dedicadas a ello (0 desactiva)
+        rate_limit = os.environ.get("WEATHER_RATE_LIMIT")
+        hedge_percentile = float(os.environ.get("WEATHER_HEDGE_PERCENTILE", "0.95"))
+        breaker_threshold = int(os.environ.get("WEATHER_BREAKER_THRESHOLD", "5"))
+        prefetch_top_k = int(os.environ.get("WEATHER_PREFETCH_TOP_K", "32"))
+        prefetch_rate = float(os.environ.get("WEATHER_PREFETCH_RATE", "1"))
+        prefetch = prefetch_top_k > 0 and prefetch_rate > 0
+        self.metrics = MetricsRegistry()
+        self.tracer = tracer_from_env("weather-mcp-server")
+        self.weather_service = WeatherService(
+            store_path=os.environ.get("WEATHER_CACHE_DB"),
+            fetch_mode=os.environ.get("WEATHER_FETCH_MODE", FETCH_MODE_J1),
+            metrics=self.metrics,
+            tracer=self.tracer,
+            rate_limit=float(rate_limit) if rate_limit else None,
+            hedge_percentile=hedge_percentile or None,
+            breaker_threshold=breaker_threshold or None,
+            city_index_path=os.environ.get("WEATHER_CITY_INDEX"),
+            popularity=PopularityTracker() if prefetch else None
+        )
+        self.prefetcher = None
+        if prefetch:
+            self.prefetcher = PrefetchScheduler(self.weather_service, top_k=prefetch_top_k, budget=prefetch_rate)
+        # WEATHER_BASE_URL apunta el servicio a otro upstream (p. ej. el stub de benchmarks/)
+        base_url = os.environ.get("WEATHER_BASE_URL")
+        if base_url:
+            self.weather_service.base_url = base_url.rstrip("/")
         self.initialized = False
+        self.protocol_version = DEFAULT_PROTOCOL_VERSION
+        self.structured_output = False
+        self._write_lock = threading.Lock()
+        # Resultados estáticos (initialize, tools/list) y su codificación en bytes
+        self._static_results: Dict[Any, Dict[str, Any]] = {}
+        self._preencoded: Dict[int, bytes] = {}
+        self._static_lock = threading.Lock()
+        self._batch_executor: Optional[ThreadPoolExecutor] = None
+        self._batch_executor_lock = threading.Lock()
+        # Tokens de cancelación de las tools/call recibidas y aún sin responder
+        self._requests: Dict[Any, CancelToken] = {}
+        self._requests_lock = threading.Lock()
         self.server_info = {
             "name": "weather-mcp-server",
             "version": "1.0.0"
         }
+        # Marcas de arranque (tiempo de pared) para el informe del primer initialize
+        self._startup_marks: Dict[str, float] = {
+            "imports": IMPORTS_DONE_AT,
+            "construct": time.time()
+        }
+        self._warm_up_started = False
+        # WEATHER_METRICS_FILE: fichero .prom que se reescribe periódicamente
+        self.metrics_file = os.environ.get("WEATHER_METRICS_FILE")
+        self._metrics_stop = threading.Event()
+    
+    def _startup_report(self) -> Dict[str, Any]:
+        """
+        Informe de arranque del proceso enviado en _meta del primer initialize
+        
+        Returns:
+            Dict[str, Any]: started_at (tiempo de pared) y milisegundos acumulados
+                desde el arranque del intérprete hasta cada fase
+        """
+        report = {"started_at": PROCESS_STARTED_AT}
+        for phase, mark in self._startup_marks.items():
+            report[f"{phase}_ms"] = round((mark - PROCESS_STARTED_AT) * 1000, 3)
+        return report
     
-    def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+    def _start_warm_up(self):
+        """
+        Precalienta DNS y conexión con el upstream en segundo plano
+        
+        Se lanza después de responder a initialize para que la importación de
+        requests no compita por el GIL con el primer intercambio del protocolo.
+        """
+        if self._warm_up_started or not self.initialized:
+            return
+        self._warm_up_started = True
+        threading.Thread(target=self.weather_service.warm_up, daemon=True).start()
+    
+    def handle_message(self, message: Any) -> Optional[Union[Dict[str, Any], List[Dict[str, Any]]]]:
+        """
+        Maneja un mensaje JSON-RPC: una solicitud, una notificación o un lote
+        
+        Args:
+            message (Any): Mensaje JSON-RPC ya parseado
+            
+        Returns:
+            Optional[Union[Dict[str, Any], List[Dict[str, Any]]]]: Respuesta, lista
+                de respuestas para un lote, o None si no hay nada que responder
+        """
+        if isinstance(message, list):
+            return self.handle_batch(message)
+        
+        if not isinstance(message, dict):
+            return self._create_error_response(-32600, "Invalid Request", None)
+        
+        if not self._is_notification(message) and not self._is_valid_id(message["id"]):
+            return self._create_error_response(-32600, "Invalid Request", None)
+        
+        response = self.handle_request(message)
+        # Las notificaciones no reciben respuesta
+        return None if self._is_notification(message) else response
+    
+    def handle_batch(self, batch: List[Any]) -> Optional[Union[Dict[str, Any], List[Dict[str, Any]]]]:
+        """
+        Maneja un lote JSON-RPC 2.0 (array de solicitudes)
+        
+        Las llamadas tools/call son independientes y se ejecutan en paralelo;
+        el resto de métodos se procesan en orden en el hilo actual. Las
+        respuestas se devuelven en el orden del lote, omitiendo notificaciones.
+        
+        Args:
+            batch (List[Any]): Solicitudes del lote
+            
+        Returns:
+            Optional[Union[Dict[str, Any], List[Dict[str, Any]]]]: Lista de
+                respuestas, error si el lote está vacío, o None si solo hay notificaciones
+        """
+        if not batch:
+            return self._create_error_response(-32600, "Invalid Request", None)
+        
+        logger.info(f"Procesando lote de {len(batch)} solicitudes")
+        
+        slots = []
+        for entry in batch:
+            if not isinstance(entry, dict):
+                slots.append(self._create_error_response(-32600, "Invalid Request", None))
+            elif entry.get("method") == "tools/call":
+                slots.append(self._get_batch_executor().submit(
+                    self._handle_queued, entry, time.perf_counter()
+                ))
+            else:
+                slots.append(self.handle_message(entry))
+        
+        responses = []
+        for slot in slots:
+            response = slot.result() if isinstance(slot, Future) else slot
+            if response is not None:
+                responses.append(response)
+        
+        return responses or None
+    
+    def _get_batch_executor(self) -> ThreadPoolExecutor:
+        """Crea bajo demanda el pool que ejecuta las entradas independientes de un lote"""
+        if self._batch_executor is None:
+            with self._batch_executor_lock:
+                if self._batch_executor is None:
+                    self._batch_executor = ThreadPoolExecutor(
+                        max_workers=BATCH_WORKERS, thread_name_prefix="mcp-batch"
+                    )
+        return self._batch_executor
+    
+    def _handle_queued(self, message: Any, queued_at: float) -> Any:
+        """Maneja un mensaje que esperó en cola y registra el tiempo de espera"""
+        self.metrics.observe("stage_seconds", time.perf_counter() - queued_at, stage="queue_wait")
+        return self.handle_message(message)
+    
+    @staticmethod
+    def _is_notification(message: Dict[str, Any]) -> bool:
+        """Una solicitud sin id es una notificación JSON-RPC"""
+        return "id" not in message
+    
+    @staticmethod
+    def _is_valid_id(request_id: Any) -> bool:
+        """El id JSON-RPC debe ser una cadena, un número o null"""
+        return request_id is None or (
+            isinstance(request_id, (str, int, float)) and not isinstance(request_id, bool)
+        )
+    
+    def handle_request(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
         Maneja una solicitud JSON-RPC del cliente MCP
         
@@ -37,8 +273,121 @@ class MCPServer:
             request (Dict[str, Any]): Solicitud JSON-RPC
             
         Returns:
-            Dict[str, Any]: Respuesta JSON-RPC
+            Optional[Dict[str, Any]]: Respuesta JSON-RPC (None para notificaciones conocidas)
         """
+        method = request.get("method")
+        labels = {"method": method if method in METRIC_METHODS else "other"}
+        if method == "tools/call":
+            params = request.get("params")
+            if not isinstance(params, dict):
+                # El modo asíncrono ya la registró al leerla
+                self._untrack_request(request)
+                self.metrics.inc("request_errors_total", **labels, tool="other")
+                return self._create_error_response(-32602, "Invalid params", request.get("id"))
+            tool_name = params.get("name")
+            labels["tool"] = tool_name if tool_name in METRIC_TOOLS else "other"
+
+        # Dentro de handle_message_bytes ya hay un span de servidor; si no (lotes,
+        # llamadas directas) el span de despacho cuelga del traceparent recibido
+        parent = None if Tracer.current_span() is not None else self._trace_parent(request)
+        
+        metrics = self.metrics
+        token = self.track_request(request) if method == "tools/call" else None
+        if token is not None and token.done():
+            # Cancelada o vencida mientras esperaba en cola: no se ejecuta
+            self._untrack_request(request)
+            return self._abandoned_response(request, token, labels)
+        
+        metrics.add("inflight_requests", 1)
+        started = time.perf_counter()
+        try:
+            with self.tracer.span("dispatch", kind="SERVER" if parent else None,
+                                  parent=parent, tags=labels), activate(token):
+                response = self._dispatch_request(request)
+        finally:
+            metrics.add("inflight_requests", -1)
+            metrics.observe("request_seconds", time.perf_counter() - started, **labels)
+            if token is not None:
+                self._untrack_request(request)
+        
+        if token is not None and token.done():
+            # Nadie espera ya el resultado: no se serializa
+            return self._abandoned_response(request, token, labels)
+        
+        metrics.inc("requests_total", **labels)
+        if response is not None and "error" in response:
+            metrics.inc("request_errors_total", **labels)
+        return response
+    
+    def track_request(self, request: Dict[str, Any]) -> Optional[CancelToken]:
+        """
+        Registra el token de cancelación de una solicitud al recibirla
+        
+        El plazo se calcula desde _meta.timeoutMs en el momento de la llamada,
+        así que el modo asíncrono la llama al leer la línea (el tiempo en cola
+        cuenta). Llamadas repetidas devuelven el mismo token.
+        
+        Args:
+            request (Dict[str, Any]): Solicitud JSON-RPC
+            
+        Returns:
+            Optional[CancelToken]: Token de la solicitud (None si no tiene id)
+        """
+        if self._is_notification(request) or not self._is_valid_id(request["id"]):
+            return None
+        request_id = request["id"]
+        with self._requests_lock:
+            token = self._requests.get(request_id)
+            if token is None:
+                params = request.get("params")
+                meta = params.get("_meta") if isinstance(params, dict) else None
+                timeout_ms = meta.get("timeoutMs") if isinstance(meta, dict) else None
+                valid = isinstance(timeout_ms, (int, float)) and not isinstance(timeout_ms, bool) and timeout_ms > 0
+                token = CancelToken.with_timeout(timeout_ms / 1000 if valid else None)
+                self._requests[request_id] = token
+        return token
+    
+    def _untrack_request(self, request: Dict[str, Any]):
+        if not self._is_valid_id(request.get("id")):
+            return
+        with self._requests_lock:
+            self._requests.pop(request.get("id"), None)
+    
+    def _abandoned_response(self, request: Dict[str, Any], token: CancelToken,
+                            labels: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """
+        Respuesta a una solicitud que ya nadie espera
+        
+        Las canceladas no reciben respuesta (MCP); las vencidas reciben un error
+        corto en lugar del resultado completo.
+        """
+        reason = "cancelled" if token.cancelled else "deadline"
+        self.metrics.inc("requests_abandoned_total", reason=reason, **labels)
+        if reason == "cancelled":
+            return None
+        return self._create_error_response(REQUEST_TIMEOUT_CODE, "Request timed out", request.get("id"))
+    
+    def _handle_cancelled(self, params: Dict[str, Any]):
+        """Marca como cancelada la solicitud indicada en notifications/cancelled"""
+        if not isinstance(params, dict) or not self._is_valid_id(params.get("requestId")):
+            return
+        request_id = params["requestId"]
+        with self._requests_lock:
+            token = self._requests.get(request_id)
+        if token is not None:
+            token.cancel(params.get("reason") or "cancelled")
+            logger.info(f"Solicitud {request_id} cancelada por el cliente")
+    
+    @staticmethod
+    def _trace_parent(message: Dict[str, Any]) -> Optional[SpanContext]:
+        """Contexto de traza recibido en params._meta.traceparent, si existe"""
+        params = message.get("params")
+        if not isinstance(params, dict) or not isinstance(params.get("_meta"), dict):
+            return None
+        return Tracer.extract(params["_meta"].get("traceparent"))
+    
+    def _dispatch_request(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Despacha una solicitud JSON-RPC al manejador de su método"""
         try:
             method = request.get("method")
             params = request.get("params", {})
@@ -52,6 +401,13 @@ class MCPServer:
                 return self._handle_tools_list(request_id)
             elif method == "tools/call":
                 return self._handle_tools_call(params, request_id)
+            elif method == "metrics/get":
+                return self._handle_metrics_get(params, request_id)
+            elif method == "notifications/initialized":
+                return None
+            elif method == "notifications/cancelled":
+                self._handle_cancelled(params)
+                return None
             else:
                 return self._create_error_response(
                     -32601, "Method not found", request_id
@@ -65,23 +421,58 @@ class MCPServer:
     
     def _handle_initialize(self, params: Dict[str, Any], request_id: Any) -> Dict[str, Any]:
         """Maneja la solicitud de inicialización del protocolo MCP"""
+        first = not self.initialized
         self.initialized = True
         
+        # Negociar versión: la pedida si está soportada; si no, la versión clásica
+        requested = params.get("protocolVersion")
+        self.protocol_version = requested if requested in PROTOCOL_VERSIONS else DEFAULT_PROTOCOL_VERSION
+        self.structured_output = self.protocol_version >= STRUCTURED_CONTENT_VERSION
+        
+        version = self.protocol_version
         response = {
             "jsonrpc": "2.0",
             "id": request_id,
-            "result": {
-                "protocolVersion": "2024-11-05",
+            "result": self._static_result(("initialize", version), lambda: {
+                "protocolVersion": version,
                 "capabilities": {
                     "tools": {}
                 },
                 "serverInfo": self.server_info
-            }
+            })
         }
         
+        if first:
+            # Solo la primera respuesta lleva el informe de arranque (no se precodifica)
+            self._startup_marks["initialize"] = time.time()
+            response["result"] = dict(response["result"], _meta={"startup": self._startup_report()})
+        
         logger.info("Servidor MCP inicializado correctamente")
         return response
     
+    def _handle_metrics_get(self, params: Dict[str, Any], request_id: Any) -> Dict[str, Any]:
+        """
+        Maneja metrics/get: histogramas por método y etapa, contadores y gauges
+        
+        Con params {"format": "prometheus"} devuelve {"text": ...} en el formato
+        de texto de Prometheus; por defecto devuelve la instantánea en JSON.
+        """
+        output_format = (params or {}).get("format", "json")
+        if output_format == "prometheus":
+            result = {"text": self.metrics.to_prometheus()}
+        elif output_format == "json":
+            result = self.metrics.snapshot()
+        else:
+            return self._create_error_response(
+                -32602, f"Formato de métricas no soportado: {output_format}", request_id
+            )
+        
+        return {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "result": result
+        }
+    
     def _handle_tools_list(self, request_id: Any) -> Dict[str, Any]:
         """Maneja la solicitud de listar herramientas disponibles"""
         if not self.initialized:
@@ -89,6 +480,21 @@ class MCPServer:
                 -32002, "Server not initialized", request_id
             )
         
+        structured = self.structured_output
+        response = {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "result": self._static_result(
+                ("tools/list", structured), lambda: self._build_tools_list(structured)
+            )
+        }
+        
+        logger.info("Lista de herramientas enviada")
+        return response
+    
+    @staticmethod
+    def _build_tools_list(structured: bool) -> Dict[str, Any]:
+        """Construye el resultado de tools/list (con outputSchema si structured es True)"""
         tools = [
             {
                 "name": "get_weather",
@@ -99,6 +505,68 @@ class MCPServer:
                         "city": {
                             "type": "string",
                             "description": "Nombre de la ciudad para consultar el clima"
+                        },
+                        "fields": FIELDS_INPUT_SCHEMA
+                    },
+                    "required": ["city"]
+                }
+            },
+            {
+                "name": "get_weather_many",
+                "description": "Obtiene información meteorológica para varias ciudades en una sola llamada",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "cities": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "minItems": 1,
+                            "maxItems": MAX_BATCH_CITIES,
+                            "description": "Nombres de las ciudades para consultar el clima"
+                        },
+                        "fields": FIELDS_INPUT_SCHEMA
+                    },
+                    "required": ["cities"]
+                }
+            },
+            {
+                "name": "get_forecast",
+                "description": "Obtiene el pronóstico diario (hasta 3 días) para una ciudad",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "city": {
+                            "type": "string",
+                            "description": "Nombre de la ciudad para consultar el pronóstico"
+                        },
+                        "date": DATE_INPUT_SCHEMA,
+                        "days": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "description": "Número máximo de días a devolver"
+                        }
+                    },
+                    "required": ["city"]
+                }
+            },
+            {
+                "name": "get_hourly",
+                "description": "Obtiene el pronóstico por horas para una ciudad",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "city": {
+                            "type": "string",
+                            "description": "Nombre de la ciudad para consultar el pronóstico"
+                        },
+                        "date": DATE_INPUT_SCHEMA,
+                        "start_hour": {
+                            "type": "integer", "minimum": 0, "maximum": 23,
+                            "description": "Primera hora incluida (por defecto 0)"
+                        },
+                        "end_hour": {
+                            "type": "integer", "minimum": 0, "maximum": 23,
+                            "description": "Última hora incluida (por defecto 23)"
                         }
                     },
                     "required": ["city"]
@@ -106,16 +574,61 @@ class MCPServer:
             }
         ]
         
-        response = {
-            "jsonrpc": "2.0",
-            "id": request_id,
-            "result": {
-                "tools": tools
+        if structured:
+            tools[0]["outputSchema"] = WEATHER_OUTPUT_SCHEMA
+            tools[1]["outputSchema"] = {
+                "type": "object",
+                "properties": {
+                    "results": {"type": "object", "additionalProperties": WEATHER_OUTPUT_SCHEMA},
+                    "errors": {"type": "object", "additionalProperties": WEATHER_OUTPUT_SCHEMA}
+                },
+                "required": ["results", "errors"]
+            }
+            tools[2]["outputSchema"] = {
+                "type": "object",
+                "properties": {
+                    "city": {"type": "string"},
+                    "days": {"type": "array", "items": {"type": "object"}},
+                    "error": {"type": "string"},
+                    "message": {"type": "string"}
+                }
+            }
+            tools[3]["outputSchema"] = {
+                "type": "object",
+                "properties": {
+                    "city": {"type": "string"},
+                    "hours": {"type": "array", "items": {"type": "object"}},
+                    "error": {"type": "string"},
+                    "message": {"type": "string"}
+                }
             }
-        }
         
-        logger.info("Lista de herramientas enviada")
-        return response
+        return {"tools": tools}
+    
+    def _static_result(self, key: Any, build: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Obtiene un resultado estático construido y codificado una sola vez
+        
+        El diccionario devuelto se comparte entre respuestas y no debe
+        modificarse; su codificación en bytes se reutiliza al escribir la
+        respuesta en lugar de volver a serializarlo.
+        
+        Args:
+            key (Any): Identificador del resultado (método y variante negociada)
+            build (Callable[[], Dict[str, Any]]): Función que construye el resultado
+            
+        Returns:
+            Dict[str, Any]: Resultado cacheado
+        """
+        result = self._static_results.get(key)
+        if result is None:
+            with self._static_lock:
+                result = self._static_results.get(key)
+                if result is None:
+                    result = build()
+                    self._preencoded[id(result)] = json_codec.dumps(result)
+                    self._static_results[key] = result
+        return result
     
     def _handle_tools_call(self, params: Dict[str, Any], request_id: Any) -> Dict[str, Any]:
         """Maneja la llamada a una herramienta específica"""
@@ -129,26 +642,19 @@ class MCPServer:
         
         if tool_name == "get_weather":
             city = arguments.get("city")
-            if not city:
+            invalid = self._check_city(city, request_id)
+            if invalid is not None:
+                return invalid
+            
+            fields = arguments.get("fields")
+            if not self._valid_fields(fields):
                 return self._create_error_response(
-                    -32602, "Missing required parameter: city", request_id
+                    -32602, "Invalid parameter: fields", request_id
                 )
             
             try:
-                weather_data = self.weather_service.get_weather(city)
-                
-                response = {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "result": {
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": json.dumps(weather_data, ensure_ascii=False, indent=2)
-                            }
-                        ]
-                    }
-                }
+                weather_data = self._project(self.weather_service.get_weather(city), fields)
+                response = self._create_tool_response(weather_data, request_id)
                 
                 logger.info(f"Información meteorológica enviada para: {city}")
                 return response
@@ -158,11 +664,211 @@ class MCPServer:
                 return self._create_error_response(
                     -32603, f"Error obteniendo información meteorológica: {str(e)}", request_id
                 )
+        elif tool_name == "get_weather_many":
+            progress_token = (params.get("_meta") or {}).get("progressToken")
+            return self._call_get_weather_many(arguments, request_id, progress_token)
+        elif tool_name in ("get_forecast", "get_hourly"):
+            return self._call_forecast_tool(tool_name, arguments, request_id)
         else:
             return self._create_error_response(
                 -32601, f"Unknown tool: {tool_name}", request_id
             )
     
+    def _call_get_weather_many(self, arguments: Dict[str, Any], request_id: Any,
+                               progress_token: Any = None) -> Dict[str, Any]:
+        """
+        Ejecuta la herramienta get_weather_many repartiendo las ciudades en paralelo
+        
+        Si la solicitud incluye _meta.progressToken, cada ciudad se envía como
+        notifications/progress en cuanto está lista, antes de la respuesta final.
+        La respuesta final incluye siempre todas las ciudades, de modo que los
+        clientes que ignoran el progreso no pierden ningún resultado.
+        """
+        cities = arguments.get("cities")
+        if not cities or not isinstance(cities, list):
+            return self._create_error_response(
+                -32602, "Missing required parameter: cities", request_id
+            )
+        if len(cities) > MAX_BATCH_CITIES:
+            return self._create_error_response(
+                -32602, f"Too many cities (max {MAX_BATCH_CITIES})", request_id
+            )
+        if not all(isinstance(city, str) and city.strip() for city in cities):
+            return self._create_error_response(
+                -32602, "Invalid parameter: cities must be non-empty strings", request_id
+            )
+        
+        fields = arguments.get("fields")
+        if not self._valid_fields(fields):
+            return self._create_error_response(
+                -32602, "Invalid parameter: fields", request_id
+            )
+        
+        try:
+            weather_by_city = {}
+            total = len(dict.fromkeys(cities))
+            token = current_token()
+            for city, weather_data in self.weather_service.iter_weather_many(cities):
+                if token is not None and token.done():
+                    # Al abandonar el iterador se descartan las ciudades pendientes
+                    break
+                weather_by_city[city] = weather_data
+                if progress_token is not None:
+                    self._send_progress(progress_token, len(weather_by_city), total, {
+                        "query": city,
+                        "data": weather_data if "error" in weather_data else self._project(weather_data, fields)
+                    })
+        except Exception as e:
+            logger.error(f"Error obteniendo clima para {len(cities)} ciudades: {e}")
+            return self._create_error_response(
+                -32603, f"Error obteniendo información meteorológica: {str(e)}", request_id
+            )
+        
+        results = {}
+        errors = {}
+        for city, weather_data in weather_by_city.items():
+            if "error" in weather_data:
+                errors[city] = weather_data
+            else:
+                results[city] = self._project(weather_data, fields)
+        
+        response = self._create_tool_response({"results": results, "errors": errors}, request_id)
+        
+        logger.info(
+            f"Información meteorológica enviada para {len(results)} ciudades "
+            f"({len(errors)} con error)"
+        )
+        return response
+    
+    def _call_forecast_tool(self, tool_name: str, arguments: Dict[str, Any],
+                            request_id: Any) -> Dict[str, Any]:
+        """Ejecuta get_forecast o get_hourly sobre el payload j1 cacheado"""
+        city = arguments.get("city")
+        invalid = self._check_city(city, request_id)
+        if invalid is not None:
+            return invalid
+        
+        date = arguments.get("date")
+        if date is not None and not (isinstance(date, str) and DATE_PATTERN.match(date)):
+            return self._create_error_response(
+                -32602, "Invalid parameter: date (expected YYYY-MM-DD)", request_id
+            )
+        
+        try:
+            if tool_name == "get_forecast":
+                days = arguments.get("days")
+                if days is not None and not (isinstance(days, int) and days >= 1):
+                    return self._create_error_response(
+                        -32602, "Invalid parameter: days", request_id
+                    )
+                data = self.weather_service.get_forecast(city, date=date, days=days)
+            else:
+                start_hour = arguments.get("start_hour", 0)
+                end_hour = arguments.get("end_hour", 23)
+                if not all(isinstance(hour, int) and 0 <= hour <= 23 for hour in (start_hour, end_hour)):
+                    return self._create_error_response(
+                        -32602, "Invalid parameter: start_hour/end_hour (0-23)", request_id
+                    )
+                data = self.weather_service.get_hourly(
+                    city, date=date, start_hour=start_hour, end_hour=end_hour
+                )
+        except Exception as e:
+            logger.error(f"Error obteniendo pronóstico para {city}: {e}")
+            return self._create_error_response(
+                -32603, f"Error obteniendo pronóstico: {str(e)}", request_id
+            )
+        
+        logger.info(f"Pronóstico ({tool_name}) enviado para: {city}")
+        return self._create_tool_response(data, request_id)
+    
+    @staticmethod
+    def _valid_fields(fields: Any) -> bool:
+        """Valida el argumento opcional fields de las herramientas meteorológicas"""
+        return fields is None or (
+            isinstance(fields, list) and all(field in WEATHER_FIELDS for field in fields)
+        )
+    
+    @staticmethod
+    def _project(weather_data: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+        """Devuelve solo los campos pedidos (los errores se devuelven completos)"""
+        if not fields or "error" in weather_data:
+            return weather_data
+        return {field: weather_data[field] for field in fields if field in weather_data}
+    
+    def _create_tool_response(self, data: Dict[str, Any], request_id: Any) -> Dict[str, Any]:
+        """
+        Crea la respuesta de tools/call en el formato negociado en initialize
+        
+        Con structuredContent los datos viajan como objeto JSON y se serializan
+        una sola vez junto con la respuesta; content lleva solo un resumen corto
+        para los clientes que no leen structuredContent. Con el protocolo
+        clásico los datos se incrustan en content como texto JSON compacto.
+        isError indica que la herramienta devolvió un error.
+        
+        Args:
+            data (Dict[str, Any]): Resultado de la herramienta
+            request_id (Any): Id de la solicitud
+            
+        Returns:
+            Dict[str, Any]: Respuesta JSON-RPC
+        """
+        if self.structured_output:
+            text = self._summarize_result(data)
+        else:
+            with self.metrics.time("stage_seconds", stage="serialize_content"):
+                text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        result = {
+            "content": [
+                {
+                    "type": "text",
+                    "text": text
+                }
+            ],
+            "isError": "error" in data
+        }
+        if self.structured_output:
+            result["structuredContent"] = data
+        
+        return {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "result": result
+        }
+    
+    @staticmethod
+    def _summarize_result(data: Dict[str, Any]) -> str:
+        """Resumen de una línea del resultado de una herramienta (bloque de texto junto a structuredContent)"""
+        if "error" in data:
+            return f"Error: {data.get('message') or data['error']}"
+        if "results" in data:
+            return f"{len(data['results'])} ciudades con datos, {len(data.get('errors') or {})} con error"
+        city = data.get("city", "")
+        if "days" in data:
+            return f"{city}: pronóstico de {len(data['days'])} días"
+        if "hours" in data:
+            return f"{city}: pronóstico de {len(data['hours'])} horas"
+        details = [
+            f"{data['temperature']}°C" if "temperature" in data else None,
+            data.get("condition"),
+            f"humedad {data['humidity']}%" if "humidity" in data else None
+        ]
+        details = ", ".join(str(detail) for detail in details if detail is not None)
+        if city and details:
+            return f"{city}: {details}"
+        return city or details or "Sin datos"
+    
+    def _check_city(self, city: Any, request_id: Any) -> Optional[Dict[str, Any]]:
+        """Valida el parámetro city antes de normalizarlo; devuelve el error -32602 o None"""
+        if not city:
+            return self._create_error_response(
+                -32602, "Missing required parameter: city", request_id
+            )
+        if not isinstance(city, str):
+            return self._create_error_response(
+                -32602, "Invalid parameter: city must be a string", request_id
+            )
+        return None
+    
     def _create_error_response(self, code: int, message: str, request_id: Any) -> Dict[str, Any]:
         """Crea una respuesta de error JSON-RPC"""
         return {
@@ -174,14 +880,104 @@ class MCPServer:
             }
         }
     
+    def encode_response(self, response: Optional[Union[Dict[str, Any], List[Dict[str, Any]]]]) -> Optional[bytes]:
+        """
+        Codifica una respuesta (o lista de respuestas) JSON-RPC a bytes
+        
+        Los resultados estáticos ya codificados se insertan directamente en
+        el sobre JSON-RPC sin volver a serializarlos.
+        
+        Args:
+            response: Respuesta, lista de respuestas o None
+            
+        Returns:
+            Optional[bytes]: JSON compacto en UTF-8, o None si no hay respuesta
+        """
+        if response is None:
+            return None
+        if isinstance(response, list):
+            return b"[" + b",".join(self.encode_response(item) for item in response) + b"]"
+        
+        result = response.get("result")
+        preencoded = self._preencoded.get(id(result)) if result is not None else None
+        if preencoded is None:
+            return json_codec.dumps(response)
+        return b'{"jsonrpc":"2.0","id":' + json_codec.dumps(response.get("id")) + b',"result":' + preencoded + b"}"
+    
+    def handle_message_bytes(self, message: Any) -> Optional[bytes]:
+        """Maneja un mensaje JSON-RPC y devuelve la respuesta ya codificada"""
+        if not isinstance(message, dict):
+            response = self.handle_message(message)
+            with self.metrics.time("stage_seconds", stage="serialize"):
+                return self.encode_response(response)
+        
+        # Span de servidor que abarca el despacho y la serialización de la respuesta
+        method = message.get("method")
+        with self.tracer.span(f"mcp.server {method if method in METRIC_METHODS else 'other'}",
+                              kind="SERVER", parent=self._trace_parent(message)):
+            response = self.handle_message(message)
+            with self.metrics.time("stage_seconds", stage="serialize"), self.tracer.span("serialize"):
+                return self.encode_response(response)
+    
+    def _handle_queued_bytes(self, message: Any, queued_at: float) -> Optional[bytes]:
+        """handle_message_bytes para mensajes que esperaron en cola (registra la espera)"""
+        self.metrics.observe("stage_seconds", time.perf_counter() - queued_at, stage="queue_wait")
+        return self.handle_message_bytes(message)
+    
+    def _write_bytes(self, data: Optional[bytes]):
+        """Escribe una línea ya codificada en stdout binario (seguro entre hilos y tareas)"""
+        if data is None:
+            return
+        out = sys.stdout.buffer
+        started = time.perf_counter()
+        with self._write_lock:
+            out.write(data + b"\n")
+            out.flush()
+        self.metrics.observe("stage_seconds", time.perf_counter() - started, stage="write")
+    
+    def _send_progress(self, progress_token: Any, progress: int, total: int,
+                       partial_result: Dict[str, Any]):
+        """
+        Envía una notificación notifications/progress con un resultado parcial
+        
+        partialResult es una extensión de este servidor: la especificación MCP
+        solo define progressToken, progress, total y message. Los clientes que
+        no la conocen la ignoran y reciben los mismos datos en la respuesta final.
+        
+        Args:
+            progress_token (Any): Token recibido en _meta.progressToken
+            progress (int): Elementos completados
+            total (int): Total de elementos
+            partial_result (Dict[str, Any]): Resultado del elemento completado
+        """
+        self._write_bytes(json_codec.dumps({
+            "jsonrpc": "2.0",
+            "method": "notifications/progress",
+            "params": {
+                "progressToken": progress_token,
+                "progress": progress,
+                "total": total,
+                "partialResult": partial_result
+            }
+        }))
+    
+    def _write_response(self, response: Optional[Union[Dict[str, Any], List[Dict[str, Any]]]]):
+        """Escribe una respuesta JSON-RPC en stdout (seguro entre hilos y tareas)"""
+        self._write_bytes(self.encode_response(response))
+    
     def run(self):
         """Ejecuta el servidor MCP en modo stdio"""
         logger.info("Iniciando servidor MCP...")
+        self._startup_marks["loop_ready"] = time.time()
+        self._start_metrics_exporter()
+        if self.prefetcher is not None:
+            self.prefetcher.start()
         
         try:
+            stdin = sys.stdin.buffer
             while True:
                 # Leer línea desde stdin
-                line = sys.stdin.readline()
+                line = stdin.readline()
                 if not line:
                     break
                 
@@ -191,35 +987,172 @@ class MCPServer:
                 
                 try:
                     # Parsear JSON-RPC
-                    request = json.loads(line)
-                    
-                    # Procesar solicitud
-                    response = self.handle_request(request)
-                    
-                    # Enviar respuesta por stdout
-                    print(json.dumps(response, ensure_ascii=False))
-                    sys.stdout.flush()
-                    
-                except json.JSONDecodeError as e:
+                    message = json_codec.loads(line)
+                except json_codec.DecodeError as e:
                     logger.error(f"Error parseando JSON: {e}")
-                    error_response = self._create_error_response(
+                    self._write_response(self._create_error_response(
                         -32700, "Parse error", None
-                    )
-                    print(json.dumps(error_response))
-                    sys.stdout.flush()
+                    ))
+                    continue
+                
+                # Procesar solicitud (o lote) y enviar respuesta por stdout
+                self._write_bytes(self.handle_message_bytes(message))
+                # Precalentar la conexión con el upstream tras responder a initialize
+                self._start_warm_up()
                     
         except KeyboardInterrupt:
             logger.info("Servidor MCP detenido por el usuario")
         except Exception as e:
             logger.error(f"Error en servidor MCP: {e}")
         finally:
+            self._stop_metrics_exporter()
+            logger.info("Servidor MCP finalizado")
+    
+    def _start_metrics_exporter(self):
+        """Reescribe periódicamente WEATHER_METRICS_FILE en formato Prometheus"""
+        if not self.metrics_file:
+            return
+        
+        def export_loop():
+            while not self._metrics_stop.wait(METRICS_FILE_INTERVAL):
+                self._write_metrics_file()
+        
+        threading.Thread(target=export_loop, daemon=True).start()
+    
+    def _stop_metrics_exporter(self):
+        """Detiene el exportador y escribe las métricas, trazas y alias de ciudad pendientes"""
+        self._metrics_stop.set()
+        if self.prefetcher is not None:
+            self.prefetcher.stop()
+        self.tracer.flush()
+        self.weather_service.city_index.save()
+        if self.metrics_file:
+            self._write_metrics_file()
+    
+    def _write_metrics_file(self):
+        try:
+            self.metrics.write_prometheus(self.metrics_file)
+        except OSError as e:
+            logger.error(f"Error escribiendo métricas en {self.metrics_file}: {e}")
+    
+    def run_async(self, max_concurrency: int = 16):
+        """
+        Ejecuta el servidor MCP en modo stdio con un bucle asyncio
+        
+        Las llamadas tools/call se despachan como tareas concurrentes y sus
+        respuestas se escriben en cuanto terminan (fuera de orden, asociadas
+        por id). El resto de métodos (initialize, tools/list...) se procesan
+        en el orden de llegada antes de leer la siguiente línea.
+        
+        Args:
+            max_concurrency (int): Máximo de tools/call ejecutándose a la vez
+        """
+        # asyncio solo se importa en este modo (~40 ms menos de arranque en modo síncrono)
+        import asyncio
+        
+        logger.info(f"Iniciando servidor MCP asíncrono (concurrencia máxima: {max_concurrency})...")
+        self._start_metrics_exporter()
+        if self.prefetcher is not None:
+            self.prefetcher.start()
+        
+        try:
+            asyncio.run(self._serve_async(max_concurrency))
+        except KeyboardInterrupt:
+            logger.info("Servidor MCP detenido por el usuario")
+        except Exception as e:
+            logger.error(f"Error en servidor MCP: {e}")
+        finally:
+            self._stop_metrics_exporter()
             logger.info("Servidor MCP finalizado")
+    
+    @staticmethod
+    def _is_concurrent(message: Any) -> bool:
+        """True si el mensaje solo contiene tools/call y puede ejecutarse fuera de orden"""
+        entries = message if isinstance(message, list) else [message]
+        return bool(entries) and all(
+            isinstance(entry, dict) and entry.get("method") == "tools/call"
+            for entry in entries
+        )
+    
+    async def _serve_async(self, max_concurrency: int):
+        """Bucle principal del modo asíncrono"""
+        import asyncio
+        
+        loop = asyncio.get_running_loop()
+        # Un hilo dedicado a leer stdin y un pool acotado para las consultas bloqueantes
+        reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mcp-stdin")
+        workers = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="mcp-worker")
+        semaphore = asyncio.Semaphore(max_concurrency)
+        pending = set()
+        
+        async def dispatch(message: Any):
+            queued_at = time.perf_counter()
+            async with semaphore:
+                data = await loop.run_in_executor(workers, self._handle_queued_bytes, message, queued_at)
+            self._write_bytes(data)
+        
+        stdin = sys.stdin.buffer
+        self._startup_marks["loop_ready"] = time.time()
+        try:
+            while True:
+                line = await loop.run_in_executor(reader, stdin.readline)
+                if not line:
+                    break
+                
+                line = line.strip()
+                if not line:
+                    continue
+                
+                try:
+                    message = json_codec.loads(line)
+                except json_codec.DecodeError as e:
+                    logger.error(f"Error parseando JSON: {e}")
+                    self._write_response(self._create_error_response(
+                        -32700, "Parse error", None
+                    ))
+                    continue
+                
+                if self._is_concurrent(message):
+                    # El plazo empieza a contar al recibir la solicitud, no al ejecutarla
+                    for entry in (message if isinstance(message, list) else [message]):
+                        self.track_request(entry)
+                    task = asyncio.ensure_future(dispatch(message))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+                elif isinstance(message, list):
+                    # Lote con métodos ordenados: se espera antes de leer la siguiente línea
+                    await dispatch(message)
+                    self._start_warm_up()
+                else:
+                    self._write_bytes(self.handle_message_bytes(message))
+                    self._start_warm_up()
+            
+            # stdin cerrado: terminar las llamadas en curso antes de salir
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            reader.shutdown(wait=False)
+            workers.shutdown(wait=False)
 
 
 def main():
     """Función principal del servidor MCP"""
+    parser = argparse.ArgumentParser(description="Servidor MCP de información meteorológica")
+    parser.add_argument(
+        "--async", dest="use_async", action="store_true",
+        help="Procesar las llamadas tools/call de forma concurrente con asyncio"
+    )
+    parser.add_argument(
+        "--max-concurrency", type=int, default=16,
+        help="Máximo de llamadas concurrentes en modo asíncrono (por defecto: 16)"
+    )
+    args = parser.parse_args()
+    
     server = MCPServer()
-    server.run()
+    if args.use_async:
+        server.run_async(max_concurrency=args.max_concurrency)
+    else:
+        server.run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,264 @@
+"""
+Métricas de bajo coste para el servidor MCP y el servicio meteorológico
+Histogramas de latencia por método y por etapa, contadores y gauges, con
+exportación a JSON (método metrics/get) y al formato de texto de Prometheus
+"""
+
+import bisect
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, Iterator, List, Tuple
+
+# Límites superiores de los buckets de latencia en segundos (de 100 µs a 10 s)
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _series_name(name: str, labels: LabelKey) -> str:
+    """Nombre de serie en notación de Prometheus: nombre{etiqueta="valor",...}"""
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Histograma acumulativo con buckets fijos"""
+
+    __slots__ = ("bounds", "counts", "total", "count", "max", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """Registra una observación"""
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += value
+            self.count += 1
+            if value > self.max:
+                self.max = value
+
+    def _quantile(self, counts: List[int], count: int, maximum: float, q: float) -> float:
+        """Estimación del cuantil q (límite superior del bucket que lo contiene)"""
+        if count == 0:
+            return 0.0
+        rank = q * count
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return min(self.bounds[index], maximum) if index < len(self.bounds) else maximum
+        return maximum
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Copia consistente del histograma
+
+        Returns:
+            Dict[str, Any]: count, sum, max, p50/p95/p99 aproximados y buckets
+                acumulados por límite superior
+        """
+        with self._lock:
+            counts = list(self.counts)
+            count, total, maximum = self.count, self.total, self.max
+
+        buckets = {}
+        cumulative = 0
+        for bound, bucket_count in zip(self.bounds + (math.inf,), counts):
+            cumulative += bucket_count
+            buckets[_format_value(bound)] = cumulative
+
+        return {
+            "count": count,
+            "sum": round(total, 6),
+            "max": round(maximum, 6),
+            "p50": self._quantile(counts, count, maximum, 0.50),
+            "p95": self._quantile(counts, count, maximum, 0.95),
+            "p99": self._quantile(counts, count, maximum, 0.99),
+            "buckets": buckets
+        }
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas compartido por el servidor y el servicio
+
+    Las series se crean en el primer uso. Los colectores son funciones que
+    devuelven gauges calculados en el momento de exportar (p. ej. las
+    estadísticas de la caché), de modo que no añaden coste al camino crítico.
+    """
+
+    def __init__(self, namespace: str = "weather_mcp",
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Inicializa un registro vacío
+
+        Args:
+            namespace (str): Prefijo de las métricas en el formato de Prometheus
+            buckets (Tuple[float, ...]): Límites de los histogramas en segundos
+        """
+        self.namespace = namespace
+        self.buckets = buckets
+        self._histograms: Dict[Tuple[str, LabelKey], Histogram] = {}
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._gauges: Dict[Tuple[str, LabelKey], float] = {}
+        self._collectors: List[Callable[[], Dict[str, float]]] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, Any]) -> Tuple[str, LabelKey]:
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def observe(self, name: str, value: float, **labels):
+        """Registra una observación (en segundos) en el histograma name{labels}"""
+        key = self._key(name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(self.buckets))
+        histogram.observe(value)
+
+    @contextmanager
+    def time(self, name: str, **labels) -> Iterator[None]:
+        """Mide la duración del bloque y la registra en el histograma name{labels}"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """Incrementa el contador name{labels}"""
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def add(self, name: str, delta: float, **labels):
+        """Suma delta (positivo o negativo) al gauge name{labels}"""
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + delta
+
+    def add_collector(self, collector: Callable[[], Dict[str, float]]):
+        """
+        Registra una función que devuelve gauges calculados al exportar
+
+        Args:
+            collector (Callable[[], Dict[str, float]]): Devuelve nombre -> valor
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def _collect(self) -> Dict[str, float]:
+        gauges = {}
+        for collector in list(self._collectors):
+            try:
+                gauges.update(collector())
+            except Exception:
+                # Un colector defectuoso no debe impedir exportar el resto
+                continue
+        return gauges
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Copia de todas las métricas en formato JSON
+
+        Returns:
+            Dict[str, Any]: histograms, counters y gauges indexados por nombre de serie
+        """
+        with self._lock:
+            histograms = list(self._histograms.items())
+            counters = list(self._counters.items())
+            gauges = list(self._gauges.items())
+
+        gauge_values = {_series_name(name, labels): value for (name, labels), value in gauges}
+        gauge_values.update(self._collect())
+        return {
+            "histograms": {
+                _series_name(name, labels): histogram.snapshot()
+                for (name, labels), histogram in sorted(histograms)
+            },
+            "counters": {
+                _series_name(name, labels): value for (name, labels), value in sorted(counters)
+            },
+            "gauges": dict(sorted(gauge_values.items()))
+        }
+
+    def to_prometheus(self) -> str:
+        """
+        Exporta las métricas en el formato de texto de Prometheus (0.0.4)
+
+        Returns:
+            str: Exposición de texto lista para servir o escribir en un fichero
+        """
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+
+        lines = []
+        typed = set()
+
+        def declare(name: str, kind: str):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), histogram in histograms:
+            full_name = f"{self.namespace}_{name}"
+            declare(full_name, "histogram")
+            snapshot = histogram.snapshot()
+            for bound, cumulative in snapshot["buckets"].items():
+                lines.append(f"{_series_name(full_name + '_bucket', labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{_series_name(full_name + '_sum', labels)} {snapshot['sum']}")
+            lines.append(f"{_series_name(full_name + '_count', labels)} {snapshot['count']}")
+
+        for (name, labels), value in counters:
+            full_name = f"{self.namespace}_{name}"
+            declare(full_name, "counter")
+            lines.append(f"{_series_name(full_name, labels)} {_format_value(value)}")
+
+        for (name, labels), value in gauges:
+            full_name = f"{self.namespace}_{name}"
+            declare(full_name, "gauge")
+            lines.append(f"{_series_name(full_name, labels)} {_format_value(value)}")
+
+        for name, value in sorted(self._collect().items()):
+            full_name = f"{self.namespace}_{name}"
+            declare(full_name, "gauge")
+            lines.append(f"{full_name} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """
+        Escribe la exposición de Prometheus en un fichero de forma atómica
+
+        Pensado para el textfile collector de node_exporter.
+
+        Args:
+            path (str): Ruta del fichero .prom
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
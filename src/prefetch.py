@@ -0,0 +1,225 @@
+"""
+Precarga de las ciudades más consultadas
+Cuenta las consultas por ciudad normalizada con un contador que decae
+exponencialmente y, en un hilo del servidor, revalida las K ciudades más
+populares poco antes de que caduque su entrada de caché, sin superar un
+presupuesto de consultas al upstream por segundo
+"""
+
+import heapq
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from flow_control import TokenBucket, CIRCUIT_CLOSED
+
+if TYPE_CHECKING:
+    from weather_service import WeatherService
+
+logger = logging.getLogger(__name__)
+
+# Al superar este factor de escala los contadores se renormalizan
+_RESCALE_LIMIT = 2.0 ** 40
+
+
+class PopularityTracker:
+    """
+    Contador de consultas por clave con decaimiento exponencial (thread-safe)
+
+    Cada consulta suma 1 y el valor se reduce a la mitad cada half_life
+    segundos. En lugar de decaer todos los contadores, cada consulta suma
+    2^(t/half_life) en una escala común; comparar contadores no requiere
+    recalcularlos y la escala se renormaliza antes de desbordarse.
+    """
+
+    def __init__(self, half_life: float = 600.0, max_keys: int = 4096):
+        """
+        Inicializa el contador vacío
+
+        Args:
+            half_life (float): Segundos en los que una consulta pierde la mitad de su peso
+            max_keys (int): Claves máximas; al superarlas se olvidan las menos populares
+        """
+        if half_life <= 0:
+            raise ValueError("half_life debe ser positivo")
+        self.half_life = half_life
+        self.max_keys = max_keys
+        self._scores: Dict[str, float] = {}
+        self._cities: Dict[str, str] = {}
+        self._epoch = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _scale(self, now: float) -> float:
+        """Peso de una consulta en este instante en la escala actual (requiere el lock)"""
+        scale = 2.0 ** ((now - self._epoch) / self.half_life)
+        if scale > _RESCALE_LIMIT:
+            for key in self._scores:
+                self._scores[key] /= scale
+            self._epoch = now
+            scale = 1.0
+        return scale
+
+    def record(self, key: str, city: str):
+        """
+        Anota una consulta
+
+        Args:
+            key (str): Clave normalizada (la de la caché)
+            city (str): Nombre con el que se consultó (se usa para revalidar)
+        """
+        with self._lock:
+            self._scores[key] = self._scores.get(key, 0.0) + self._scale(time.monotonic())
+            self._cities[key] = city
+            if len(self._scores) > self.max_keys:
+                self._forget()
+
+    def _forget(self):
+        """Olvida la décima parte menos popular de las claves (requiere el lock)"""
+        excess = len(self._scores) - self.max_keys + self.max_keys // 10
+        for key in heapq.nsmallest(excess, self._scores, key=self._scores.__getitem__):
+            del self._scores[key]
+            del self._cities[key]
+
+    def score(self, key: str) -> float:
+        """Consultas recientes ponderadas de una clave (0 si no se conoce)"""
+        with self._lock:
+            return self._scores.get(key, 0.0) / self._scale(time.monotonic())
+
+    def top(self, k: int) -> List[Tuple[str, str, float]]:
+        """
+        Claves más populares
+
+        Args:
+            k (int): Número de claves
+
+        Returns:
+            List[Tuple[str, str, float]]: (clave, ciudad, consultas ponderadas),
+                de más a menos popular
+        """
+        with self._lock:
+            scale = self._scale(time.monotonic())
+            keys = heapq.nlargest(k, self._scores, key=self._scores.__getitem__)
+            return [(key, self._cities[key], self._scores[key] / scale) for key in keys]
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+
+class PrefetchScheduler:
+    """
+    Revalida en segundo plano las ciudades populares antes de que caduquen
+
+    Cada interval segundos recorre las top_k claves del PopularityTracker del
+    servicio, de más a menos popular, y revalida las que tienen una entrada
+    válida en caché que caduca en menos de lead_time segundos. Las consultas
+    pasan por el control de flujo normal del servicio y, además, por un
+    presupuesto propio (TokenBucket): si se agota, las ciudades menos
+    populares esperan a la siguiente vuelta. Las ciudades que no están en
+    caché (nunca consultadas con éxito o desalojadas) no se precargan.
+    """
+
+    def __init__(self, service: "WeatherService", top_k: int = 32, lead_time: float = 60.0,
+                 budget: float = 1.0, burst: Optional[float] = None,
+                 interval: float = 5.0, min_score: float = 2.0):
+        """
+        Inicializa el planificador (sin arrancar el hilo)
+
+        Args:
+            service (WeatherService): Servicio con popularity y caché activos
+            top_k (int): Ciudades más populares que se mantienen frescas
+            lead_time (float): Segundos antes de caducar en los que se revalida
+            budget (float): Revalidaciones por segundo permitidas al upstream
+            burst (Optional[float]): Ráfaga máxima de revalidaciones (por defecto top_k)
+            interval (float): Segundos entre vueltas del planificador
+            min_score (float): Consultas ponderadas mínimas para precargar una ciudad
+        """
+        if service.popularity is None:
+            raise ValueError("El servicio no registra la popularidad de las ciudades")
+        self.service = service
+        self.tracker = service.popularity
+        self.top_k = top_k
+        self.lead_time = lead_time
+        self.interval = interval
+        self.min_score = min_score
+        self.budget = TokenBucket(budget, burst if burst is not None else max(1.0, float(top_k)))
+        self.prefetched = 0
+        self.over_budget = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        service.metrics.add_collector(self._collect_metrics)
+
+    def start(self):
+        """Arranca el hilo del planificador (si no está ya en marcha)"""
+        if self._thread is not None or self.service.cache is None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="weather-prefetch", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"Precarga activa: top {self.top_k} ciudades, {self.lead_time:.0f} s antes de "
+            f"caducar, hasta {self.budget.rate:g} consultas/s"
+        )
+
+    def stop(self):
+        """Detiene el hilo del planificador"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Error en la precarga de ciudades populares: {e}")
+
+    def tick(self) -> int:
+        """
+        Ejecuta una vuelta del planificador
+
+        Returns:
+            int: Revalidaciones lanzadas
+        """
+        service = self.service
+        cache = service.cache
+        # Con el upstream caído las revalidaciones fallarían: se espera a que se recupere
+        if cache is None or (service.breaker is not None and service.breaker.state != CIRCUIT_CLOSED):
+            return 0
+
+        # Con un TTL corto se revalida en la segunda mitad de la vida de la entrada
+        lead_time = min(self.lead_time, cache.ttl / 2)
+        launched = 0
+        for key, city, score in self.tracker.top(self.top_k):
+            if score < self.min_score:
+                break
+            remaining = cache.expires_in(key)
+            if remaining is None or remaining > lead_time:
+                continue
+            if not self.budget.try_acquire():
+                self.over_budget += 1
+                break
+            if service.refresh_ahead(key, city):
+                launched += 1
+        self.prefetched += launched
+        return launched
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Obtiene el estado del planificador
+
+        Returns:
+            Dict[str, float]: Claves seguidas, revalidaciones lanzadas y vueltas
+                en las que se agotó el presupuesto
+        """
+        return {
+            "tracked": len(self.tracker),
+            "top_k": self.top_k,
+            "prefetched": self.prefetched,
+            "over_budget": self.over_budget
+        }
+
+    def _collect_metrics(self) -> Dict[str, float]:
+        """Gauges del planificador para el registro de métricas"""
+        return {f"prefetch_{name}": value for name, value in self.stats().items()}
@@ -0,0 +1,119 @@
+"""
+Coalescencia de solicitudes concurrentes (single-flight)
+Garantiza que solo una llamada por clave esté en curso a la vez; el resto de
+llamadores concurrentes esperan y comparten el mismo resultado o excepción
+"""
+
+import threading
+from typing import Dict, Any, Callable, Tuple
+
+from cancellation import RequestCancelled, current_token
+
+# Segundos máximos entre comprobaciones del token de un llamador que espera
+WAIT_SLICE = 0.05
+
+
+class _Call:
+    """Llamada en curso compartida por todos los llamadores de una clave"""
+
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Agrupa llamadas idénticas concurrentes en una única ejecución (thread-safe)"""
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Ejecuta fn una sola vez para todas las llamadas concurrentes con la misma clave
+
+        Args:
+            key (str): Clave normalizada de la llamada
+            fn (Callable[[], Any]): Función a ejecutar
+
+        Returns:
+            Tuple[Any, bool]: Resultado y True si fue compartido con otra llamada
+
+        Raises:
+            Exception: La misma excepción que lanzó fn, propagada a todos los llamadores
+            RequestCancelled: Si el token activo del llamador (no el de la llamada en
+                curso) se cancela o vence mientras espera; el mensaje es
+                CANCELLED_ERROR o DEADLINE_ERROR
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            self._wait(call)
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, call.waiters > 0
+
+    @staticmethod
+    def _wait(call: _Call):
+        """Espera el resultado compartido respetando el plazo y la cancelación del llamador"""
+        token = current_token()
+        if token is None:
+            call.done.wait()
+            return
+        while True:
+            remaining = token.remaining()
+            timeout = WAIT_SLICE if remaining is None else min(WAIT_SLICE, remaining)
+            if call.done.wait(timeout):
+                return
+            if token.done():
+                raise RequestCancelled(token.error())
+
+    def in_flight(self) -> int:
+        """Número de claves con una llamada en curso"""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Obtiene los contadores de coalescencia
+
+        Returns:
+            Dict[str, Any]: Ejecuciones reales, llamadas agrupadas y tasa de coalescencia
+        """
+        with self._lock:
+            total = self.executions + self.coalesced
+            return {
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "coalesce_rate": self.coalesced / total if total else 0.0,
+                "in_flight": len(self._calls)
+            }
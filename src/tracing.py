@@ -0,0 +1,264 @@
+"""
+Trazas distribuidas entre el cliente MCP, el servidor y el upstream
+Propaga el contexto con el formato W3C traceparent (en _meta de JSON-RPC y en
+la cabecera HTTP) y exporta los spans terminados como JSON de Zipkin v2, uno
+por línea, con muestreo en la raíz de la traza
+"""
+
+import contextvars
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional
+
+# traceparent: versión-traceid-spanid-flags (https://www.w3.org/TR/trace-context/)
+TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+SAMPLED_FLAG = 0x01
+
+# Tasa de muestreo por defecto de las trazas nuevas (WEATHER_TRACE_SAMPLE)
+DEFAULT_SAMPLE_RATE = 0.1
+
+_current_span: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar(
+    "weather_current_span", default=None
+)
+
+
+class SpanContext:
+    """Identificadores de un span remoto recibidos en un traceparent"""
+
+    __slots__ = ("trace_id", "span_id", "sampled")
+
+    def __init__(self, trace_id: str, span_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+
+class Span:
+    """Span en curso; solo guarda tiempos y etiquetas si está muestreado"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "sampled", "name", "kind",
+                 "timestamp", "duration", "tags", "_started")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str],
+                 sampled: bool, kind: Optional[str] = None):
+        self.trace_id = trace_id
+        self.span_id = "%016x" % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.name = name
+        self.kind = kind
+        self.tags: Dict[str, str] = {}
+        self.timestamp = time.time() if sampled else 0.0
+        self._started = time.perf_counter() if sampled else 0.0
+        self.duration = 0.0
+
+    def set_tag(self, key: str, value: Any):
+        """Añade una etiqueta (se ignora si el span no está muestreado)"""
+        if self.sampled:
+            self.tags[key] = str(value)
+
+    def traceparent(self) -> str:
+        """Cabecera traceparent que identifica este span como padre"""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def finish(self):
+        if self.sampled:
+            self.duration = time.perf_counter() - self._started
+
+    def to_zipkin(self, service_name: str) -> Dict[str, Any]:
+        """Representación JSON de Zipkin v2 (tiempos en microsegundos)"""
+        span = {
+            "traceId": self.trace_id,
+            "id": self.span_id,
+            "name": self.name,
+            "timestamp": int(self.timestamp * 1_000_000),
+            "duration": max(1, int(self.duration * 1_000_000)),
+            "localEndpoint": {"serviceName": service_name}
+        }
+        if self.parent_id:
+            span["parentId"] = self.parent_id
+        if self.kind:
+            span["kind"] = self.kind
+        if self.tags:
+            span["tags"] = self.tags
+        return span
+
+
+class ZipkinFileExporter:
+    """
+    Exporta spans como JSON de Zipkin v2, un span por línea
+
+    Los spans se acumulan en memoria y se escriben en bloques de batch_size
+    con una sola escritura en modo append, de modo que varios procesos
+    (cliente y servidores) pueden compartir el fichero.
+    """
+
+    def __init__(self, path: str, batch_size: int = 64):
+        """
+        Inicializa el exportador
+
+        Args:
+            path (str): Fichero de destino (se abre en modo append)
+            batch_size (int): Spans acumulados antes de escribir
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Dict[str, Any]):
+        """Encola un span terminado y escribe el bloque si está lleno"""
+        line = json.dumps(span, separators=(",", ":"))
+        with self._lock:
+            self._buffer.append(line)
+            if len(self._buffer) < self.batch_size:
+                return
+            lines, self._buffer = self._buffer, []
+        self._write(lines)
+
+    def flush(self):
+        """Escribe los spans pendientes"""
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+        if lines:
+            self._write(lines)
+
+    def _write(self, lines: List[str]):
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError:
+            # Perder trazas nunca debe afectar a las consultas
+            pass
+
+
+class Tracer:
+    """
+    Crea spans, propaga el contexto y exporta los spans muestreados
+
+    La decisión de muestreo se toma en la raíz de cada traza y se hereda:
+    un traceparent con flags 00 desactiva la traza en todos los procesos.
+    Sin exportador los spans se siguen creando (para propagar los ids al
+    siguiente proceso) pero no se guardan.
+    """
+
+    def __init__(self, service_name: str, exporter: Optional[ZipkinFileExporter] = None,
+                 sample_rate: float = DEFAULT_SAMPLE_RATE):
+        """
+        Inicializa el tracer
+
+        Args:
+            service_name (str): Nombre del servicio en los spans exportados
+            exporter (Optional[ZipkinFileExporter]): Destino de los spans (None no exporta)
+            sample_rate (float): Fracción de trazas nuevas que se muestrean (0-1)
+        """
+        self.service_name = service_name
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    @staticmethod
+    def extract(traceparent: Optional[str]) -> Optional[SpanContext]:
+        """
+        Interpreta una cabecera traceparent
+
+        Args:
+            traceparent (Optional[str]): Valor recibido
+
+        Returns:
+            Optional[SpanContext]: Contexto remoto, o None si falta o no es válido
+        """
+        if not isinstance(traceparent, str):
+            return None
+        match = TRACEPARENT_PATTERN.match(traceparent)
+        if match is None or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+            return None
+        return SpanContext(match.group(1), match.group(2), bool(int(match.group(3), 16) & SAMPLED_FLAG))
+
+    @staticmethod
+    def current_span() -> Optional[Span]:
+        """Span activo en el contexto actual (hilo o tarea)"""
+        return _current_span.get()
+
+    def set_tag(self, key: str, value: Any):
+        """Añade una etiqueta al span activo, si existe"""
+        span = _current_span.get()
+        if span is not None:
+            span.set_tag(key, value)
+
+    def _new_span(self, name: str, kind: Optional[str], parent: Optional[SpanContext]) -> Span:
+        if parent is None:
+            parent = _current_span.get()
+        if parent is None:
+            trace_id = "%032x" % random.getrandbits(128)
+            return Span(name, trace_id, None, random.random() < self.sample_rate, kind)
+        return Span(name, parent.trace_id, parent.span_id, parent.sampled, kind)
+
+    def traceparent(self) -> str:
+        """
+        traceparent para una solicitud saliente
+
+        Usa el span activo como padre; si no hay ninguno crea un contexto raíz
+        nuevo (con su decisión de muestreo) que no se exporta.
+        """
+        span = _current_span.get() or self._new_span("", None, None)
+        return span.traceparent()
+
+    @contextmanager
+    def span(self, name: str, kind: Optional[str] = None,
+             parent: Optional[SpanContext] = None,
+             tags: Optional[Dict[str, Any]] = None) -> Iterator[Span]:
+        """
+        Abre un span hijo del span activo (o de parent) durante el bloque
+
+        Args:
+            name (str): Nombre del span
+            kind (Optional[str]): CLIENT, SERVER... (Zipkin v2)
+            parent (Optional[SpanContext]): Padre remoto extraído de un traceparent
+            tags (Optional[Dict[str, Any]]): Etiquetas iniciales
+
+        Yields:
+            Span: Span abierto (activo en el contexto actual)
+        """
+        span = self._new_span(name, kind, parent)
+        if tags and span.sampled:
+            for key, value in tags.items():
+                span.set_tag(key, value)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_tag("error", type(e).__name__)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.finish()
+            if span.sampled and self.exporter is not None:
+                self.exporter.export(span.to_zipkin(self.service_name))
+
+    def flush(self):
+        """Escribe los spans pendientes del exportador"""
+        if self.exporter is not None:
+            self.exporter.flush()
+
+
+def tracer_from_env(service_name: str) -> Tracer:
+    """
+    Crea un tracer configurado con variables de entorno
+
+    WEATHER_TRACE_FILE: fichero de spans Zipkin v2 (sin él no se exporta nada)
+    WEATHER_TRACE_SAMPLE: fracción de trazas nuevas muestreadas (por defecto 0.1)
+
+    Args:
+        service_name (str): Nombre del servicio en los spans exportados
+
+    Returns:
+        Tracer: Tracer listo para usar
+    """
+    path = os.environ.get("WEATHER_TRACE_FILE")
+    sample_rate = float(os.environ.get("WEATHER_TRACE_SAMPLE", DEFAULT_SAMPLE_RATE))
+    return Tracer(service_name, ZipkinFileExporter(path) if path else None, sample_rate)
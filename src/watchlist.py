@@ -0,0 +1,302 @@
+"""
+Lista de seguimiento de ciudades para la aplicación Tkinter
+Tabla (ttk.Treeview) con muchas ciudades que se actualiza periódicamente:
+las consultas van por lotes (iter_weather_many) en un pool de hilos acotado
+y los resultados se vuelcan en la interfaz en un único root.after por
+fotograma, modificando solo las celdas que cambiaron
+"""
+
+import threading
+import time
+import tkinter as tk
+from concurrent.futures import Executor
+from tkinter import ttk
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from cancellation import CancelToken, RequestCancelled
+from city_names import clean_city, normalize_city
+
+# Columnas de la tabla: (identificador, cabecera, ancho)
+COLUMNS = (
+    ("city", "Ciudad", 150),
+    ("temperature", "Temp. (°C)", 80),
+    ("condition", "Condiciones", 170),
+    ("humidity", "Humedad (%)", 90),
+    ("wind", "Viento (km/h)", 100),
+    ("timestamp", "Observación", 140),
+)
+COLUMN_IDS = tuple(column for column, _, _ in COLUMNS)
+
+# Milisegundos entre volcados a la interfaz (los resultados se acumulan entre medias)
+FRAME_MS = 50
+
+# Filas actualizadas como mucho por volcado, para no bloquear el bucle de Tk
+MAX_ROWS_PER_FRAME = 200
+
+# Ciudades por llamada get_weather_many (el servidor admite hasta 500)
+BATCH_SIZE = 100
+
+# Separador de ciudades en el campo de entrada ("Madrid, Spain" lleva coma)
+CITY_SEPARATOR = ";"
+
+PLACEHOLDER = "…"
+MISSING = "—"
+
+
+def format_row(city: str, data: Dict[str, Any]) -> Tuple[str, ...]:
+    """
+    Valores de las celdas de una ciudad
+
+    Args:
+        city (str): Ciudad tal como se añadió a la lista
+        data (Dict[str, Any]): Información meteorológica o error
+
+    Returns:
+        Tuple[str, ...]: Un texto por columna (en el orden de COLUMNS)
+    """
+    if "error" in data:
+        message = data.get("message") or data["error"]
+        return (city, MISSING, f"Error: {message}", MISSING, MISSING, MISSING)
+
+    wind = f"{data.get('wind_speed', 'N/A')} {data.get('wind_direction', '')}".strip()
+    return (
+        data.get("city", city),
+        str(data.get("temperature", "N/A")),
+        str(data.get("condition", "N/A")),
+        str(data.get("humidity", "N/A")),
+        wind,
+        str(data.get("timestamp", "N/A")),
+    )
+
+
+class WatchlistView:
+    """
+    Vista de la lista de seguimiento
+
+    Una sola tarea de actualización a la vez: recorre la lista por lotes en el
+    executor compartido y deja cada resultado en _pending. El primer resultado
+    de cada fotograma programa un volcado con root.after; los siguientes se
+    acumulan (si una ciudad llega dos veces solo se pinta la última).
+    """
+
+    def __init__(self, parent: tk.Widget, root: tk.Tk, client: Any, executor: Executor,
+                 refresh_interval: float = 60.0, cities: Iterable[str] = ()):
+        """
+        Crea los controles de la vista
+
+        Args:
+            parent (tk.Widget): Contenedor donde colocar la vista
+            root (tk.Tk): Ventana principal (para root.after)
+            client (Any): Cliente con iter_weather_many (WeatherMCPClient)
+            executor (Executor): Pool de hilos acotado compartido con la aplicación
+            refresh_interval (float): Segundos entre actualizaciones de la lista
+            cities (Iterable[str]): Ciudades iniciales
+        """
+        self.root = root
+        self.client = client
+        self.executor = executor
+        self.refresh_interval = refresh_interval
+        self.enabled = False
+
+        self._cities: Dict[str, str] = {}  # iid (ciudad normalizada) -> ciudad
+        self._rows: Dict[str, Tuple[str, ...]] = {}  # valores mostrados por fila
+        self._pending: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._pending_lock = threading.Lock()
+        self._flush_scheduled = False
+        self._cycle_token: Optional[CancelToken] = None
+        self._next_refresh: Optional[str] = None
+        self.cells_updated = 0
+        self._last_cycle: Optional[str] = None
+
+        self.frame = ttk.Frame(parent, padding="10")
+        self._build(self.frame)
+        self.add_cities(cities)
+
+    def _build(self, frame: ttk.Frame):
+        frame.columnconfigure(1, weight=1)
+        frame.rowconfigure(1, weight=1)
+
+        ttk.Label(frame, text=f"Ciudades (separadas por {CITY_SEPARATOR}):").grid(
+            row=0, column=0, sticky=tk.W, padx=(0, 10)
+        )
+        self.entry = ttk.Entry(frame, font=('Arial', 11))
+        self.entry.grid(row=0, column=1, sticky=(tk.W, tk.E), padx=(0, 10))
+        self.entry.bind('<Return>', lambda e: self._add_from_entry())
+        ttk.Button(frame, text="Añadir", command=self._add_from_entry).grid(row=0, column=2, padx=(0, 5))
+        ttk.Button(frame, text="Quitar", command=self.remove_selected).grid(row=0, column=3, padx=(0, 5))
+        self.refresh_button = ttk.Button(frame, text="Actualizar", command=self.refresh_now, state='disabled')
+        self.refresh_button.grid(row=0, column=4)
+
+        table = ttk.Frame(frame)
+        table.grid(row=1, column=0, columnspan=5, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(10, 5))
+        table.columnconfigure(0, weight=1)
+        table.rowconfigure(0, weight=1)
+        self.tree = ttk.Treeview(table, columns=COLUMN_IDS, show="headings", selectmode="extended")
+        for column, heading, width in COLUMNS:
+            self.tree.heading(column, text=heading)
+            self.tree.column(column, width=width, stretch=column in ("city", "condition"))
+        scrollbar = ttk.Scrollbar(table, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+
+        self.status_label = ttk.Label(frame, text="Lista vacía", font=('Arial', 9))
+        self.status_label.grid(row=2, column=0, columnspan=5, sticky=tk.W)
+
+    def add_cities(self, cities: Iterable[str]) -> List[str]:
+        """
+        Añade ciudades a la lista (las repetidas se ignoran) y las consulta
+
+        Args:
+            cities (Iterable[str]): Nombres de las ciudades
+
+        Returns:
+            List[str]: Ciudades añadidas
+        """
+        added = []
+        for city in cities:
+            city = clean_city(city)
+            iid = normalize_city(city)
+            if not iid or iid in self._cities:
+                continue
+            self._cities[iid] = city
+            values = (city,) + (PLACEHOLDER,) * (len(COLUMNS) - 1)
+            self.tree.insert("", tk.END, iid=iid, values=values)
+            self._rows[iid] = values
+            added.append(city)
+
+        if added:
+            self._update_status()
+            if self.enabled:
+                self.executor.submit(self._fetch, added, None)
+        return added
+
+    def _add_from_entry(self):
+        self.add_cities(self.entry.get().split(CITY_SEPARATOR))
+        self.entry.delete(0, tk.END)
+
+    def remove_selected(self):
+        """Quita de la lista las filas seleccionadas"""
+        for iid in self.tree.selection():
+            self.tree.delete(iid)
+            self._cities.pop(iid, None)
+            self._rows.pop(iid, None)
+        self._update_status()
+
+    def set_enabled(self, enabled: bool):
+        """
+        Activa la actualización periódica (con conexión) o la detiene
+
+        Args:
+            enabled (bool): True si hay conexión con el servidor
+        """
+        self.enabled = enabled
+        self.refresh_button.config(state='normal' if enabled else 'disabled')
+        if enabled:
+            self.refresh_now()
+        else:
+            self.stop()
+
+    def refresh_now(self):
+        """Lanza una actualización de toda la lista (si no hay otra en curso)"""
+        if self._next_refresh is not None:
+            self.root.after_cancel(self._next_refresh)
+            self._next_refresh = None
+        if not self.enabled or self._cycle_token is not None:
+            return
+        if not self._cities:
+            self._schedule_refresh()
+            return
+
+        token = CancelToken()
+        self._cycle_token = token
+        self.status_label.config(text=f"Actualizando {len(self._cities)} ciudades...")
+        self.executor.submit(self._fetch, list(self._cities.values()), token)
+
+    def stop(self):
+        """Cancela la actualización en curso y las programadas"""
+        if self._next_refresh is not None:
+            self.root.after_cancel(self._next_refresh)
+            self._next_refresh = None
+        if self._cycle_token is not None:
+            self._cycle_token.cancel()
+            self._cycle_token = None
+
+    def _schedule_refresh(self):
+        if self.enabled and self._next_refresh is None:
+            self._next_refresh = self.root.after(int(self.refresh_interval * 1000), self.refresh_now)
+
+    def _fetch(self, cities: List[str], token: Optional[CancelToken]):
+        """Consulta las ciudades por lotes (en un hilo del executor)"""
+        delivered = set()
+        try:
+            for start in range(0, len(cities), BATCH_SIZE):
+                if token is not None and token.done():
+                    break
+                batch = cities[start:start + BATCH_SIZE]
+                for city, data in self.client.iter_weather_many(batch, cancel_token=token):
+                    delivered.add(normalize_city(city))
+                    self._deliver(city, data)
+        except RequestCancelled:
+            pass
+        except Exception as e:
+            # Las ciudades ya recibidas conservan su resultado
+            error = {"error": "Error", "message": str(e)}
+            for city in cities:
+                if normalize_city(city) not in delivered:
+                    self._deliver(city, error)
+        finally:
+            if token is not None:
+                self.root.after(0, lambda: self._cycle_done(token))
+
+    def _deliver(self, city: str, data: Dict[str, Any]):
+        """Deja un resultado para el siguiente volcado (desde cualquier hilo)"""
+        with self._pending_lock:
+            self._pending[normalize_city(city)] = (city, data)
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        self.root.after(FRAME_MS, self._flush)
+
+    def _flush(self):
+        """Pinta los resultados acumulados, solo las celdas que cambiaron (hilo de Tk)"""
+        with self._pending_lock:
+            if len(self._pending) <= MAX_ROWS_PER_FRAME:
+                batch, self._pending = self._pending, {}
+            else:
+                keys = list(self._pending)[:MAX_ROWS_PER_FRAME]
+                batch = {iid: self._pending.pop(iid) for iid in keys}
+            more = bool(self._pending)
+            self._flush_scheduled = more
+        if more:
+            self.root.after(FRAME_MS, self._flush)
+
+        for iid, (city, data) in batch.items():
+            old = self._rows.get(iid)
+            if old is None:
+                continue  # la ciudad se quitó de la lista mientras se consultaba
+            values = format_row(self._cities[iid], data)
+            if values == old:
+                continue
+            for column, old_value, value in zip(COLUMN_IDS, old, values):
+                if value != old_value:
+                    self.tree.set(iid, column, value)
+                    self.cells_updated += 1
+            self._rows[iid] = values
+
+    def _cycle_done(self, token: CancelToken):
+        if self._cycle_token is not token:
+            return
+        self._cycle_token = None
+        self._last_cycle = time.strftime("%H:%M:%S")
+        self._update_status()
+        self._schedule_refresh()
+
+    def _update_status(self):
+        if not self._cities:
+            self.status_label.config(text="Lista vacía")
+            return
+        text = f"{len(self._cities)} ciudades"
+        if self._last_cycle is not None:
+            text += f" · actualizado a las {self._last_cycle} · {self.cells_updated} celdas modificadas"
+        self.status_label.config(text=text)
@@ -3,12 +3,18 @@ Aplicación Tkinter (MCP Host) para consultar información meteorológica
 Utiliza el protocolo MCP para comunicarse con el servidor meteorológico
 """
 
+import os
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
-import threading
+from concurrent.futures import ThreadPoolExecutor
 import json
 from typing import Dict, Any, Optional
 from mcp_client import WeatherMCPClient
+from cancellation import CancelToken
+from watchlist import WatchlistView, CITY_SEPARATOR
+
+# Hilos para todas las consultas de la aplicación (conexión, ciudad, lista de seguimiento)
+APP_WORKERS = 4
 
 
 class WeatherApp:
@@ -16,15 +22,20 @@ class WeatherApp:
     
     def __init__(self):
         self.root = tk.Tk()
-        self.mcp_client = WeatherMCPClient()
+        # Servidor de reserva ya inicializado para que "Reconectar" sea inmediato
+        self.mcp_client = WeatherMCPClient(standby=True)
         self.connected = False
+        # Token de la consulta en curso: una consulta nueva cancela la anterior
+        self._fetch_token: Optional[CancelToken] = None
+        # Pool acotado y reutilizado en lugar de un hilo nuevo por consulta
+        self.executor = ThreadPoolExecutor(max_workers=APP_WORKERS, thread_name_prefix="weather-app")
         self.setup_ui()
         self.connect_to_server()
     
     def setup_ui(self):
         """Configura la interfaz de usuario"""
         self.root.title(" Clima en Tiempo Real - MCP Client")
-        self.root.geometry("600x500")
+        self.root.geometry("760x560")
         self.root.resizable(True, True)
         
         # Configurar estilo
@@ -56,9 +67,28 @@ class WeatherApp:
         )
         self.status_label.grid(row=1, column=0, columnspan=3, pady=(0, 10))
         
+        # Pestañas: consulta de una ciudad y lista de seguimiento
+        notebook = ttk.Notebook(main_frame)
+        notebook.grid(row=2, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S))
+        main_frame.rowconfigure(2, weight=1)
+        query_tab = ttk.Frame(notebook, padding="10")
+        query_tab.columnconfigure(0, weight=1)
+        query_tab.rowconfigure(1, weight=1)
+        notebook.add(query_tab, text="Consulta")
+        
+        # WEATHER_WATCHLIST: ciudades iniciales de la lista (separadas por ;)
+        self.watchlist = WatchlistView(
+            notebook,
+            self.root,
+            self.mcp_client,
+            self.executor,
+            cities=os.environ.get("WEATHER_WATCHLIST", "").split(CITY_SEPARATOR)
+        )
+        notebook.add(self.watchlist.frame, text="Lista de seguimiento")
+        
         # Frame de entrada
-        input_frame = ttk.LabelFrame(main_frame, text="Consulta de Ciudad", padding="10")
-        input_frame.grid(row=2, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
+        input_frame = ttk.LabelFrame(query_tab, text="Consulta de Ciudad", padding="10")
+        input_frame.grid(row=0, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
         input_frame.columnconfigure(1, weight=1)
         
         # Campo de entrada para ciudad
@@ -77,16 +107,15 @@ class WeatherApp:
         self.query_button.grid(row=0, column=2)
         
         # Frame de resultados
-        results_frame = ttk.LabelFrame(main_frame, text="Información Meteorológica", padding="10")
-        results_frame.grid(row=3, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
+        results_frame = ttk.LabelFrame(query_tab, text="Información Meteorológica", padding="10")
+        results_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         results_frame.columnconfigure(0, weight=1)
         results_frame.rowconfigure(0, weight=1)
-        main_frame.rowconfigure(3, weight=1)
         
         # Área de texto para mostrar resultados
         self.results_text = scrolledtext.ScrolledText(
             results_frame,
-            height=15,
+            height=12,
             font=('Consolas', 10),
             wrap=tk.WORD,
             state='disabled'
@@ -95,7 +124,7 @@ class WeatherApp:
         
         # Frame de botones
         button_frame = ttk.Frame(main_frame)
-        button_frame.grid(row=4, column=0, columnspan=3, pady=(10, 0))
+        button_frame.grid(row=3, column=0, columnspan=3, pady=(10, 0))
         
         # Botón de limpiar
         ttk.Button(
@@ -118,11 +147,11 @@ class WeatherApp:
             mode='indeterminate',
             length=200
         )
-        self.progress.grid(row=5, column=0, columnspan=3, pady=(10, 0), sticky=(tk.W, tk.E))
+        self.progress.grid(row=4, column=0, columnspan=3, pady=(10, 0), sticky=(tk.W, tk.E))
         self.progress.grid_remove()  # Ocultar inicialmente
     
     def connect_to_server(self):
-        """Conecta al servidor MCP en un hilo separado"""
+        """Conecta al servidor MCP en un hilo del pool"""
         def connect():
             try:
                 if self.mcp_client.connect():
@@ -131,15 +160,17 @@ class WeatherApp:
                 else:
                     self.root.after(0, self.on_connection_failure)
             except Exception as e:
-                self.root.after(0, lambda: self.on_connection_failure(str(e)))
+                message = str(e)
+                self.root.after(0, lambda: self.on_connection_failure(message))
         
-        threading.Thread(target=connect, daemon=True).start()
+        self.executor.submit(connect)
     
     def on_connection_success(self):
         """Maneja la conexión exitosa"""
         self.status_label.config(text=" Conectado al servidor MCP")
         self.query_button.config(state='normal')
         self.reconnect_button.config(state='disabled')
+        self.watchlist.set_enabled(True)
     
     def on_connection_failure(self, error_msg: str = None):
         """Maneja el fallo de conexión"""
@@ -147,6 +178,7 @@ class WeatherApp:
         self.status_label.config(text=error_text)
         self.query_button.config(state='disabled')
         self.reconnect_button.config(state='normal')
+        self.watchlist.set_enabled(False)
         
         if error_msg:
             messagebox.showerror("Error de Conexión", f"No se pudo conectar al servidor MCP:\n{error_msg}")
@@ -162,20 +194,34 @@ class WeatherApp:
             messagebox.showerror("Error", "No hay conexión con el servidor MCP.")
             return
         
+        # Una consulta nueva (p. ej. con Enter) deja sin efecto la anterior: el
+        # servidor deja de trabajar en ella y su resultado no se muestra
+        if self._fetch_token is not None:
+            self._fetch_token.cancel()
+        token = CancelToken()
+        self._fetch_token = token
+        
         # Deshabilitar botón y mostrar progreso
         self.query_button.config(state='disabled')
         self.progress.grid()
         self.progress.start()
         
-        # Ejecutar consulta en hilo separado
+        def show(callback):
+            # Se comprueba en el hilo de la interfaz: solo se muestra la última consulta
+            if self._fetch_token is token:
+                self._fetch_token = None
+                callback()
+        
+        # Ejecutar consulta en el pool de hilos
         def fetch_weather():
             try:
-                weather_data = self.mcp_client.get_weather(city)
-                self.root.after(0, lambda: self.display_weather(weather_data, city))
+                weather_data = self.mcp_client.get_weather(city, cancel_token=token)
+                self.root.after(0, lambda: show(lambda: self.display_weather(weather_data, city)))
             except Exception as e:
-                self.root.after(0, lambda: self.display_error(str(e), city))
+                message = str(e)
+                self.root.after(0, lambda: show(lambda: self.display_error(message, city)))
         
-        threading.Thread(target=fetch_weather, daemon=True).start()
+        self.executor.submit(fetch_weather)
     
     def display_weather(self, weather_data: Dict[str, Any], city: str):
         """Muestra la información meteorológica"""
@@ -254,6 +300,7 @@ Sugerencias:
         self.status_label.config(text="🔄 Reconectando...")
         self.query_button.config(state='disabled')
         self.reconnect_button.config(state='disabled')
+        self.watchlist.set_enabled(False)
         
         # Desconectar primero
         if self.connected:
@@ -268,9 +315,10 @@ Sugerencias:
         try:
             self.root.mainloop()
         finally:
-            # Limpiar recursos al cerrar
-            if self.connected:
-                self.mcp_client.disconnect()
+            # Limpiar recursos al cerrar (incluido el servidor de reserva)
+            self.watchlist.stop()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.mcp_client.close()
 
 
 def main():
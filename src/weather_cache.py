@@ -0,0 +1,209 @@
+"""
+Caché en memoria para respuestas meteorológicas
+Implementa expiración por TTL, desalojo LRU por entradas y por bytes,
+caché negativa para errores y ventana stale-while-revalidate
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+
+# Estados posibles de una búsqueda en la caché
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+
+class CacheEntry:
+    """Entrada de la caché con sus marcas de expiración"""
+
+    __slots__ = ("value", "size", "stored_at", "expires_at", "stale_until", "negative")
+
+    def __init__(self, value: Any, size: int, stored_at: float,
+                 expires_at: float, stale_until: float, negative: bool):
+        self.value = value
+        self.size = size
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+        self.negative = negative
+
+
+class WeatherCache:
+    """Caché LRU acotada con TTL y ventana stale-while-revalidate (thread-safe)"""
+
+    def __init__(self, ttl: float = 600, negative_ttl: float = 30,
+                 stale_ttl: float = 300, max_entries: int = 1024,
+                 max_bytes: int = 8 * 1024 * 1024):
+        """
+        Inicializa la caché
+
+        Args:
+            ttl (float): Segundos que una respuesta válida se considera fresca
+            negative_ttl (float): Segundos que se cachea un error o ciudad desconocida
+            stale_ttl (float): Segundos adicionales en los que una entrada expirada
+                se sigue sirviendo mientras se revalida en segundo plano
+            max_entries (int): Número máximo de entradas
+            max_bytes (int): Tamaño máximo aproximado en bytes
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+
+    def get(self, key: str, keep_expired: bool = False) -> Tuple[str, Optional[Any]]:
+        """
+        Busca una entrada en la caché
+
+        Args:
+            key (str): Clave normalizada
+            keep_expired (bool): Si es True una entrada fuera de la ventana stale se
+                devuelve como STALE en lugar de descartarse (upstream caído)
+
+        Returns:
+            Tuple[str, Optional[Any]]: Estado (FRESH, STALE o MISS) y valor cacheado
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISS, None
+
+            if now < entry.expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return FRESH, entry.value
+
+            if now < entry.stale_until or keep_expired:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                return STALE, entry.value
+
+            # Entrada demasiado antigua: se descarta
+            self._remove(key)
+            self.misses += 1
+            return MISS, None
+
+    def put(self, key: str, value: Any, negative: bool = False,
+            size: Optional[int] = None, stored_at: Optional[float] = None):
+        """
+        Guarda un valor en la caché
+
+        Args:
+            key (str): Clave normalizada
+            value (Any): Valor a cachear
+            negative (bool): True si el valor es un error (usa negative_ttl)
+            size (Optional[int]): Tamaño en bytes; se estima si no se indica
+            stored_at (Optional[float]): Momento de obtención (por defecto ahora)
+        """
+        if size is None:
+            size = self._estimate_size(value)
+        if stored_at is None:
+            stored_at = time.time()
+
+        ttl = self.negative_ttl if negative else self.ttl
+        expires_at = stored_at + ttl
+        # Los errores no se sirven caducados: se reintenta en cuanto expiran
+        stale_until = expires_at if negative else expires_at + self.stale_ttl
+
+        # Una entrada mayor que la caché completa no se guarda
+        if size > self.max_bytes:
+            return
+
+        entry = CacheEntry(value, size, stored_at, expires_at, stale_until, negative)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += size
+            self._evict()
+
+    def expires_in(self, key: str) -> Optional[float]:
+        """
+        Segundos hasta que una entrada válida deja de ser fresca, sin contar
+        como acceso (ni aciertos ni orden LRU)
+
+        Args:
+            key (str): Clave normalizada
+
+        Returns:
+            Optional[float]: Segundos (negativos si ya caducó) o None si no hay
+                entrada o es un error cacheado
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.negative:
+                return None
+            return entry.expires_at - time.time()
+
+    def invalidate(self, key: str):
+        """Elimina una entrada de la caché si existe"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        """Vacía la caché por completo"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Obtiene los contadores de la caché
+
+        Returns:
+            Dict[str, Any]: Aciertos, fallos, aciertos caducados y ocupación
+        """
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str):
+        """Elimina una entrada (requiere tener el lock)"""
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _evict(self):
+        """Desaloja las entradas menos usadas hasta respetar los límites (requiere el lock)"""
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+
+    @staticmethod
+    def _estimate_size(value: Any) -> int:
+        """Estima el tamaño en bytes de un valor serializándolo a JSON"""
+        try:
+            return len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        except (TypeError, ValueError):
+            return 1024
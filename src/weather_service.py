@@ -3,67 +3,1242 @@ Servicio para consultar información meteorológica desde wttr.in
 Proporciona funciones para obtener datos del clima en tiempo real
 """
 
-import requests
-import json
-from typing import Dict, Optional, Any
+import contextvars
+import logging
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import TYPE_CHECKING, Dict, Optional, Any, Tuple, List, Iterator, Union
+from urllib.parse import urlsplit, quote
+from weather_cache import WeatherCache, STALE, MISS
+from weather_store import WeatherStore
+from cancellation import current_token, RequestCancelled, CANCELLED_ERROR, DEADLINE_ERROR
+from singleflight import SingleFlight
+from city_names import CityIndex, clean_city
+from prefetch import PopularityTracker
+from metrics import MetricsRegistry
+from tracing import Tracer
+from flow_control import TokenBucket, AIMDLimiter, HedgePolicy, CircuitBreaker, CIRCUIT_CLOSED
+import json_codec
+
+# requests (con urllib3, certifi, charset_normalizer...) cuesta ~100 ms de
+# importación: se importa en la primera consulta al upstream, no al arrancar
+if TYPE_CHECKING:
+    import requests
+    from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Modos de consulta al upstream: documento j1 completo o línea con solo la condición actual
+FETCH_MODE_J1 = "j1"
+FETCH_MODE_LEAN = "lean"
+
+# Formato personalizado de wttr.in para el modo lean (%l ubicación, %t temperatura,
+# %f sensación térmica, %C condición, %h humedad, %w viento, %P presión, %u UV).
+# Los formatos personalizados no tienen visibilidad ni hora de la observación
+# (%T es la hora local actual, no la de la medida): en este modo timestamp y
+# visibility valen "N/A"
+LEAN_SEPARATOR = "|"
+LEAN_FORMAT = LEAN_SEPARATOR.join(["%l", "%t", "%f", "%C", "%h", "%w", "%P", "%u"])
+LEAN_FIELD_COUNT = 8
+
+# Flechas de viento de wttr.in (hacia dónde sopla) -> punto cardinal de origen
+LEAN_WIND_ARROWS = {
+    "↓": "N", "↙": "NE", "←": "E", "↖": "SE",
+    "↑": "S", "↗": "SW", "→": "W", "↘": "NW"
+}
+
+# Errores del upstream que indican sobrecarga: reducen el límite de concurrencia
+OVERLOAD_ERRORS = frozenset(["Error HTTP 429", "Error HTTP 503", "Timeout"])
+
+# Rechazo local por control de flujo: transitorio, nunca se cachea
+OVERLOADED_ERROR = "Overloaded"
+
+# Rechazo local con el circuit breaker abierto: tampoco se cachea
+UNAVAILABLE_ERROR = "Upstream Unavailable"
+LOCAL_ERRORS = frozenset([OVERLOADED_ERROR, UNAVAILABLE_ERROR, CANCELLED_ERROR, DEADLINE_ERROR])
+
+# Solicitud abandonada por quien la hizo (cancelada o fuera de plazo)
+ABANDONED_ERRORS = frozenset([CANCELLED_ERROR, DEADLINE_ERROR])
+
+# Errores de transporte que puede provocar el plazo del llamador al recortar el timeout HTTP
+TIMEOUT_ERRORS = frozenset(["Timeout", "Connection Error"])
+
+
+def _is_upstream_failure(error: Optional[str]) -> bool:
+    """True si el error indica que el upstream no está sano (no una ciudad desconocida)"""
+    if error is None:
+        return False
+    return error in OVERLOAD_ERRORS or error == "Connection Error" or error.startswith("Error HTTP 5")
+
+
+def _is_read_timeout(error: BaseException) -> bool:
+    """True si una excepción de requests se debe a un ReadTimeoutError de urllib3"""
+    from urllib3.exceptions import MaxRetryError, ReadTimeoutError
+
+    seen = set()
+    pending = [error]
+    while pending:
+        current = pending.pop()
+        if current is None or id(current) in seen:
+            continue
+        seen.add(id(current))
+        if isinstance(current, ReadTimeoutError):
+            return True
+        if isinstance(current, MaxRetryError):
+            pending.append(current.reason)
+        pending.extend(arg for arg in getattr(current, "args", ()) if isinstance(arg, BaseException))
+        pending.extend([current.__cause__, current.__context__])
+    return False
+
+
+# Campos de la información meteorológica devuelta por get_weather
+WEATHER_FIELDS = (
+    "city", "temperature", "condition", "humidity", "wind_speed", "wind_direction",
+    "pressure", "feels_like", "visibility", "uv_index", "timestamp"
+)
+
+# Campos numéricos (int, o float si el upstream envía decimales); el resto son
+# textos que se internan para compartirlos entre lecturas
+NUMERIC_FIELDS = ("temperature", "humidity", "wind_speed", "pressure", "feels_like", "visibility", "uv_index")
+
+# Valor de los campos ausentes en el diccionario de respuesta
+MISSING_VALUE = "N/A"
+
+Number = Union[int, float, str]
+
+
+def _to_number(text: Any) -> Optional[Number]:
+    """
+    Convierte un valor del upstream en número sin perder información
+
+    Solo se convierte si el número vuelve a dar exactamente el mismo texto
+    ("21" -> 21, pero "07" o "+3" se conservan como texto).
+
+    Args:
+        text (Any): Valor recibido ("21", "1.5", "N/A"...)
+
+    Returns:
+        Optional[Number]: int, float, el texto original o None si falta
+    """
+    if text is None or text == MISSING_VALUE:
+        return None
+    if not isinstance(text, str):
+        return text
+    try:
+        number = int(text)
+        if str(number) == text:
+            return number
+    except ValueError:
+        try:
+            number = float(text)
+            if repr(number) == text:
+                return number
+        except ValueError:
+            pass
+    return text
+
+
+def _to_text(value: Any) -> Optional[str]:
+    """Texto de un campo (internado) o None si falta"""
+    if value is None or value == MISSING_VALUE:
+        return None
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class WeatherReading:
+    """
+    Condición actual parseada, compacta y con tipos
+
+    Los campos numéricos son int (o float), la condición y la dirección del
+    viento son cadenas internadas y los valores ausentes son None. to_dict()
+    reconstruye exactamente el diccionario de cadenas que se envía al cliente.
+    Admite get() y "in" como un diccionario para el código que trata por
+    igual lecturas y errores.
+    """
+
+    __slots__ = WEATHER_FIELDS
+
+    def __init__(self, city: Optional[str] = None, temperature: Optional[Number] = None,
+                 condition: Optional[str] = None, humidity: Optional[Number] = None,
+                 wind_speed: Optional[Number] = None, wind_direction: Optional[str] = None,
+                 pressure: Optional[Number] = None, feels_like: Optional[Number] = None,
+                 visibility: Optional[Number] = None, uv_index: Optional[Number] = None,
+                 timestamp: Optional[str] = None):
+        self.city = city
+        self.temperature = temperature
+        self.condition = condition
+        self.humidity = humidity
+        self.wind_speed = wind_speed
+        self.wind_direction = wind_direction
+        self.pressure = pressure
+        self.feels_like = feels_like
+        self.visibility = visibility
+        self.uv_index = uv_index
+        self.timestamp = timestamp
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "WeatherReading":
+        """
+        Crea una lectura a partir del diccionario de respuesta (inversa de to_dict)
+
+        Args:
+            data (Dict[str, Any]): Campos como cadenas, con "N/A" si faltan
+
+        Returns:
+            WeatherReading: Lectura equivalente
+        """
+        reading = cls()
+        for field in WEATHER_FIELDS:
+            value = data.get(field)
+            setattr(reading, field, _to_number(value) if field in NUMERIC_FIELDS else _to_text(value))
+        return reading
+
+    def to_dict(self) -> Dict[str, str]:
+        """
+        Diccionario de respuesta: todos los campos como cadenas y "N/A" si faltan
+
+        Returns:
+            Dict[str, str]: Mismo formato que antes de existir WeatherReading
+        """
+        # Explícito campo a campo: está en el camino crítico de cada respuesta
+        # (str() de una cadena devuelve el mismo objeto)
+        missing = MISSING_VALUE
+        return {
+            "city": missing if self.city is None else self.city,
+            "temperature": missing if self.temperature is None else str(self.temperature),
+            "condition": missing if self.condition is None else self.condition,
+            "humidity": missing if self.humidity is None else str(self.humidity),
+            "wind_speed": missing if self.wind_speed is None else str(self.wind_speed),
+            "wind_direction": missing if self.wind_direction is None else self.wind_direction,
+            "pressure": missing if self.pressure is None else str(self.pressure),
+            "feels_like": missing if self.feels_like is None else str(self.feels_like),
+            "visibility": missing if self.visibility is None else str(self.visibility),
+            "uv_index": missing if self.uv_index is None else str(self.uv_index),
+            "timestamp": missing if self.timestamp is None else self.timestamp
+        }
+
+    def get(self, field: str, default: Any = None) -> Any:
+        """Valor de un campo en formato de respuesta (como dict.get)"""
+        if field not in WEATHER_FIELDS:
+            return default
+        value = getattr(self, field)
+        if value is None:
+            return MISSING_VALUE
+        return value if isinstance(value, str) else str(value)
+
+    def __contains__(self, field: str) -> bool:
+        return field in WEATHER_FIELDS
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, WeatherReading):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in WEATHER_FIELDS)
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{field}={getattr(self, field)!r}" for field in WEATHER_FIELDS)
+        return f"WeatherReading({values})"
+
+
+# Resultado de una consulta: lectura o diccionario de error
+CurrentResult = Union[WeatherReading, Dict[str, Any]]
+
+# Tamaño aproximado de una lectura: objeto con slots y los enteros grandes (> 256)
+READING_SIZE = sys.getsizeof(WeatherReading()) + 2 * sys.getsizeof(1013)
+
+
+def _strip_unit(value: str, unit: str) -> str:
+    """Quita la unidad y el signo + de un valor del formato personalizado ("+21°C" -> "21")"""
+    if value.endswith(unit):
+        value = value[:-len(unit)]
+    return value.lstrip("+").strip()
+
+
+def _parse_forecast(raw: str) -> List[Dict[str, Any]]:
+    """
+    Parsea los pronósticos diarios y horarios (weather[]) de un payload j1
+    
+    Args:
+        raw (str): Payload j1 crudo
+        
+    Returns:
+        List[Dict[str, Any]]: Días pronosticados, cada uno con su lista "hourly"
+    """
+    data = json_codec.loads(raw)
+    days = []
+    for day in data.get("weather", []):
+        astronomy = (day.get("astronomy") or [{}])[0]
+        days.append({
+            "date": day.get("date", "N/A"),
+            "max_temp": day.get("maxtempC", "N/A"),
+            "min_temp": day.get("mintempC", "N/A"),
+            "avg_temp": day.get("avgtempC", "N/A"),
+            "sun_hours": day.get("sunHour", "N/A"),
+            "uv_index": day.get("uvIndex", "N/A"),
+            "total_snow_cm": day.get("totalSnow_cm", "N/A"),
+            "sunrise": astronomy.get("sunrise", "N/A"),
+            "sunset": astronomy.get("sunset", "N/A"),
+            "moon_phase": astronomy.get("moon_phase", "N/A"),
+            "hourly": [
+                {
+                    "hour": int(hour.get("time", "0")) // 100,
+                    "temperature": hour.get("tempC", "N/A"),
+                    "feels_like": hour.get("FeelsLikeC", "N/A"),
+                    "condition": (hour.get("weatherDesc") or [{}])[0].get("value", "N/A"),
+                    "humidity": hour.get("humidity", "N/A"),
+                    "wind_speed": hour.get("windspeedKmph", "N/A"),
+                    "wind_direction": hour.get("winddir16Point", "N/A"),
+                    "chance_of_rain": hour.get("chanceofrain", "N/A"),
+                    "pressure": hour.get("pressure", "N/A"),
+                    "visibility": hour.get("visibility", "N/A"),
+                    "uv_index": hour.get("uvIndex", "N/A")
+                }
+                for hour in day.get("hourly", [])
+            ]
+        })
+    return days
+
+
+class Observation:
+    """Observación cacheada: condición actual parseada y payload j1 crudo"""
+    
+    __slots__ = ("current", "raw", "_forecast")
+    
+    def __init__(self, current: Union[WeatherReading, Dict[str, Any]], raw: Optional[str] = None):
+        """
+        Args:
+            current (Union[WeatherReading, Dict[str, Any]]): Condición actual
+                parseada, o diccionario de error
+            raw (Optional[str]): Payload j1 crudo, None en modo lean o si hubo error
+        """
+        self.current = current
+        self.raw = raw
+        self._forecast = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Condición actual (o error) en formato de respuesta, como copia nueva"""
+        if isinstance(self.current, WeatherReading):
+            return self.current.to_dict()
+        return dict(self.current)
+    
+    def forecast(self) -> Optional[List[Dict[str, Any]]]:
+        """Parsea el pronóstico del payload crudo la primera vez que se pide"""
+        if self._forecast is None and self.raw is not None:
+            try:
+                self._forecast = _parse_forecast(self.raw)
+            except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+                logger.error(f"Error parseando pronóstico: {e}")
+                return None
+        return self._forecast
+    
+    def size(self) -> int:
+        """Tamaño aproximado en bytes para el límite de la caché"""
+        if isinstance(self.current, WeatherReading):
+            return len(self.raw or "") + READING_SIZE
+        return len(self.raw or "") + 64 * len(self.current)
 
 
 class WeatherService:
     """Servicio para obtener información meteorológica desde wttr.in"""
     
-    def __init__(self):
+    def __init__(self, cache_ttl: float = 600, negative_ttl: float = 30,
+                 stale_ttl: float = 300, cache_max_entries: int = 1024,
+                 cache_max_bytes: int = 32 * 1024 * 1024,
+                 store_path: Optional[str] = None, pool_size: int = 10,
+                 max_retries: int = 2, backoff_factor: float = 0.3,
+                 max_workers: int = 8, fetch_mode: str = FETCH_MODE_J1,
+                 metrics: Optional[MetricsRegistry] = None,
+                 tracer: Optional[Tracer] = None,
+                 rate_limit: Optional[float] = None, rate_burst: Optional[float] = None,
+                 upstream_concurrency: int = 8, max_upstream_concurrency: int = 32,
+                 latency_target: Optional[float] = None, queue_timeout: float = 5.0,
+                 max_queue: int = 256, hedge_percentile: Optional[float] = 0.95,
+                 hedge_min_delay: float = 0.05, hedge_max_ratio: float = 0.1,
+                 breaker_threshold: Optional[int] = 5, breaker_reset: float = 30.0,
+                 city_index_path: Optional[str] = None,
+                 popularity: Optional[PopularityTracker] = None):
+        """
+        Inicializa el servicio meteorológico
+        
+        Args:
+            cache_ttl (float): Segundos que una respuesta se considera fresca (0 desactiva la caché)
+            negative_ttl (float): Segundos que se cachean errores y ciudades desconocidas
+            stale_ttl (float): Ventana en segundos para servir datos caducados mientras se revalidan
+            cache_max_entries (int): Número máximo de ciudades en caché
+            cache_max_bytes (int): Tamaño máximo aproximado de la caché en bytes
+            store_path (Optional[str]): Fichero SQLite para persistir observaciones
+                entre reinicios (None desactiva la persistencia)
+            pool_size (int): Conexiones keep-alive que se mantienen abiertas con el upstream
+            max_retries (int): Reintentos al establecer la conexión (las respuestas
+                5xx y los timeouts de lectura no se reintentan)
+            backoff_factor (float): Factor de espera exponencial entre reintentos
+            max_workers (int): Consultas simultáneas al upstream en get_weather_many
+            fetch_mode (str): "j1" descarga el documento completo; "lean" pide solo
+                los campos de la condición actual con un formato personalizado
+                (sin timestamp ni visibility, que se devuelven como "N/A")
+            metrics (Optional[MetricsRegistry]): Registro donde anotar las latencias
+                por etapa (por defecto uno propio)
+            tracer (Optional[Tracer]): Tracer para los spans de consulta al upstream
+                y parseo (por defecto uno sin muestreo ni exportación)
+            rate_limit (Optional[float]): Consultas por segundo al upstream (None sin límite)
+            rate_burst (Optional[float]): Ráfaga máxima del limitador de tasa
+            upstream_concurrency (int): Límite inicial de consultas simultáneas al upstream
+            max_upstream_concurrency (int): Techo del límite adaptativo de concurrencia
+            latency_target (Optional[float]): Latencia en segundos que se trata como
+                sobrecarga (None: solo 429/503 y timeouts)
+            queue_timeout (float): Espera máxima en cola por una consulta al upstream
+            max_queue (int): Consultas que pueden esperar en cola a la vez
+            hedge_percentile (Optional[float]): Percentil de latencia tras el que se
+                lanza una segunda consulta idéntica (None desactiva el hedging)
+            hedge_min_delay (float): Espera mínima en segundos antes de cubrir
+            hedge_max_ratio (float): Fracción máxima de consultas cubiertas
+            breaker_threshold (Optional[int]): Fallos consecutivos del upstream que
+                abren el circuit breaker (None lo desactiva)
+            breaker_reset (float): Segundos con el breaker abierto antes de probar
+            city_index_path (Optional[str]): Fichero JSON donde persistir los alias
+                consulta -> área aprendidos del upstream (None solo en memoria)
+            popularity (Optional[PopularityTracker]): Contador de consultas por
+                ciudad para la precarga (ver prefetch.PrefetchScheduler)
+        """
+        if fetch_mode not in (FETCH_MODE_J1, FETCH_MODE_LEAN):
+            raise ValueError(f"Modo de consulta desconocido: {fetch_mode}")
+        
         self.base_url = "https://wttr.in"
         self.timeout = 10  # segundos
+        self.fetch_mode = fetch_mode
+        if fetch_mode == FETCH_MODE_LEAN:
+            logger.info("Modo lean: timestamp y visibility no están disponibles y se devuelven como N/A")
+        
+        # Pool de conexiones compartido por todos los hilos; cada hilo usa su
+        # propia Session (cookies, cabeceras) montada sobre el mismo adaptador.
+        # El adaptador se crea en la primera consulta (ver _get_adapter)
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.adapter: Optional["HTTPAdapter"] = None
+        self._adapter_lock = threading.Lock()
+        self._local = threading.local()
+        
+        # Pool acotado para repartir consultas de varias ciudades (se crea bajo demanda)
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        
+        self.cache = None
+        if cache_ttl > 0:
+            self.cache = WeatherCache(
+                ttl=cache_ttl,
+                negative_ttl=negative_ttl,
+                stale_ttl=stale_ttl,
+                max_entries=cache_max_entries,
+                max_bytes=cache_max_bytes
+            )
+        
+        # Almacén persistente opcional, se carga en la primera consulta
+        self.store = WeatherStore(store_path) if store_path and self.cache is not None else None
+        self._store_loaded = False
+        self._store_load_lock = threading.Lock()
+        
+        # Coalescencia de consultas idénticas concurrentes al mismo upstream
+        self.flight = SingleFlight()
+        
+        # Claves con una revalidación en segundo plano en curso
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        
+        # Latencias por etapa (upstream, decodificación, parseo) y gauges de caché
+        self.metrics = metrics if metrics is not None else MetricsRegistry()
+        self.metrics.add_collector(self._collect_metrics)
+        self.tracer = tracer if tracer is not None else Tracer("weather-service", sample_rate=0.0)
+        
+        # Control de flujo del upstream: tasa (opcional) y concurrencia adaptativa
+        self.queue_timeout = queue_timeout
+        self.rate_limiter = TokenBucket(rate_limit, rate_burst) if rate_limit else None
+        self.concurrency = AIMDLimiter(
+            initial_limit=upstream_concurrency,
+            max_limit=max_upstream_concurrency,
+            latency_target=latency_target,
+            max_queue=max_queue
+        )
+        
+        # Consultas de cobertura contra la cola de latencia y circuit breaker:
+        # con el upstream caído se responde sin esperar (o con datos caducados)
+        self.hedging = None
+        if hedge_percentile is not None:
+            self.hedging = HedgePolicy(hedge_percentile, hedge_min_delay, hedge_max_ratio)
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        self.breaker = None
+        if breaker_threshold is not None:
+            self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        
+        # Alias aprendidos de nearest_area: "madrid", "MADRID" y "Madrid, Spain"
+        # comparten clave de caché y consulta al upstream una vez resueltos
+        self.city_index = CityIndex(city_index_path)
+        self.popularity = popularity
+    
+    def _get_adapter(self) -> "HTTPAdapter":
+        """Crea bajo demanda el adaptador HTTP compartido (importa requests)"""
+        with self._adapter_lock:
+            if self.adapter is None:
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+                
+                # Solo se reintenta el establecimiento de la conexión (la
+                # petición aún no llegó al upstream): cada respuesta, timeout
+                # de lectura o 5xx es un único intento que llega tal cual al
+                # límite adaptativo y al circuit breaker
+                self.adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=self.pool_size,
+                    max_retries=Retry(
+                        total=self.max_retries,
+                        connect=self.max_retries,
+                        read=False,
+                        status=0,
+                        backoff_factor=self.backoff_factor,
+                        allowed_methods=frozenset(["GET", "HEAD"]),
+                        raise_on_status=False
+                    )
+                )
+            return self.adapter
+    
+    def _session(self) -> "requests.Session":
+        """Obtiene la Session del hilo actual, creada sobre el pool compartido"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            import requests
+            
+            adapter = self._get_adapter()
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._local.session = session
+        return session
+    
+    def warm_up(self) -> bool:
+        """
+        Resuelve el DNS y abre una conexión keep-alive con el upstream
+        
+        Se llama al arrancar el servidor para que la primera consulta real no
+        pague la resolución DNS ni el handshake TCP/TLS.
+        
+        Returns:
+            bool: True si la conexión quedó establecida
+        """
+        try:
+            parts = urlsplit(self.base_url)
+            port = parts.port or (443 if parts.scheme == "https" else 80)
+            started = time.perf_counter()
+            socket.getaddrinfo(parts.hostname, port, proto=socket.IPPROTO_TCP)
+            self._session().head(self.base_url, timeout=self.timeout)
+            elapsed = time.perf_counter() - started
+            self.metrics.observe("stage_seconds", elapsed, stage="upstream_connect")
+            elapsed_ms = elapsed * 1000
+            logger.info(f"Conexión con {parts.hostname} precalentada en {elapsed_ms:.1f} ms")
+            return True
+        except Exception as e:
+            logger.warning(f"No se pudo precalentar la conexión con el upstream: {e}")
+            return False
+    
+    def close(self):
+        """Cierra las conexiones del pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+        if self.adapter is not None:
+            self.adapter.close()
+        if self.store is not None:
+            self.store.close()
+        self.city_index.save()
+    
+    def _cache_key(self, city: str) -> str:
+        """Normaliza el nombre de la ciudad y lo resuelve a su área canónica si se conoce"""
+        return self.city_index.resolve(city)
+    
+    def suggest_cities(self, prefix: str, limit: int = 10) -> List[str]:
+        """
+        Ciudades ya consultadas cuyo nombre empieza por prefix (autocompletado)
+        
+        Args:
+            prefix (str): Texto escrito por el usuario
+            limit (int): Máximo de sugerencias
+            
+        Returns:
+            List[str]: Nombres de área ("Madrid, Madrid, Spain") en orden alfabético
+        """
+        return self.city_index.prefix(prefix, limit)
     
     def get_weather(self, city: str) -> Dict[str, Any]:
         """
         Obtiene información meteorológica para una ciudad específica
         
+        Consulta primero la caché; si la entrada está caducada pero dentro de
+        la ventana stale-while-revalidate se devuelve de inmediato y se lanza
+        una única actualización en segundo plano.
+        
         Args:
             city (str): Nombre de la ciudad
             
         Returns:
             Dict[str, Any]: Diccionario con información meteorológica o error
+        """
+        return self._get_observation(city).to_dict()
+    
+    def get_forecast(self, city: str, date: Optional[str] = None,
+                     days: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Obtiene el pronóstico diario para una ciudad
+        
+        Se sirve desde el mismo payload j1 cacheado que get_weather, por lo
+        que no genera consultas adicionales dentro de la ventana de TTL.
+        
+        Args:
+            city (str): Nombre de la ciudad
+            date (Optional[str]): Fecha concreta (AAAA-MM-DD); por defecto todas
+            days (Optional[int]): Número máximo de días a devolver
+            
+        Returns:
+            Dict[str, Any]: Ciudad y lista de días pronosticados, o error
+        """
+        observation = self._get_observation(city, need_raw=True)
+        forecast = self._forecast_or_error(observation)
+        if isinstance(forecast, dict):
+            return forecast
+        
+        selected = [day for day in forecast if date is None or day["date"] == date]
+        if days is not None:
+            selected = selected[:days]
+        
+        return {
+            "city": observation.current.get("city", city),
+            "days": [
+                {field: value for field, value in day.items() if field != "hourly"}
+                for day in selected
+            ]
+        }
+    
+    def get_hourly(self, city: str, date: Optional[str] = None,
+                   start_hour: int = 0, end_hour: int = 23) -> Dict[str, Any]:
+        """
+        Obtiene el pronóstico por horas para una ciudad
+        
+        Args:
+            city (str): Nombre de la ciudad
+            date (Optional[str]): Fecha concreta (AAAA-MM-DD); por defecto todas
+            start_hour (int): Primera hora incluida (0-23)
+            end_hour (int): Última hora incluida (0-23)
             
-        Raises:
-            Exception: Si hay error en la consulta
+        Returns:
+            Dict[str, Any]: Ciudad y lista de horas pronosticadas, o error
         """
+        observation = self._get_observation(city, need_raw=True)
+        forecast = self._forecast_or_error(observation)
+        if isinstance(forecast, dict):
+            return forecast
+        
+        hours = []
+        for day in forecast:
+            if date is not None and day["date"] != date:
+                continue
+            for hour in day["hourly"]:
+                if start_hour <= hour["hour"] <= end_hour:
+                    hours.append(dict(hour, date=day["date"]))
+        
+        return {
+            "city": observation.current.get("city", city),
+            "hours": hours
+        }
+    
+    @staticmethod
+    def _forecast_or_error(observation: "Observation"):
+        """Devuelve el pronóstico parseado o un diccionario de error"""
+        if "error" in observation.current:
+            return observation.to_dict()
+        forecast = observation.forecast()
+        if forecast is None:
+            return {
+                "error": "Parse Error",
+                "message": "No hay datos de pronóstico disponibles"
+            }
+        return forecast
+    
+    def _get_observation(self, city: str, need_raw: bool = False) -> "Observation":
+        """
+        Obtiene la observación de una ciudad desde la caché o desde el upstream
+        
+        Args:
+            city (str): Nombre de la ciudad
+            need_raw (bool): True si se necesita el payload j1 (pronósticos); en
+                modo lean fuerza una consulta j1 si la entrada cacheada no lo tiene
+            
+        Returns:
+            Observation: Observación compartida (no mutar)
+        """
+        # El almacén se carga antes de resolver la clave: también restaura los alias
+        self._load_store()
+        key = self._cache_key(city)
+        mode = FETCH_MODE_J1 if need_raw else self.fetch_mode
+        if self.cache is None:
+            return self._fetch_coalesced(key, city, mode)
+        
+        # Con el breaker abierto cualquier dato cacheado es mejor que un error
+        degraded = self.breaker is not None and self.breaker.state != CIRCUIT_CLOSED
+        state, cached = self.cache.get(key, keep_expired=degraded)
+        self.tracer.set_tag("weather.cache", state)
+        
+        if state != MISS and (not need_raw or cached.raw is not None or "error" in cached.current):
+            if state == STALE:
+                self._schedule_refresh(key, city)
+            self._record_popularity(key, city)
+            return cached
+        
+        observation = self._fetch_coalesced(key, city, mode)
+        # La respuesta puede haber enseñado el área canónica: se anota la clave
+        # bajo la que quedó guardada, que es la que revisa la precarga
+        self._record_popularity(self._cache_key(city), city)
+        return observation
+    
+    def _record_popularity(self, key: str, city: str):
+        """Anota una consulta en el contador de popularidad (si la precarga está activa)"""
+        if self.popularity is not None:
+            self.popularity.record(key, city)
+    
+    def get_weather_many(self, cities: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtiene información meteorológica para varias ciudades en paralelo
+        
+        Las consultas se reparten en un pool acotado a max_workers hilos; las
+        ciudades repetidas se resuelven una sola vez.
+        
+        Args:
+            cities (List[str]): Nombres de las ciudades
+            
+        Returns:
+            Dict[str, Dict[str, Any]]: Información meteorológica o error por ciudad
+        """
+        unique = list(dict.fromkeys(cities))
+        if len(unique) <= 1:
+            return {city: self.get_weather(city) for city in unique}
+        
+        executor = self._get_executor()
+        futures = [self._submit_in_context(executor, self.get_weather, city) for city in unique]
+        return {city: future.result() for city, future in zip(unique, futures)}
+    
+    def iter_weather_many(self, cities: List[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Obtiene información meteorológica para varias ciudades en paralelo,
+        entregando cada resultado en cuanto está disponible
+        
+        Args:
+            cities (List[str]): Nombres de las ciudades
+            
+        Yields:
+            Tuple[str, Dict[str, Any]]: Ciudad e información meteorológica o error,
+                en orden de finalización
+        """
+        unique = list(dict.fromkeys(cities))
+        if len(unique) <= 1:
+            for city in unique:
+                yield city, self.get_weather(city)
+            return
+        
+        executor = self._get_executor()
+        futures = {self._submit_in_context(executor, self.get_weather, city): city for city in unique}
         try:
-            # Consultar wttr.in en formato JSON
-            url = f"{self.base_url}/{city}?format=j1"
-            response = requests.get(url, timeout=self.timeout)
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            # Si el consumidor abandona la iteración, no seguir con las pendientes
+            for future in futures:
+                future.cancel()
+    
+    @staticmethod
+    def _submit_in_context(executor: ThreadPoolExecutor, fn, *args):
+        """Envía fn al pool con una copia del contexto actual (conserva el span activo)"""
+        return executor.submit(contextvars.copy_context().run, fn, *args)
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Crea bajo demanda el pool de hilos para consultas en paralelo"""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="weather-fetch"
+                    )
+        return self._executor
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene las estadísticas de la caché
+        
+        Returns:
+            Dict[str, Any]: Contadores de aciertos, fallos y ocupación
+        """
+        if self.cache is None:
+            return {"enabled": False}
+        
+        stats = self.cache.stats()
+        stats["enabled"] = True
+        with self._refresh_lock:
+            stats["refreshing"] = len(self._refreshing)
+        return stats
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene todas las estadísticas del servicio
+        
+        Returns:
+            Dict[str, Any]: Estadísticas de caché, de coalescencia de solicitudes,
+                de control de flujo (límite actual, cola, limitador de tasa), de
+                hedging, del circuit breaker y del índice de alias
+        """
+        flow_control = self.concurrency.stats()
+        if self.rate_limiter is not None:
+            flow_control.update({f"rate_{name}": value for name, value in self.rate_limiter.stats().items()})
+        return {
+            "cache": self.get_cache_stats(),
+            "coalescing": self.flight.stats(),
+            "flow_control": flow_control,
+            "hedging": self.hedging.stats() if self.hedging is not None else {"enabled": False},
+            "circuit_breaker": self.breaker.stats() if self.breaker is not None else {"state": "disabled"},
+            "city_index": self.city_index.stats()
+        }
+    
+    def _collect_metrics(self) -> Dict[str, float]:
+        """Gauges de caché, coalescencia y conexiones abiertas para el registro de métricas"""
+        gauges = {}
+        for group, stats in self.get_stats().items():
+            for name, value in stats.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    gauges[f"{group}_{name}"] = value
+        
+        if self.adapter is not None:
+            pools = self.adapter.poolmanager.pools
+            gauges["upstream_connections_opened"] = sum(
+                pools[key].num_connections for key in pools.keys()
+            )
+        return gauges
+    
+    def _store(self, key: str, city: str, observation: "Observation"):
+        """Guarda una observación en la caché (los errores con TTL negativo) y en el almacén"""
+        negative = "error" in observation.current
+        self.cache.put(key, observation, negative=negative, size=observation.size())
+        if self.store is not None and not negative:
+            self.store.save(key, city, observation.current.to_dict(), observation.raw)
+    
+    def _load_store(self):
+        """Precarga en memoria las observaciones persistidas (solo la primera vez)"""
+        if self.store is None or self._store_loaded:
+            return
+        
+        with self._store_load_lock:
+            if self._store_loaded:
+                return
+            try:
+                started = time.perf_counter()
+                observations = self.store.load_recent(self.cache.ttl + self.cache.stale_ttl)
+                for key, city, fetched_at, result, raw in observations:
+                    current = result if "error" in result else WeatherReading.from_dict(result)
+                    observation = Observation(current, raw)
+                    self.cache.put(key, observation, size=observation.size(), stored_at=fetched_at)
+                    # La fila está bajo la clave canónica: sin el índice de alias
+                    # persistido, la consulta original no la encontraría
+                    self.city_index.restore(city, key)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                logger.info(
+                    f"Caché precargada desde disco: {len(observations)} observaciones "
+                    f"en {elapsed_ms:.1f} ms"
+                )
+            except Exception as e:
+                logger.error(f"Error cargando almacén persistente: {e}")
+            finally:
+                self._store_loaded = True
+    
+    def _fetch_coalesced(self, key: str, city: str, mode: Optional[str] = None,
+                         keep_stale: bool = False) -> "Observation":
+        """
+        Consulta el upstream una sola vez para todos los llamadores concurrentes de la clave
+        
+        Args:
+            key (str): Clave normalizada
+            city (str): Nombre de la ciudad
+            mode (Optional[str]): Modo de consulta (por defecto self.fetch_mode)
+            keep_stale (bool): Si es True un error no reemplaza la entrada cacheada
+            
+        Returns:
+            Observation: Observación o error (compartida, no mutar)
+        """
+        mode = mode or self.fetch_mode
+        
+        def fetch():
+            result, raw = self._fetch_weather(city, mode)
+            observation = Observation(result, raw)
+            error = result.get("error")
+            if self.cache is not None and error not in LOCAL_ERRORS and not (keep_stale and error):
+                # Si la respuesta enseñó el área de la consulta, se guarda bajo
+                # la clave canónica para que las demás variantes la encuentren
+                self._store(key if error else self._cache_key(city), city, observation)
+            return observation
+        
+        token = current_token()
+        try:
+            observation, shared = self.flight.do(f"{mode}:{key}", fetch)
+            if shared:
+                self.tracer.set_tag("weather.coalesced", True)
+                # La consulta compartida se abandonó por el plazo o la cancelación de
+                # otro llamador: este la repite si aún la necesita
+                if observation.current.get("error") in ABANDONED_ERRORS and not (token and token.done()):
+                    observation, _ = self.flight.do(f"{mode}:{key}", fetch)
+        except RequestCancelled:
+            # Este llamador dejó de esperar la consulta compartida (sigue para los demás)
+            self.metrics.inc("coalesced_abandoned_total")
+            return Observation({
+                "error": token.error(),
+                "message": "La solicitud se canceló o superó su plazo antes de completarse"
+            })
+        return observation
+    
+    def refresh_ahead(self, key: str, city: str) -> bool:
+        """
+        Revalida en segundo plano una entrada antes de que caduque (precarga)
+        
+        Args:
+            key (str): Clave normalizada (la de _cache_key)
+            city (str): Nombre de la ciudad a consultar
             
-            if response.status_code == 200:
-                data = response.json()
-                return self._parse_weather_data(data, city)
+        Returns:
+            bool: True si se lanzó la consulta (False si ya había una en curso)
+        """
+        if self.cache is None:
+            return False
+        return self._schedule_refresh(key, city)
+    
+    def _schedule_refresh(self, key: str, city: str) -> bool:
+        """Lanza una revalidación en segundo plano si no hay otra en curso para la clave"""
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+        
+        def refresh():
+            try:
+                # Un error transitorio no reemplaza los datos caducados válidos
+                self._fetch_coalesced(key, city, keep_stale=True)
+            except Exception as e:
+                logger.error(f"Error revalidando caché para {city}: {e}")
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(key)
+        
+        threading.Thread(target=refresh, daemon=True).start()
+        return True
+    
+    def _fetch_weather(self, city: str, mode: Optional[str] = None) -> Tuple[CurrentResult, Optional[str]]:
+        """
+        Consulta wttr.in sin pasar por la caché
+        
+        Args:
+            city (str): Nombre de la ciudad
+            mode (Optional[str]): "j1" o "lean" (por defecto self.fetch_mode)
+            
+        Returns:
+            Tuple[CurrentResult, Optional[str]]: Información meteorológica o error,
+                y el payload j1 crudo si la consulta tuvo éxito en modo j1
+        """
+        mode = mode or self.fetch_mode
+        deadline = time.monotonic() + self.queue_timeout
+        
+        # Trabajo que ya nadie espera: no se encola ni se envía al upstream
+        token = current_token()
+        if token is not None:
+            if token.done():
+                return self._abandoned_error(token), None
+            if token.deadline is not None:
+                deadline = min(deadline, token.deadline)
+        
+        # Con el breaker abierto se falla sin esperar al timeout de conexión
+        breaker = self.breaker
+        if breaker is not None and not breaker.allow():
+            self.metrics.inc("upstream_rejected_total", reason="circuit_open")
+            return {
+                "error": UNAVAILABLE_ERROR,
+                "message": "El servicio meteorológico no responde; inténtelo de nuevo más tarde"
+            }, None
+        
+        # Cola acotada del límite adaptativo y, después, limitador de tasa
+        with self.metrics.time("stage_seconds", stage="upstream_queue"):
+            admitted = self.concurrency.acquire(deadline)
+            if admitted and self.rate_limiter is not None and not self.rate_limiter.acquire(deadline):
+                self.concurrency.cancel()
+                admitted = False
+        if not admitted:
+            if breaker is not None:
+                breaker.cancel()
+            if token is not None and token.done():
+                return self._abandoned_error(token), None
+            self.metrics.inc("upstream_rejected_total", reason="overloaded")
+            return {
+                "error": OVERLOADED_ERROR,
+                "message": "Demasiadas consultas al servicio meteorológico; inténtelo de nuevo en unos segundos"
+            }, None
+        if token is not None and token.done():
+            # Cancelada mientras esperaba turno
+            self.concurrency.cancel()
+            if breaker is not None:
+                breaker.cancel()
+            return self._abandoned_error(token), None
+        
+        started = time.perf_counter()
+        result = {}
+        try:
+            result, raw = self._request_hedged(city, mode)
+            if result.get("error") in TIMEOUT_ERRORS and token is not None and token.done():
+                # Con el plazo del llamador ya vencido el corte lo causó ese plazo
+                # (el timeout HTTP se recortó a lo que quedaba), no el upstream:
+                # se devuelve como abandonada para que no se cachee
+                result, raw = self._abandoned_error(token), None
+            return result, raw
+        finally:
+            error = result.get("error")
+            if error in ABANDONED_ERRORS:
+                # Cortada por el plazo del llamador: no dice nada de la salud del upstream
+                if breaker is not None:
+                    breaker.cancel()
+                self.concurrency.cancel()
+            else:
+                if breaker is not None:
+                    breaker.record(_is_upstream_failure(error))
+                self.concurrency.release(time.perf_counter() - started, overloaded=error in OVERLOAD_ERRORS)
+    
+    def _abandoned_error(self, token) -> Dict[str, Any]:
+        """Error de una consulta descartada porque su solicitud se canceló o venció"""
+        error = token.error()
+        self.metrics.inc("upstream_abandoned_total", reason="cancelled" if error == CANCELLED_ERROR else "deadline")
+        return {
+            "error": error,
+            "message": "La solicitud se canceló o superó su plazo antes de completarse"
+        }
+    
+    def _request_hedged(self, city: str, mode: str) -> Tuple[CurrentResult, Optional[str]]:
+        """
+        Consulta el upstream y, si no responde antes del percentil aprendido,
+        lanza una segunda consulta idéntica y usa la primera respuesta válida
+        
+        La consulta perdedora no se interrumpe (requests no lo permite), pero
+        su resultado se descarta.
+        """
+        delay = self.hedging.delay() if self.hedging is not None else None
+        if delay is None:
+            return self._attempt_upstream(city, mode)
+        
+        executor = self._get_hedge_executor()
+        first = self._submit_in_context(executor, self._attempt_upstream, city, mode)
+        try:
+            return first.result(timeout=delay)
+        except FutureTimeoutError:
+            pass
+        if not self.hedging.try_hedge():
+            return first.result()
+        
+        hedge = self._submit_in_context(executor, self._attempt_upstream, city, mode, True)
+        pending = {first, hedge}
+        outcome = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                outcome = future.result()
+                if not _is_upstream_failure(outcome[0].get("error")):
+                    if future is hedge:
+                        self.hedging.record_win()
+                    return outcome
+        # Ambas fallaron: se devuelve el último error
+        return outcome
+    
+    def _attempt_upstream(self, city: str, mode: str,
+                          hedge: bool = False) -> Tuple[CurrentResult, Optional[str]]:
+        """Un intento de consulta al upstream con su span y su latencia para el hedging"""
+        started = time.perf_counter()
+        with self.tracer.span("upstream GET", kind="CLIENT",
+                              tags={"weather.city": city, "weather.mode": mode}) as span:
+            if hedge:
+                span.set_tag("weather.hedge", True)
+                self.metrics.inc("upstream_hedges_total")
+            result, raw = self._request_upstream(city, mode, span)
+            if "error" in result:
+                span.set_tag("error", result["error"])
+        error = result.get("error")
+        if self.hedging is not None and error not in ABANDONED_ERRORS and not _is_upstream_failure(error):
+            self.hedging.observe(time.perf_counter() - started)
+        return result, raw
+    
+    def _get_hedge_executor(self) -> ThreadPoolExecutor:
+        """Crea bajo demanda el pool de los intentos cubiertos (original y cobertura)"""
+        if self._hedge_executor is None:
+            with self._executor_lock:
+                if self._hedge_executor is None:
+                    self._hedge_executor = ThreadPoolExecutor(
+                        max_workers=2 * self.concurrency.max_limit,
+                        thread_name_prefix="weather-hedge"
+                    )
+        return self._hedge_executor
+    
+    def _request_upstream(self, city: str, mode: str, span) -> Tuple[CurrentResult, Optional[str]]:
+        """Petición HTTP a wttr.in y parseo de la respuesta (ver _fetch_weather)"""
+        import requests
+        
+        metrics = self.metrics
+        # El timeout HTTP no supera el plazo que le queda a la solicitud
+        timeout = self.timeout
+        token = current_token()
+        remaining = token.remaining() if token is not None else None
+        limited = remaining is not None and remaining < timeout
+        if limited:
+            timeout = max(remaining, 0.001)
+        try:
+            query = quote(clean_city(city), safe=",")
+            if mode == FETCH_MODE_LEAN:
+                # Solo los campos de la condición actual, como una línea de texto
+                url = f"{self.base_url}/{query}?format={quote(LEAN_FORMAT)}&m"
             else:
+                # Consultar wttr.in en formato JSON
+                url = f"{self.base_url}/{query}?format=j1"
+            
+            # Con stream=True get() vuelve al llegar las cabeceras (TTFB) y el
+            # cuerpo se lee aparte, para medir ambas etapas por separado
+            # El upstream recibe el contexto de la traza si está muestreada
+            headers = {"traceparent": span.traceparent()} if span.sampled else None
+            started = time.perf_counter()
+            response = self._session().get(url, timeout=timeout, stream=True, headers=headers)
+            try:
+                headers_at = time.perf_counter()
+                content = response.content
+            finally:
+                response.close()
+            metrics.observe("stage_seconds", headers_at - started, stage="upstream_ttfb")
+            metrics.observe("stage_seconds", time.perf_counter() - headers_at, stage="upstream_body")
+            metrics.inc("upstream_requests_total", mode=mode, status=response.status_code)
+            span.set_tag("http.status_code", response.status_code)
+            
+            if response.status_code != 200:
                 return {
                     "error": f"Error HTTP {response.status_code}",
                     "message": "No se pudo obtener información meteorológica"
-                }
+                }, None
+            
+            if mode == FETCH_MODE_LEAN:
+                text = content.decode("utf-8")
+                with metrics.time("stage_seconds", stage="parse"), self.tracer.span("parse"):
+                    result = self._parse_lean_data(text, city)
+                # %l es "areaName, country", sin región: no basta para distinguir
+                # ciudades homónimas de un país, así que este modo no aprende alias
+                return result, None
+            
+            try:
+                with metrics.time("stage_seconds", stage="decode"):
+                    data = json_codec.loads(content)
+            except json_codec.DecodeError:
+                return {
+                    "error": "JSON Error",
+                    "message": "Respuesta inválida del servicio meteorológico"
+                }, None
+            with metrics.time("stage_seconds", stage="parse"), self.tracer.span("parse"):
+                result = self._parse_weather_data(data, city)
+            if isinstance(result, WeatherReading):
+                self._learn_area(city, data)
+            return result, content.decode("utf-8")
                 
         except requests.exceptions.Timeout:
-            return {
-                "error": "Timeout",
-                "message": "La consulta tardó demasiado tiempo"
-            }
-        except requests.exceptions.ConnectionError:
+            return self._timeout_error(limited), None
+        except requests.exceptions.ConnectionError as e:
+            if _is_read_timeout(e):
+                # Timeout leyendo el cuerpo: requests lo envuelve en ConnectionError
+                return self._timeout_error(limited), None
+            metrics.inc("upstream_errors_total", error="connection")
             return {
                 "error": "Connection Error",
                 "message": "No se pudo conectar al servicio meteorológico"
-            }
-        except json.JSONDecodeError:
-            return {
-                "error": "JSON Error",
-                "message": "Respuesta inválida del servicio meteorológico"
-            }
+            }, None
         except Exception as e:
+            metrics.inc("upstream_errors_total", error="unknown")
             return {
                 "error": "Unknown Error",
                 "message": f"Error inesperado: {str(e)}"
+            }, None
+    
+    def _timeout_error(self, limited: bool) -> Dict[str, Any]:
+        """Error de un timeout HTTP: DEADLINE_ERROR si el timeout era el plazo del llamador"""
+        if limited:
+            self.metrics.inc("upstream_errors_total", error="deadline")
+            return {
+                "error": DEADLINE_ERROR,
+                "message": "La solicitud superó su plazo antes de recibir respuesta"
             }
+        self.metrics.inc("upstream_errors_total", error="timeout")
+        return {
+            "error": "Timeout",
+            "message": "La consulta tardó demasiado tiempo"
+        }
     
-    def _parse_weather_data(self, data: Dict[str, Any], city: str) -> Dict[str, Any]:
+    def _learn_area(self, city: str, data: Dict[str, Any]):
+        """Anota en el índice de alias el área (areaName, region, country) de una respuesta j1"""
+        try:
+            nearest_area = data["nearest_area"][0]
+            area_name = nearest_area["areaName"][0]["value"]
+            region = nearest_area.get("region", [{}])[0].get("value")
+            country = nearest_area.get("country", [{}])[0].get("value")
+        except (KeyError, IndexError, TypeError, AttributeError):
+            return
+        self.city_index.learn(city, area_name, country, region)
+    
+    def _parse_lean_data(self, text: str, city: str) -> CurrentResult:
+        """
+        Parsea la línea de formato personalizado de wttr.in (modo lean)
+        
+        Produce la misma lectura que _parse_weather_data con estas diferencias:
+        visibility y timestamp quedan vacíos ("N/A" en la respuesta) porque los
+        formatos personalizados no incluyen la visibilidad ni la hora de la
+        observación, y la dirección del viento se obtiene de la flecha (8
+        puntos en lugar de 16).
+        
+        Args:
+            text (str): Respuesta de wttr.in con LEAN_FORMAT
+            city (str): Nombre de la ciudad
+            
+        Returns:
+            CurrentResult: Lectura parseada o diccionario de error
+        """
+        parts = text.strip().split(LEAN_SEPARATOR)
+        if len(parts) != LEAN_FIELD_COUNT:
+            return {
+                "error": "Parse Error",
+                "message": "Respuesta inesperada del servicio meteorológico"
+            }
+        
+        location, temperature, feels_like, condition, humidity, wind, pressure, uv_index = (
+            part.strip() for part in parts
+        )
+        wind_direction = LEAN_WIND_ARROWS.get(wind[:1], "N/A")
+        
+        return WeatherReading(
+            city=location.split(",")[0].strip() or city,
+            temperature=_to_number(_strip_unit(temperature, "°C") or None),
+            condition=_to_text(condition or None),
+            humidity=_to_number(_strip_unit(humidity, "%") or None),
+            wind_speed=_to_number(_strip_unit(wind[1:] if wind_direction != "N/A" else wind, "km/h") or None),
+            wind_direction=_to_text(wind_direction),
+            pressure=_to_number(_strip_unit(pressure, "hPa") or None),
+            feels_like=_to_number(_strip_unit(feels_like, "°C") or None),
+            visibility=None,
+            uv_index=_to_number(uv_index or None),
+            timestamp=None
+        )
+    
+    def _parse_weather_data(self, data: Dict[str, Any], city: str) -> CurrentResult:
         """
         Parsea los datos JSON de wttr.in y extrae información relevante
         
@@ -72,7 +1247,7 @@ class WeatherService:
             city (str): Nombre de la ciudad
             
         Returns:
-            Dict[str, Any]: Datos meteorológicos parseados
+            CurrentResult: Lectura parseada o diccionario de error
         """
         try:
             # Extraer datos de la condición actual
@@ -82,22 +1257,20 @@ class WeatherService:
             nearest_area = data.get("nearest_area", [{}])[0]
             area_name = nearest_area.get("areaName", [{}])[0].get("value", city)
             
-            # Construir respuesta estructurada
-            weather_info = {
-                "city": area_name,
-                "temperature": current.get("temp_C", "N/A"),
-                "condition": current.get("weatherDesc", [{}])[0].get("value", "N/A"),
-                "humidity": current.get("humidity", "N/A"),
-                "wind_speed": current.get("windspeedKmph", "N/A"),
-                "wind_direction": current.get("winddir16Point", "N/A"),
-                "pressure": current.get("pressure", "N/A"),
-                "feels_like": current.get("FeelsLikeC", "N/A"),
-                "visibility": current.get("visibility", "N/A"),
-                "uv_index": current.get("uvIndex", "N/A"),
-                "timestamp": current.get("localObsDateTime", "N/A")
-            }
-            
-            return weather_info
+            # Construir la lectura tipada (números como int, textos repetidos internados)
+            return WeatherReading(
+                city=area_name,
+                temperature=_to_number(current.get("temp_C")),
+                condition=_to_text(current.get("weatherDesc", [{}])[0].get("value")),
+                humidity=_to_number(current.get("humidity")),
+                wind_speed=_to_number(current.get("windspeedKmph")),
+                wind_direction=_to_text(current.get("winddir16Point")),
+                pressure=_to_number(current.get("pressure")),
+                feels_like=_to_number(current.get("FeelsLikeC")),
+                visibility=_to_number(current.get("visibility")),
+                uv_index=_to_number(current.get("uvIndex")),
+                timestamp=current.get("localObsDateTime")
+            )
             
         except (KeyError, IndexError, TypeError) as e:
             return {
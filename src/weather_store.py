@@ -0,0 +1,145 @@
+"""
+Almacenamiento persistente de observaciones meteorológicas
+Guarda en SQLite (modo WAL) los resultados parseados y los payloads j1 crudos
+para que un servidor MCP recién iniciado arranque con la caché caliente
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class WeatherStore:
+    """Almacén SQLite de observaciones con apertura diferida y compactación en segundo plano"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS observations (
+            key TEXT PRIMARY KEY,
+            city TEXT NOT NULL,
+            fetched_at REAL NOT NULL,
+            result TEXT NOT NULL,
+            raw TEXT
+        )
+    """
+
+    def __init__(self, path: str, max_age: float = 24 * 3600,
+                 compact_interval: float = 300):
+        """
+        Inicializa el almacén (la base de datos no se abre hasta el primer uso)
+
+        Args:
+            path (str): Ruta del fichero SQLite
+            max_age (float): Antigüedad máxima en segundos de una observación guardada
+            compact_interval (float): Segundos entre compactaciones en segundo plano
+        """
+        self.path = path
+        self.max_age = max_age
+        self.compact_interval = compact_interval
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._compactor: Optional[threading.Thread] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Abre la conexión en el primer uso y arranca el compactador"""
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(self.SCHEMA)
+            conn.commit()
+            self._conn = conn
+
+            self._compactor = threading.Thread(target=self._compact_loop, daemon=True)
+            self._compactor.start()
+            logger.info(f"Almacén de observaciones abierto: {self.path}")
+        return self._conn
+
+    def load_recent(self, max_age: float) -> List[Tuple[str, str, float, Dict[str, Any], Optional[str]]]:
+        """
+        Carga las observaciones más recientes que max_age
+
+        Args:
+            max_age (float): Antigüedad máxima en segundos
+
+        Returns:
+            List[Tuple[str, str, float, Dict[str, Any], Optional[str]]]: Tuplas
+                (clave, ciudad consultada, fetched_at, resultado, payload crudo)
+        """
+        cutoff = time.time() - max_age
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT key, city, fetched_at, result, raw FROM observations WHERE fetched_at >= ?",
+                (cutoff,)
+            ).fetchall()
+
+        observations = []
+        for key, city, fetched_at, result, raw in rows:
+            try:
+                observations.append((key, city, fetched_at, json.loads(result), raw))
+            except json.JSONDecodeError:
+                logger.warning(f"Observación corrupta ignorada: {key}")
+        return observations
+
+    def save(self, key: str, city: str, result: Dict[str, Any],
+             raw: Optional[str] = None, fetched_at: Optional[float] = None):
+        """
+        Guarda (o reemplaza) la observación de una clave
+
+        Args:
+            key (str): Clave normalizada
+            city (str): Nombre de la ciudad consultada
+            result (Dict[str, Any]): Resultado parseado
+            raw (Optional[str]): Payload crudo de wttr.in
+            fetched_at (Optional[float]): Momento de obtención (por defecto ahora)
+        """
+        if fetched_at is None:
+            fetched_at = time.time()
+        payload = json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO observations (key, city, fetched_at, result, raw) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, city, fetched_at, payload, raw)
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error guardando observación para {city}: {e}")
+
+    def compact(self):
+        """Elimina observaciones antiguas y trunca el WAL"""
+        cutoff = time.time() - self.max_age
+        try:
+            with self._lock:
+                conn = self._connect()
+                deleted = conn.execute(
+                    "DELETE FROM observations WHERE fetched_at < ?", (cutoff,)
+                ).rowcount
+                conn.commit()
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            if deleted:
+                logger.info(f"Almacén compactado: {deleted} observaciones eliminadas")
+        except sqlite3.Error as e:
+            logger.error(f"Error compactando almacén: {e}")
+
+    def _compact_loop(self):
+        """Bucle de compactación periódica en segundo plano"""
+        while not self._closed.wait(self.compact_interval):
+            self.compact()
+
+    def close(self):
+        """Cierra el almacén y detiene el compactador"""
+        self._closed.set()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
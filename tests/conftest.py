@@ -0,0 +1,39 @@
+"""
+Configuración común de los tests: rutas de src/ y benchmarks/ y stub de wttr.in
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT / "src"), str(ROOT / "benchmarks")]
+
+from wttr_stub import WttrStub  # noqa: E402
+from weather_service import WeatherService  # noqa: E402
+
+
+@pytest.fixture
+def stub():
+    """Stub local de wttr.in sin latencia ni errores (ajustables en cada test)"""
+    with WttrStub() as server:
+        yield server
+
+
+@pytest.fixture
+def make_service(stub):
+    """Fábrica de WeatherService apuntando al stub (se cierran al terminar el test)"""
+    services = []
+
+    def factory(timeout: float = 10, **kwargs) -> WeatherService:
+        kwargs.setdefault("hedge_percentile", None)
+        service = WeatherService(**kwargs)
+        service.base_url = stub.url
+        service.timeout = timeout
+        services.append(service)
+        return service
+
+    yield factory
+    for service in services:
+        service.close()
@@ -0,0 +1,80 @@
+"""
+Tests del servidor MCP (despacho de solicitudes, sin proceso ni stdio)
+"""
+
+import asyncio
+import io
+import json
+import sys
+
+import pytest
+
+from mcp_server import MCPServer
+
+
+@pytest.fixture
+def server(stub):
+    server = MCPServer()
+    server.weather_service.base_url = stub.url
+    server.handle_request({
+        "jsonrpc": "2.0",
+        "id": 0,
+        "method": "initialize",
+        "params": {"protocolVersion": "2024-11-05"}
+    })
+    yield server
+    server.weather_service.close()
+
+
+def call_tool(server, name, arguments, request_id=1):
+    return server.handle_request({
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "method": "tools/call",
+        "params": {"name": name, "arguments": arguments}
+    })
+
+
+@pytest.mark.parametrize("tool", ["get_weather", "get_forecast", "get_hourly"])
+def test_non_string_city_is_invalid_params(server, tool):
+    response = call_tool(server, tool, {"city": 123})
+
+    assert response["error"]["code"] == -32602
+    assert "city" in response["error"]["message"]
+
+
+def test_async_invalid_params_do_not_leak_cancel_token(server, monkeypatch):
+    lines = [
+        {"jsonrpc": "2.0", "id": 7, "method": "tools/call", "params": []},
+        {"jsonrpc": "2.0", "id": 8, "method": "tools/call", "params": "get_weather"},
+    ]
+    data = "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+    monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(data)))
+    written = []
+    monkeypatch.setattr(server, "_write_bytes", written.append)
+
+    asyncio.run(server._serve_async(max_concurrency=4))
+
+    responses = [json.loads(line) for line in written]
+    assert sorted(response["id"] for response in responses) == [7, 8]
+    assert all(response["error"]["code"] == -32602 for response in responses)
+    assert server._requests == {}
+
+
+def test_structured_response_does_not_repeat_the_result_as_text(server):
+    server.handle_request({
+        "jsonrpc": "2.0",
+        "id": 0,
+        "method": "initialize",
+        "params": {"protocolVersion": "2025-06-18"}
+    })
+
+    result = call_tool(server, "get_weather", {"city": "Madrid"})["result"]
+
+    data = result["structuredContent"]
+    text = result["content"][0]["text"]
+    assert result["isError"] is False
+    assert data["city"] in text
+    # El bloque de texto es un resumen, no una segunda copia del JSON
+    assert len(text.encode("utf-8")) * 3 < len(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+    assert len(server.encode_response({"jsonrpc": "2.0", "id": 1, "result": result})) < 2 * len(json.dumps(data))
@@ -0,0 +1,132 @@
+"""
+Tests de WeatherService contra el stub local de wttr.in
+"""
+
+import json
+import time
+
+from cancellation import CancelToken, DEADLINE_ERROR, activate
+from weather_service import WeatherService, _is_read_timeout
+from wttr_stub import WttrStub, make_j1_payload
+
+
+def test_read_timeout_returns_timeout_error(stub, make_service):
+    stub.latency = 1.0
+    service = make_service(timeout=0.3, cache_ttl=0, max_retries=2)
+
+    started = time.perf_counter()
+    result = service.get_weather("Madrid")
+    elapsed = time.perf_counter() - started
+
+    assert result["error"] == "Timeout"
+    assert elapsed < 0.9  # sin reintentos de lectura
+    assert stub.requests <= 1
+
+
+def test_overload_status_is_not_retried(stub, make_service):
+    stub.error_rate = 1.0
+    service = make_service(cache_ttl=0, max_retries=2)
+
+    result = service.get_weather("Madrid")
+
+    assert result["error"] == "Error HTTP 503"
+    assert stub.requests == 1
+    assert service.concurrency.stats()["decreases"] == 1
+
+
+def test_slow_upstream_decreases_concurrency_limit(stub, make_service):
+    stub.latency = 0.5
+    service = make_service(timeout=0.2, cache_ttl=0, upstream_concurrency=8)
+
+    result = service.get_weather("Madrid")
+
+    stats = service.concurrency.stats()
+    assert result["error"] == "Timeout"
+    assert stats["decreases"] == 1
+    assert stats["limit"] < 8
+
+
+def test_breaker_counts_one_failure_per_upstream_attempt(stub, make_service):
+    stub.error_rate = 1.0
+    service = make_service(cache_ttl=0, max_retries=2, breaker_threshold=3)
+
+    for expected in (1, 2):
+        assert service.get_weather("Madrid")["error"] == "Error HTTP 503"
+        assert stub.requests == expected
+        assert service.breaker.stats()["consecutive_failures"] == expected
+
+
+def test_caller_deadline_is_not_an_upstream_failure(stub, make_service):
+    stub.latency = 0.5
+    service = make_service(cache_ttl=0, breaker_threshold=1)
+
+    with activate(CancelToken.with_timeout(0.1)):
+        result = service.get_weather("Madrid")
+
+    assert result["error"] == DEADLINE_ERROR
+    assert service.breaker.stats()["state"] == "closed"
+    assert service.breaker.stats()["consecutive_failures"] == 0
+    assert service.concurrency.stats()["decreases"] == 0
+
+
+def test_caller_deadline_error_is_not_cached(stub, make_service):
+    stub.latency = 0.5
+    service = make_service()
+
+    started = time.perf_counter()
+    with activate(CancelToken.with_timeout(0.1)):
+        result = service.get_weather("Madrid")
+    assert result["error"] == DEADLINE_ERROR
+    assert time.perf_counter() - started < 0.4
+
+    # Sin plazo, la siguiente consulta va al upstream en lugar de recibir el error
+    result = service.get_weather("Madrid")
+    assert "error" not in result
+
+
+def test_wrapped_read_timeout_is_recognised():
+    import requests
+    from urllib3.exceptions import MaxRetryError, ReadTimeoutError
+
+    read_timeout = ReadTimeoutError(None, "/Madrid", "Read timed out.")
+    assert _is_read_timeout(requests.exceptions.ConnectionError(read_timeout))
+    assert _is_read_timeout(requests.exceptions.ConnectionError(MaxRetryError(None, "/Madrid", read_timeout)))
+    assert not _is_read_timeout(requests.exceptions.ConnectionError("Connection refused"))
+
+
+def test_same_name_cities_in_one_country_keep_separate_entries(tmp_path):
+    for query, region, temp in (("Portland, Oregon", "Oregon", "12"), ("Portland, Maine", "Maine", "-3")):
+        payload = make_j1_payload(query)
+        payload["current_condition"][0]["temp_C"] = temp
+        payload["nearest_area"][0].update({
+            "areaName": [{"value": "Portland"}],
+            "region": [{"value": region}],
+            "country": [{"value": "United States of America"}]
+        })
+        (tmp_path / f"{query}.json").write_text(json.dumps(payload), encoding="utf-8")
+
+    with WttrStub(payload_dir=str(tmp_path)) as stub:
+        service = WeatherService(hedge_percentile=None)
+        service.base_url = stub.url
+        try:
+            assert service.get_weather("Portland, Oregon")["temperature"] == "12"
+            assert service.get_weather("Portland, Maine")["temperature"] == "-3"
+            assert service.get_weather("Portland, Oregon")["temperature"] == "12"
+            assert stub.requests == 2
+        finally:
+            service.close()
+
+
+def test_restart_serves_original_query_from_store(stub, make_service, tmp_path):
+    store_path = str(tmp_path / "observations.db")
+    service = make_service(store_path=store_path)
+    assert "error" not in service.get_weather("Madrid")
+    service.close()
+    assert stub.requests == 1
+
+    # Sin WEATHER_CITY_INDEX el índice de alias empieza vacío tras reiniciar
+    restarted = make_service(store_path=store_path)
+    result = restarted.get_weather("Madrid")
+
+    assert "error" not in result
+    assert stub.requests == 1